@@ -0,0 +1,64 @@
+"""
+Microbenchmark for key encoding.
+
+Compares walking a key with one character_to_key call per character
+(what every trie operation used to do) against encode_key, and times
+Trie lookups end to end.
+
+Run from the project root with `uv run python -m benchmarks.encode_key`.
+"""
+
+import random
+import string
+import timeit
+
+from trie_search.trie import Trie, character_to_key, encode_key
+
+
+def per_character(key: str) -> list[int]:
+    return [character_to_key(char) for char in key]
+
+
+def per_character_lookup(trie: Trie, key: str):
+    # the original __getitem__ loop, two character_to_key calls per character
+    curr = trie.root
+    for char in key:
+        if curr.children[character_to_key(char)] is None:
+            raise KeyError(key)
+        curr = curr.children[character_to_key(char)]
+    return curr.value
+
+
+def report(name: str, seconds: float, ops: int, baseline: float = None) -> None:
+    line = f"{name:<32} {seconds / ops * 1e9:9.1f} ns/op"
+    if baseline is not None:
+        line += f"  ({baseline / seconds:.1f}x)"
+    print(line)
+
+
+def main(count: int = 20000, repeat: int = 5) -> None:
+    rng = random.Random(0)
+    words = [
+        "".join(rng.choices(string.ascii_letters + ".,'", k=rng.randint(3, 12)))
+        for _ in range(count)
+    ]
+    trie = Trie()
+    for word in words:
+        trie[word] = word
+
+    def best(func):
+        return min(timeit.repeat(func, number=1, repeat=repeat))
+
+    old = best(lambda: [per_character(word) for word in words])
+    new = best(lambda: [encode_key(word) for word in words])
+    report("character_to_key per char", old, count)
+    report("encode_key", new, count, old)
+
+    old = best(lambda: [per_character_lookup(trie, word) for word in words])
+    new = best(lambda: [trie[word] for word in words])
+    report("lookup, character_to_key", old, count)
+    report("lookup, encode_key", new, count, old)
+
+
+if __name__ == "__main__":
+    main()
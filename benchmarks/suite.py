@@ -0,0 +1,359 @@
+"""
+Benchmark suite for trie operations and index builds.
+
+For every trie engine and key count it times insert, lookup, delete, full
+iteration and wildcard / glob searches of high, medium and low
+selectivity, plus an end-to-end build_index of a generated site served
+through httpx.MockTransport (no network). Every case runs in a fresh
+process so its peak RSS is its own.
+
+Reports ops/sec (keys, or patterns for the searches, or pages for
+build_index) and, for per-key operations, p50 / p99 latency. Write the
+results with --output and diff two runs with --compare:
+
+    uv run python -m benchmarks.suite --sizes 10000,100000 --output new.json
+    uv run python -m benchmarks.suite --sizes 10000,100000 --compare old.json
+
+Keys are synthetic (Zipf-like lengths and letters, fixed seed) unless
+--corpus names a text file whose words to use instead. Sizes up to 10M
+keys work but need the memory for them.
+"""
+
+import argparse
+import json
+import platform
+import random
+import resource
+import string
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from typing import Callable, Iterable, Optional
+
+ENGINES = ("Trie", "CompactTrie", "RadixTrie", "SnapshotTrie", "ShardedTrie")
+# letter weights roughly as in English text, so prefixes share like real words
+LETTERS = string.ascii_lowercase
+LETTER_WEIGHTS = [8.2, 1.5, 2.8, 4.3, 12.7, 2.2, 2.0, 6.1, 7.0, 0.2, 0.8, 4.0, 2.4,
+                  6.7, 7.5, 1.9, 0.1, 6.0, 6.3, 9.1, 2.8, 1.0, 2.4, 0.2, 2.0, 0.1]
+# at most this many per-operation timings are kept for the percentiles
+LATENCY_SAMPLES = 100_000
+
+
+def engine_class(name: str):
+    if name == "Trie":
+        from trie_search.trie import Trie
+        return Trie
+    if name == "CompactTrie":
+        from trie_search.compact_trie import CompactTrie
+        return CompactTrie
+    if name == "RadixTrie":
+        from trie_search.radix_trie import RadixTrie
+        return RadixTrie
+    if name == "SnapshotTrie":
+        from trie_search.snapshot_trie import SnapshotTrie
+        return SnapshotTrie
+    if name == "ShardedTrie":
+        from trie_search.sharded_trie import ShardedTrie
+        return ShardedTrie
+    raise ValueError(f"unknown engine {name!r}, pick from {ENGINES}")
+
+
+def synthetic_words(count: int, seed: int = 0) -> list[str]:
+    """
+    Return `count` distinct pseudo-words, the same ones for the same seed.
+    """
+    rng = random.Random(seed)
+    words: set[str] = set()
+    while len(words) < count:
+        # mostly 4-9 letters with a long tail, like a real vocabulary
+        length = min(3 + int(rng.expovariate(0.25)), 24)
+        words.add("".join(rng.choices(LETTERS, LETTER_WEIGHTS, k=length)))
+    result = sorted(words)
+    rng.shuffle(result)
+    return result
+
+
+def corpus_words(path: str, count: int, seed: int = 0) -> list[str]:
+    """
+    Return up to `count` distinct words of a text file, in a shuffled order.
+    """
+    with open(path, encoding="utf-8", errors="replace") as file:
+        words = {word.strip(".,;:!?\"'()[]").lower() for word in file.read().split()}
+    words = sorted(words - {""})
+    random.Random(seed).shuffle(words)
+    return words[:count]
+
+
+def percentile(sorted_samples: list[int], fraction: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    index = min(int(len(sorted_samples) * fraction), len(sorted_samples) - 1)
+    return sorted_samples[index]
+
+
+def timed_each(items: list, operation: Callable) -> dict:
+    """
+    Run `operation(item)` for every item, timing each call.
+    """
+    clock = time.perf_counter_ns
+    step = max(1, len(items) // LATENCY_SAMPLES)
+    samples = []
+    start = clock()
+    for position, item in enumerate(items):
+        if position % step:
+            operation(item)
+            continue
+        before = clock()
+        operation(item)
+        samples.append(clock() - before)
+    total = clock() - start
+    samples.sort()
+    return {
+        "ops": len(items),
+        "seconds": total / 1e9,
+        "ops_per_sec": len(items) / (total / 1e9) if total else 0.0,
+        "p50_us": percentile(samples, 0.50) / 1000,
+        "p99_us": percentile(samples, 0.99) / 1000,
+    }
+
+
+def timed_all(operation: Callable[[], int]) -> dict:
+    """
+    Time one call of `operation`, which returns how many items it produced.
+    """
+    start = time.perf_counter()
+    produced = operation()
+    seconds = time.perf_counter() - start
+    return {"ops": produced, "seconds": seconds,
+            "ops_per_sec": produced / seconds if seconds else 0.0}
+
+
+def patterns(words: list[str], rng: random.Random) -> dict[str, list[str]]:
+    """
+    Build wildcard_search / glob_search patterns of high, medium and low
+    selectivity from the keys.
+    """
+    sample = rng.sample(words, min(50, len(words)))
+
+    def blank(word: str, count: int) -> str:
+        chars = list(word)
+        for position in rng.sample(range(len(chars)), min(count, len(chars))):
+            chars[position] = "*"
+        return "".join(chars)
+
+    return {
+        # one unknown letter: a handful of matches
+        "wildcard_high": [blank(word, 1) for word in sample],
+        # half the letters unknown
+        "wildcard_medium": [blank(word, len(word) // 2) for word in sample[:10]],
+        # every letter unknown: all keys of a length
+        "wildcard_low": ["*" * length for length in (4, 5, 6)],
+        "glob_prefix": [word[:3] + "*" for word in sample[:10]],
+        "glob_infix": ["*" + word[1:3] + "*" for word in sample[:3]],
+    }
+
+
+def run_case(engine: str, size: int, corpus: Optional[str], seed: int) -> list[dict]:
+    """
+    Benchmark one engine at one size. Runs in its own process.
+    """
+    words = corpus_words(corpus, size, seed) if corpus else synthetic_words(size, seed)
+    rng = random.Random(seed)
+    trie = engine_class(engine)()
+    results = []
+
+    def record(operation: str, measured: dict) -> None:
+        results.append({"engine": engine, "size": len(words), "operation": operation,
+                        **measured})
+
+    record("insert", timed_each(words, lambda word: trie.__setitem__(word, word)))
+    lookups = rng.sample(words, min(len(words), 100_000))
+    record("lookup", timed_each(lookups, trie.__getitem__))
+    missing = [word + "q" for word in lookups[:10_000]]
+    record("lookup_missing", timed_each(missing, lambda word: word in trie))
+    record("iterate", timed_all(lambda: sum(1 for _ in trie)))
+
+    for name, group in patterns(words, rng).items():
+        if name.startswith("wildcard"):
+            search = trie.wildcard_search
+        else:
+            search = trie.glob_search
+        matches = 0
+
+        def run_group() -> int:
+            nonlocal matches
+            for pattern in group:
+                matches += sum(1 for _ in search(pattern))
+            return len(group)
+
+        measured = timed_all(run_group)
+        measured["matches"] = matches
+        record(name, measured)
+
+    record("prefix_top10", timed_each(
+        [word[:2] for word in lookups[:1000]],
+        lambda prefix: trie.autocomplete(prefix, 10)))
+    record("delete", timed_each(words[: len(words) // 2], trie.__delitem__))
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    for result in results:
+        # kilobytes on Linux, bytes on macOS
+        result["peak_rss_kb"] = peak // 1024 if sys.platform == "darwin" else peak
+    return results
+
+
+def fixture_site(pages: int, words_per_page: int, seed: int) -> dict[str, str]:
+    """
+    Generate a site of `pages` pages at https://example.com, each linking to
+    a few others.
+    """
+    rng = random.Random(seed)
+    vocabulary = synthetic_words(max(1000, pages * 20), seed)
+    site = {}
+    for number in range(pages):
+        links = " ".join(f'<a href="/p{rng.randrange(pages)}">more</a>'
+                         for _ in range(5))
+        common = vocabulary[: len(vocabulary) // 4]
+        half = words_per_page // 2
+        text = " ".join(rng.choices(common, k=half)
+                        + rng.choices(vocabulary, k=words_per_page - half))
+        site[f"https://example.com/p{number}"] = (
+            f"<html><body>{links} <p>{text}</p></body></html>")
+    return site
+
+
+def run_build(engine: str, pages: int, words_per_page: int, seed: int) -> list[dict]:
+    """
+    Crawl and index a generated site end to end. Runs in its own process.
+    """
+    import httpx
+    from trie_search.async_crawler import AsyncWebCrawler
+
+    site = fixture_site(pages, words_per_page, seed)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        html = site.get(str(request.url))
+        return httpx.Response(200 if html else 404, text=html or "")
+
+    crawler = AsyncWebCrawler("https://example.com/p0", max_depth=pages,
+                              trie_class=engine_class(engine),
+                              transport=httpx.MockTransport(handler))
+    start = time.perf_counter()
+    crawler.crawl()
+    crawled = time.perf_counter() - start
+    trie = crawler.build_index()
+    total = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return [{
+        "engine": engine, "size": len(trie), "operation": "build_index",
+        "ops": len(crawler.results), "seconds": total,
+        "ops_per_sec": len(crawler.results) / total if total else 0.0,
+        "crawl_seconds": crawled, "index_seconds": total - crawled,
+        "peak_rss_kb": peak // 1024 if sys.platform == "darwin" else peak,
+    }]
+
+
+def in_fresh_process(function: Callable, *args) -> list[dict]:
+    with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(function, *args).result()
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: Iterable[dict], baseline: Optional[dict] = None) -> None:
+    """
+    Print a table of results, with the speed relative to `baseline` (results
+    keyed by case).
+    """
+    header = (f"{'engine':<13} {'size':>9} {'operation':<16} {'ops/sec':>12} "
+              f"{'p50 us':>8} {'p99 us':>8} {'RSS MB':>7}")
+    if baseline is not None:
+        header += f" {'vs base':>8}"
+    print(header)
+    for result in results:
+        if "p50_us" in result:
+            latency = f"{result['p50_us']:>8.2f} {result['p99_us']:>8.2f}"
+        else:
+            latency = f"{'-':>8} {'-':>8}"
+        line = (f"{result['engine']:<13} {result['size']:>9} {result['operation']:<16} "
+                f"{result['ops_per_sec']:>12,.0f} {latency} "
+                f"{result['peak_rss_kb'] / 1024:>7.0f}")
+        if baseline is not None:
+            old = baseline.get(case_key(result))
+            if old and old["ops_per_sec"]:
+                line += f" {result['ops_per_sec'] / old['ops_per_sec']:>7.2f}x"
+            else:
+                line += f" {'new':>8}"
+        print(line)
+
+
+def case_key(result: dict) -> tuple:
+    return result["engine"], result["size"], result["operation"]
+
+
+def main(argv: Optional[list[str]] = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="10000,100000",
+                        help="comma separated key counts (default: %(default)s)")
+    parser.add_argument("--engines", default="Trie,CompactTrie,RadixTrie",
+                        help=f"comma separated, from {', '.join(ENGINES)} "
+                             "(default: %(default)s)")
+    parser.add_argument("--corpus",
+                        help="text file to take the keys from, instead of "
+                             "synthetic words")
+    parser.add_argument("--pages", type=int, default=500,
+                        help="pages of the build_index fixture site, 0 to skip "
+                             "(default: %(default)s)")
+    parser.add_argument("--words-per-page", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare",
+                        help="JSON file of an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    engines = args.engines.split(",")
+    for engine in engines:
+        engine_class(engine)
+    results = []
+    for size in (int(size) for size in args.sizes.split(",")):
+        for engine in engines:
+            results.extend(in_fresh_process(run_case, engine, size, args.corpus,
+                                            args.seed))
+    if args.pages:
+        for engine in engines:
+            results.extend(in_fresh_process(run_build, engine, args.pages,
+                                            args.words_per_page, args.seed))
+
+    report = {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "arguments": vars(args),
+        },
+        "results": results,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = {case_key(result): result
+                        for result in json.load(file)["results"]}
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from time import perf_counter
+from typing import Dict, List, Optional, Type
+from urllib.parse import urlsplit
+
+import httpx
+
+from .crawler import WebCrawler
+from .http_cache import ResponseCache
+from .stats import CrawlStats
+from .tokenizer import Tokenizer
+from .trie import Trie
+from .utils import ALLOWED_DOMAINS, FetchException
+
+
+async def fetch_html_async(client: httpx.AsyncClient, url: str) -> str:
+    """
+    Fetch HTML from a given URL with a shared async client.
+
+    Applies the same URL checks as utils.fetch_html; the crawler's own
+    visited bookkeeping takes the place of its seen-already guard.
+
+    Raises:
+        FetchException: if the URL is not allowed or the request fails
+    """
+    if not url.startswith("https://"):
+        raise FetchException(f"URL {url} must start with https://")
+    elif not url.startswith(ALLOWED_DOMAINS):
+        raise FetchException(f"URL {url} does not start with an allowed domain")
+    try:
+        response = await client.get(url)
+        return response.text
+    except Exception as e:
+        raise FetchException(str(e))
+
+
+class AsyncWebCrawler(WebCrawler):
+    """
+    A web crawler that fetches each depth level concurrently over one pooled
+    httpx.AsyncClient.
+
+    Pages of one depth are fetched together, then processed in queue order
+    before the next depth starts, so every page is crawled at the same depth
+    and `results` comes out the same as WebCrawler's.
+    """
+    def __init__(
+        self,
+        start_url: str,
+        max_depth: int,
+        trie_class: Type[Trie] = Trie,
+        parse_workers: int = 0,
+        max_concurrency: int = 10,
+        max_per_host: int = 4,
+        timeout: float = 10.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        stats: Optional[CrawlStats] = None,
+        stream: bool = False,
+        keep_results: bool = True,
+        tokenizer: Optional[Tokenizer] = None,
+        crawl_delay: float = 0.0,
+        bloom_capacity: Optional[int] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
+        """
+        Initialize the crawler.
+
+        Args:
+            start_url (str): The initial URL to start crawling from
+            max_depth (int): Maximum depth to crawl into the website
+            trie_class (Type[Trie]): Trie implementation used by build_index
+            parse_workers (int): Number of worker processes parsing pages,
+                0 parses on the event loop thread
+            max_concurrency (int): Maximum number of requests in flight
+            max_per_host (int): Maximum number of requests in flight to one host
+            timeout (float): Per-request timeout in seconds
+            transport (Optional[httpx.AsyncBaseTransport]): Transport for the
+                client, e.g. httpx.MockTransport in tests
+            stats (Optional[CrawlStats]): Where to count fetches, parse and
+                index times, None to not measure anything
+            stream (bool): Index each page as soon as it is parsed, see WebCrawler
+            keep_results (bool): Keep every page's words in `results`
+            tokenizer (Optional[Tokenizer]): Splits each page's text into
+                words, None splits it on whitespace
+            crawl_delay (float): Minimum seconds between the starts of two
+                requests to one host
+            bloom_capacity (Optional[int]): Remember seen URLs in a Bloom filter
+                sized for this many, instead of a set of every URL
+            cache (Optional[ResponseCache]): Pages fetched before, read
+                first and updated with every page fetched
+        """
+        super().__init__(start_url, max_depth, trie_class, parse_workers, stats,
+                         stream, keep_results, tokenizer, crawl_delay,
+                         bloom_capacity, cache)
+        self.max_concurrency = max_concurrency
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.transport = transport
+
+    def crawl(self) -> Dict[str, List[str]]:
+        """
+        Crawl the website and return a mapping of URLs to words.
+
+        Runs crawl_async in a new event loop.
+
+        Returns:
+            Dict[str, List[str]]: Mapping of URLs to words found on each page
+        """
+        return asyncio.run(self.crawl_async())
+
+    async def crawl_async(self) -> Dict[str, List[str]]:
+        """
+        Crawl the website and return a mapping of URLs to words.
+
+        Returns:
+            Dict[str, List[str]]: Mapping of URLs to words found on each page
+        """
+        frontier = self._new_frontier()
+        limits = httpx.Limits(
+            max_connections=self.max_concurrency,
+            max_keepalive_connections=self.max_concurrency,
+        )
+        in_flight = asyncio.Semaphore(self.max_concurrency)
+        per_host: Dict[str, asyncio.Semaphore] = {}
+        stats = self.stats
+
+        async def fetch(client: httpx.AsyncClient, url: str) -> Optional[str]:
+            if self.cache is not None:
+                html = self._cached_page(url)
+                if html is not None or self.cache.replay:
+                    return html
+            host = urlsplit(url).netloc
+            if host not in per_host:
+                per_host[host] = asyncio.Semaphore(self.max_per_host)
+            # book the host's next slot before queueing for a connection
+            delay = frontier.reserve(url)
+            if delay:
+                await asyncio.sleep(delay)
+            async with in_flight, per_host[host]:
+                start = perf_counter()
+                try:
+                    html = await fetch_html_async(client, url)
+                except Exception as e:
+                    if stats is not None:
+                        stats.record_failure(e)
+                    return None
+                if stats is not None:
+                    # latency of the request itself, not the wait for a free slot
+                    stats.record_fetch(perf_counter() - start,
+                                       len(html.encode("utf-8")))
+            if self.cache is not None:
+                self.cache.put(url, html)
+            return html
+
+        executor = None
+        if self.parse_workers:
+            executor = ProcessPoolExecutor(self.parse_workers)
+        async with httpx.AsyncClient(
+            limits=limits, timeout=self.timeout, transport=self.transport
+        ) as client:
+            with executor or nullcontext():
+                while frontier:
+                    depth, batch = frontier.pop_level()
+                    pages = await asyncio.gather(*(fetch(client, url) for url in batch))
+                    fetched = [(url, html) for url, html in zip(batch, pages)
+                               if html is not None]
+                    self._process_pages(fetched, depth, frontier, executor)
+
+        return self.results
+
+
+def crawl_site_async(start_url: str, max_depth: int,
+                     max_concurrency: int = 10) -> Dict[str, List[str]]:
+    """
+    Crawl a site with AsyncWebCrawler.
+
+    Args:
+        start_url (str): URL to start crawling
+        max_depth (int): Maximum crawl depth
+        max_concurrency (int): Maximum number of requests in flight
+
+    Returns:
+        Dict[str, List[str]]: Mapping of URLs to words
+    """
+    crawler = AsyncWebCrawler(start_url, max_depth, max_concurrency=max_concurrency)
+    return crawler.crawl()
@@ -0,0 +1,202 @@
+from array import array
+from typing import Any, Iterator
+from .trie import Trie, encode_key
+
+
+class CompactTrie(Trie):
+    """
+    A Trie that keeps its nodes in flat typed arrays instead of TrieNode objects.
+
+    Node `n` is described by four parallel arrays:
+        _first[n]  - index of the first child of n (-1 when n is a leaf)
+        _next[n]   - index of the next sibling of n (-1 when n is the last child)
+        _label[n]  - character_to_key index of the edge leading into n
+        _slot[n]   - position of n's value in `_values` (-1 when no key ends at n)
+
+    Siblings are kept sorted by label so traversals stay alphabetical.
+    A node costs 13 bytes here against several hundred bytes for a TrieNode,
+    at the price of a short scan over at most 27 siblings per character.
+
+    Freed nodes and value slots are recycled by later inserts.
+    """
+
+    def __init__(self):
+        self._first = array('i', [-1])
+        self._next = array('i', [-1])
+        self._label = bytearray(1)
+        self._slot = array('i', [-1])
+        self._values: list[Any] = []
+        self._free_nodes: list[int] = []
+        self._free_slots: list[int] = []
+        self.size = 0
+        self._init_caches()
+
+    def _root(self) -> int:
+        return 0
+
+    def _child(self, node: int, index: int) -> Any:
+        child = self._first[node]
+        label = self._label
+        nxt = self._next
+        while child != -1 and label[child] < index:
+            child = nxt[child]
+        if child != -1 and label[child] == index:
+            return child
+        return None
+
+    def _children(self, node: int) -> Iterator[tuple[int, int]]:
+        child = self._first[node]
+        while child != -1:
+            yield self._label[child], child
+            child = self._next[child]
+
+    def _has_value(self, node: int) -> bool:
+        return self._slot[node] != -1
+
+    def _value(self, node: int) -> Any:
+        return self._values[self._slot[node]]
+
+    def _new_node(self, index: int, next_sibling: int) -> int:
+        """
+        Allocate a childless node with the given label, reusing a freed one if possible.
+        """
+        if self._free_nodes:
+            node = self._free_nodes.pop()
+            self._first[node] = -1
+            self._next[node] = next_sibling
+            self._label[node] = index
+            self._slot[node] = -1
+        else:
+            node = len(self._first)
+            self._first.append(-1)
+            self._next.append(next_sibling)
+            self._label.append(index)
+            self._slot.append(-1)
+        return node
+
+    def _ensure_child(self, node: int, index: int) -> int:
+        """
+        Return the child of `node` at `index`, creating it in sorted position if needed.
+        """
+        label = self._label
+        nxt = self._next
+        prev = -1
+        child = self._first[node]
+        while child != -1 and label[child] < index:
+            prev = child
+            child = nxt[child]
+        if child != -1 and label[child] == index:
+            return child
+
+        new = self._new_node(index, child)
+        if prev == -1:
+            self._first[node] = new
+        else:
+            nxt[prev] = new
+        return new
+
+    def _store(self, node: int, value: Any) -> None:
+        slot = self._slot[node]
+        if slot != -1:
+            self._values[slot] = value
+            return
+
+        # new key: take a free value slot or grow the value list
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._values[slot] = value
+        else:
+            slot = len(self._values)
+            self._values.append(value)
+        self._slot[node] = slot
+        self.size += 1
+
+    def _unlink(self, parent: int, node: int) -> None:
+        """
+        Remove the childless, valueless `node` from its parent's child list and free it.
+        """
+        child = self._first[parent]
+        if child == node:
+            self._first[parent] = self._next[node]
+        else:
+            while self._next[child] != node:
+                child = self._next[child]
+            self._next[child] = self._next[node]
+        self._free_nodes.append(node)
+
+    def __getitem__(self, key: str) -> Any:
+        """
+        Given a key, return the value associated with it in the trie.
+
+        If the key has not been added to this trie, raise `KeyError(key)`.
+        If the key is not a string, raise `KeyError(key)`
+        """
+        if not isinstance(key, str):
+            raise KeyError(key)
+
+        curr = 0
+        for index in encode_key(key):
+            curr = self._child(curr, index)
+            if curr is None:
+                raise KeyError(key)
+
+        slot = self._slot[curr]
+        if slot == -1:
+            raise KeyError(key)
+        return self._values[slot]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        """
+        Given a key and value, store the value associated with key.
+
+        Like a dictionary, will overwrite existing data if key already exists.
+
+        If the key is not a string, raise `KeyError(key)`
+        """
+        if not isinstance(key, str):
+            raise KeyError(key)
+
+        codes = encode_key(key)
+        curr = 0
+        for index in codes:
+            curr = self._ensure_child(curr, index)
+        is_new = self._slot[curr] == -1
+        self._store(curr, value)
+        self._on_set(codes, value, is_new)
+
+    def __delitem__(self, key: str) -> None:
+        """
+        Remove data associated with `key` from the trie.
+
+        If the key is not a string, raise `KeyError(key)`
+        """
+        if not isinstance(key, str):
+            raise KeyError(key)
+
+        codes = encode_key(key)
+        curr = 0
+        path = []
+        for index in codes:
+            child = self._child(curr, index)
+            if child is None:
+                raise KeyError(key)
+            path.append(curr)
+            curr = child
+
+        slot = self._slot[curr]
+        if slot == -1:
+            raise KeyError(key)
+
+        # release the value so it can be garbage collected
+        self._values[slot] = None
+        self._free_slots.append(slot)
+        self._slot[curr] = -1
+        self.size -= 1
+        self._on_delete(codes)
+
+        # Clean up empty nodes from the bottom up
+        for parent in reversed(path):
+            if self._first[curr] != -1 or self._slot[curr] != -1:
+                break
+            self._unlink(parent, curr)
+            curr = parent
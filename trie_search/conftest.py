@@ -0,0 +1,55 @@
+import httpx
+import pytest
+from trie_search.utils import FetchException
+
+BASE = "https://example.com"
+
+# a small site: index links to two pages, both link back, one links deeper
+SITE = {
+    BASE: '<html><a href="/one">one</a> <a href="/two">two</a>'
+          ' <a href="https://elsewhere.org">away</a>'
+          ' <p>this is the index page</p></html>',
+    BASE + "/one": '<html><a href="https://example.com">home</a>'
+                   ' <a href="/three">three</a> <p>page one australia</p></html>',
+    BASE + "/two": '<html><a href="https://example.com">home</a> <a href="/one">one</a>'
+                   ' <a href="/broken">broken</a> <p>page two new zealand</p></html>',
+    BASE + "/three": '<html><a href="/four">four</a> <p>page three fiji</p></html>',
+    BASE + "/four": "<html><p>page four tonga</p></html>",
+}
+
+
+def _fetch(url):
+    url = url.rstrip("/")
+    if url not in SITE:
+        raise FetchException(url)
+    return SITE[url]
+
+
+def _handler(request):
+    url = str(request.url).rstrip("/")
+    if url not in SITE:
+        raise httpx.ConnectError("no route", request=request)
+    return httpx.Response(200, text=SITE[url])
+
+
+@pytest.fixture
+def site():
+    """The pages of the test site, keyed by URL."""
+    return SITE
+
+
+@pytest.fixture
+def fake_fetch():
+    """A fetch_html stand-in serving the test site."""
+    return _fetch
+
+
+@pytest.fixture
+def serial_fetch(monkeypatch):
+    monkeypatch.setattr("trie_search.crawler.fetch_html", _fetch)
+
+
+@pytest.fixture
+def transport():
+    """An httpx transport serving the test site, for AsyncWebCrawler."""
+    return httpx.MockTransport(_handler)
@@ -1,41 +1,161 @@
-from typing import Set, Dict, List, Tuple
-from .utils import get_links, get_text, fetch_html, ALLOWED_DOMAINS, FetchException
-from .trie import Trie
+import threading
+from array import array
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from operator import itemgetter
+from sys import intern
+from time import perf_counter
+from typing import Set, Dict, List, Optional, Tuple, Type
+import lxml.html
+from .utils import fetch_html, FetchException
+from .frontier import BloomFilter, Frontier, url_key
+from .http_cache import ResponseCache
+from .trie import Trie, normalize_keys
+from .postings import DocumentTable, PostingList
+from .stats import CrawlStats
+from .tokenizer import Tokenizer
+
+
+def _parse_html(html: str, url: str, want_links: bool) -> Tuple[str, List[str]]:
+    """
+    Parse a page with lxml, returning its text and, if wanted, its absolute links.
+    """
+    doc = lxml.html.fromstring(html)
+    text = doc.text_content()
+    links: List[str] = []
+    if want_links:
+        doc.make_links_absolute(url)
+        # plain strings, lxml's result strings keep the whole tree alive
+        links = [str(link) for link in doc.xpath("//a/@href")]
+    return text, links
+
+
+def parse_page(html: str, url: str, want_links: bool = True,
+               tokenizer: Optional[Tokenizer] = None) -> Tuple[List[str], List[str]]:
+    """
+    Parse a page once and extract both its words and its links.
+
+    Gives the same results as `get_text(html).split()` and
+    `get_links(html, url)` without parsing the HTML twice. This is a plain
+    module-level function so it can run in a ProcessPoolExecutor.
+
+    Args:
+        html (str): HTML content of the page
+        url (str): URL of the page, used to make links absolute
+        want_links (bool): Whether to extract links at all
+        tokenizer (Optional[Tokenizer]): Splits the page's text into words,
+            None splits it on whitespace
+
+    Returns:
+        Tuple[List[str], List[str]]: The words and the absolute links on the page
+    """
+    text, links = _parse_html(html, url, want_links)
+    words = text.split() if tokenizer is None else tokenizer(text)
+    return words, links
+
+
+def parse_page_timed(
+    html: str, url: str, want_links: bool = True,
+    tokenizer: Optional[Tokenizer] = None,
+) -> Tuple[List[str], List[str], float, float]:
+    """
+    Like parse_page, also returning the seconds spent parsing the HTML and
+    splitting its text into words.
+
+    The times are measured where the page is parsed, e.g. in a worker process.
+
+    Returns:
+        Tuple[List[str], List[str], float, float]: The words, the links, the
+            parse time and the tokenize time
+    """
+    start = perf_counter()
+    text, links = _parse_html(html, url, want_links)
+    parsed = perf_counter()
+    words = text.split() if tokenizer is None else tokenizer(text)
+    return words, links, parsed - start, perf_counter() - parsed
 
 
 class WebCrawler:
     """
     A web crawler that can crawl a site to depth and build an index of words to URLs.
     """
-    def __init__(self, start_url: str, max_depth: int):
+    def __init__(self, start_url: str, max_depth: int, trie_class: Type[Trie] = Trie,
+                 parse_workers: int = 0, stats: Optional[CrawlStats] = None,
+                 stream: bool = False, keep_results: bool = True,
+                 tokenizer: Optional[Tokenizer] = None, crawl_delay: float = 0.0,
+                 bloom_capacity: Optional[int] = None,
+                 cache: Optional[ResponseCache] = None):
         """
         Initialize the web crawler with a starting URL and maximum crawl depth.
 
         Args:
             start_url (str): The initial URL to start crawling from
             max_depth (int): Maximum depth to crawl into the website
+            trie_class (Type[Trie]): Trie implementation used by build_index,
+                e.g. CompactTrie for large crawls
+            parse_workers (int): Number of worker processes parsing pages,
+                0 parses on the main thread
+            stats (Optional[CrawlStats]): Where to count fetches, parse and
+                index times, None to not measure anything
+            stream (bool): Add each page's words to the index as soon as the
+                page is parsed, instead of all at once in build_index
+            keep_results (bool): Keep every page's words in `results`; turn
+                off with `stream` to crawl in memory bounded by the index
+            tokenizer (Optional[Tokenizer]): Splits each page's text into
+                words, None splits it on whitespace
+            crawl_delay (float): Minimum seconds between two requests to one host
+            bloom_capacity (Optional[int]): Remember seen URLs in a Bloom filter
+                sized for this many, instead of a set of every URL
+            cache (Optional[ResponseCache]): Pages fetched before, read
+                first and updated with every page fetched
+
+        Raises:
+            ValueError: if `keep_results` is off without `stream`, which
+                would leave build_index nothing to build from
         """
+        if not keep_results and not stream:
+            raise ValueError(
+                "keep_results=False needs stream=True, or the index would be empty")
         self.start_url = start_url
         self.max_depth = max_depth
+        self.trie_class = trie_class
+        self.parse_workers = parse_workers
+        self.stats = stats
+        self.stream = stream
+        self.keep_results = keep_results
+        self.tokenizer = tokenizer
+        self.crawl_delay = crawl_delay
+        self.bloom_capacity = bloom_capacity
+        self.cache = cache
+        # URLs still to fetch, set by crawl
+        self.frontier: Optional[Frontier] = None
+        # the index a streaming crawl builds as it goes
+        self.index: Optional[Trie] = None
         self.visited: Set[str] = set()
         self.results: Dict[str, List[str]] = {}
+        # URL <-> document id dictionary the index's posting lists refer to
+        self.documents = DocumentTable()
+        # ranking data recorded while indexing, see QueryEngine: each word's
+        # count on every page of its posting list, and each page's length
+        self.frequencies: Dict[str, array] = {}
+        self.lengths = array("I")
+        # held while a streaming crawl adds a page, so another thread holding
+        # it sees the index, documents and ranking data between two pages
+        self.index_lock = threading.Lock()
 
-    def _is_valid_link(self, link: str, current_depth: int) -> bool:
+    def _new_frontier(self) -> Frontier:
         """
-        Check if a link should be crawled based on depth and visited status.
-
-        Args:
-            link (str): URL to check
-            current_depth (int): Current crawl depth
+        Return a frontier holding the start URL, for a crawl to depth `max_depth`.
 
-        Returns:
-            bool: Whether the link should be crawled
+        Pages visited by an earlier crawl count as seen, so they are not fetched again.
         """
-        return (
-            current_depth <= self.max_depth and 
-            link not in self.visited and 
-            link.startswith(ALLOWED_DOMAINS)
-        )
+        seen = BloomFilter(self.bloom_capacity) if self.bloom_capacity else set()
+        for url in self.visited:
+            seen.add(url_key(url))
+        frontier = Frontier(self.max_depth, delay=self.crawl_delay, seen=seen)
+        frontier.add(self.start_url, 0)
+        self.frontier = frontier
+        return frontier
 
     def crawl(self) -> Dict[str, List[str]]:
         """
@@ -44,26 +164,97 @@ class WebCrawler:
         Returns:
             Dict[str, List[str]]: Mapping of URLs to words found on each page
         """
-        queue: List[Tuple[str, int]] = [(self.start_url, 0)]
+        frontier = self._new_frontier()
 
-        while queue:
-            url, depth = queue.pop(0)
+        if self.parse_workers:
+            with ProcessPoolExecutor(self.parse_workers) as executor:
+                self._crawl_by_level(frontier, executor)
+            return self.results
 
-            # Skip if link is invalid
-            if not self._is_valid_link(url, depth):
+        # every queued URL is new, allowed and within max_depth
+        while frontier:
+            url, depth = frontier.pop()
+            html = self._fetch_page(url)
+            if html is None:
                 continue
 
+            # Process the page
+            self._process_page(url, html, depth, frontier)
+
+        return self.results
+
+    def _crawl_by_level(self, frontier: Frontier, executor: Executor) -> None:
+        """
+        Crawl one depth at a time, fetching a level's pages and then parsing
+        them together.
+
+        Pages of a level are processed in queue order, so the results are the
+        same as crawling page by page.
+
+        Args:
+            frontier (Frontier): URLs to crawl
+            executor (Executor): Pool the pages are parsed in
+        """
+        while frontier:
+            depth, urls = frontier.pop_level()
+            pages = []
+            for url in urls:
+                frontier.wait(url)
+                html = self._fetch_page(url)
+                if html is not None:
+                    pages.append((url, html))
+            self._process_pages(pages, depth, frontier, executor)
+
+    def _fetch_page(self, url: str) -> Optional[str]:
+        """
+        Fetch a page, through `cache` and counting it in `stats` if set.
+
+        Args:
+            url (str): URL to fetch
+
+        Returns:
+            Optional[str]: The HTML of the page, or None if it could not be fetched
+        """
+        cache = self.cache
+        stats = self.stats
+        if cache is not None:
+            html = self._cached_page(url)
+            if html is not None or cache.replay:
+                return html
+
+        if stats is None:
             try:
                 html = fetch_html(url)
             except Exception:
-                continue
+                return None
+        else:
+            start = perf_counter()
+            try:
+                html = fetch_html(url)
+            except Exception as e:
+                stats.record_failure(e)
+                return None
+            stats.record_fetch(perf_counter() - start, len(html.encode("utf-8")))
 
-            # Process the page
-            self._process_page(url, html, depth, queue)
+        if cache is not None:
+            cache.put(url, html)
+        return html
 
-        return self.results
+    def _cached_page(self, url: str) -> Optional[str]:
+        """
+        Return the cached HTML of `url`, or None; in replay mode a miss counts
+        as a failed fetch.
+        """
+        html = self.cache.get(url)
+        if self.stats is not None:
+            if html is not None:
+                self.stats.record_cache_hit()
+            elif self.cache.replay:
+                self.stats.record_failure(
+                    FetchException(f"URL {url} is not in the cache"))
+        return html
 
-    def _process_page(self, url: str, html: str, depth: int, queue: List[Tuple[str, int]]):
+    def _process_page(self, url: str, html: str, depth: int, frontier: Frontier):
         """
         Process a single page during crawling.
 
@@ -71,70 +262,222 @@ class WebCrawler:
             url (str): URL of the current page
             html (str): HTML content of the page
             depth (int): Current crawl depth
-            queue (List[Tuple[str, int]]): Queue of URLs to crawl
+            frontier (Frontier): URLs to crawl
+        """
+        if self.stats is None:
+            words, links = parse_page(html, url, depth < self.max_depth, self.tokenizer)
+        else:
+            words, links, parse_seconds, tokenize_seconds = parse_page_timed(
+                html, url, depth < self.max_depth, self.tokenizer)
+            self.stats.record_parse(parse_seconds, 1, len(words))
+            self.stats.record_tokenize(tokenize_seconds)
+        self._record_page(url, words, links, depth, frontier)
+
+    def _process_pages(self, pages: List[Tuple[str, str]], depth: int,
+                       frontier: Frontier, executor: Optional[Executor] = None) -> None:
+        """
+        Process fetched (url, html) pages of one depth, in order.
+
+        Args:
+            pages (List[Tuple[str, str]]): URL and HTML of each page
+            depth (int): Crawl depth of the pages
+            frontier (Frontier): URLs to crawl
+            executor (Optional[Executor]): Pool to parse the pages in, if any
+        """
+        if executor is None:
+            for url, html in pages:
+                self._process_page(url, html, depth, frontier)
+            return
+
+        stats = self.stats
+        want_links = [depth < self.max_depth] * len(pages)
+        parsed = executor.map(
+            parse_page if stats is None else parse_page_timed,
+            [html for _, html in pages],
+            [url for url, _ in pages],
+            want_links,
+            [self.tokenizer] * len(pages),
+            chunksize=max(1, len(pages) // (4 * self.parse_workers or 1)),
+        )
+        # map yields in submission order, so merging stays deterministic
+        for (url, _), result in zip(pages, parsed):
+            if stats is None:
+                words, links = result
+            else:
+                # timed in the worker, so waiting and indexing are not counted
+                words, links, parse_seconds, tokenize_seconds = result
+                stats.record_parse(parse_seconds, 1, len(words))
+                stats.record_tokenize(tokenize_seconds)
+            self._record_page(url, words, links, depth, frontier)
+
+    def _record_page(self, url: str, words: List[str], links: List[str], depth: int,
+                     frontier: Frontier) -> None:
+        """
+        Store a parsed page's words and queue its links.
+
+        Args:
+            url (str): URL of the page
+            words (List[str]): Words on the page
+            links (List[str]): Absolute links on the page
+            depth (int): Crawl depth of the page
+            frontier (Frontier): URLs to crawl
         """
         self.visited.add(url)
-        words = get_text(html).split()
-        self.results[url] = words
+        if self.keep_results:
+            self.results[url] = words
+        if self.stream:
+            self._index_page(url, words)
+        self._queue_links(links, depth, frontier)
+
+    def _index_page(self, url: str, words: List[str]) -> None:
+        """
+        Add the URL of a just parsed page to the index under each distinct word on it.
+
+        Args:
+            url (str): URL of the page
+            words (List[str]): Words on the page
+        """
+        if self.index is None:
+            self.index = self.trie_class()
+        documents = self.documents
+        start = perf_counter()
+        with self.index_lock:
+            counts = self._count_words(documents.add(url), words)
+            self.index.bulk_update(
+                ((word, url) for word in counts),
+                factory=lambda urls: PostingList(documents, urls),
+            )
+        if self.stats is not None:
+            self.stats.record_index(perf_counter() - start, len(words))
+
+    def _count_words(self, doc_id: int, words: List[str],
+                     postings: Optional[Dict[str, array]] = None) -> Dict[str, int]:
+        """
+        Count a page's words once, recording its term frequencies and length.
+
+        Each distinct word reaches the trie once, however often the page
+        repeats it, and new words are interned. Pages must be counted in
+        document id order, which keeps each word's counts in the order of
+        its posting list.
+
+        Args:
+            doc_id (int): Document id of the page
+            words (List[str]): Words on the page
+            postings (Optional[Dict[str, array]]): Document ids of each word,
+                the page's id is appended for each of its words
+
+        Returns:
+            Dict[str, int]: Each distinct normalized word and its count on the page
+        """
+        counts = Counter(normalize_keys(words))
+
+        lengths = self.lengths
+        if doc_id >= len(lengths):
+            lengths.extend([0] * (doc_id + 1 - len(lengths)))
+        lengths[doc_id] = len(words)
+        frequencies = self.frequencies
+        for word, count in counts.items():
+            column = frequencies.get(word)
+            if column is None:
+                # one copy of each word for the whole index
+                word = intern(word)
+                frequencies[word] = array("I", (count,))
+                if postings is not None:
+                    postings[word] = array("I", (doc_id,))
+            else:
+                column.append(count)
+                if postings is not None:
+                    postings[word].append(doc_id)
+        return counts
 
+    def _queue_links(self, links: List[str], depth: int, frontier: Frontier) -> None:
+        """
+        Queue the links found on a page at `depth`; the frontier drops those
+        not worth crawling.
+
+        Args:
+            links (List[str]): Absolute links on the page
+            depth (int): Crawl depth of the page
+            frontier (Frontier): URLs to crawl
+        """
         if depth < self.max_depth:
-            links = get_links(html, url)
-            new_links = [
-                (link, depth + 1) 
-                for link in links 
-                if self._is_valid_link(link, depth + 1)
-            ]
-            queue.extend(new_links)
+            for link in links:
+                frontier.add(link, depth + 1)
 
     def build_index(self) -> Trie:
         """
         Build a Trie index of words to URLs.
 
         Returns:
-            Trie: Indexed words mapped to URLs
+            Trie: Indexed words mapped to a PostingList of the URLs they appear on
         """
+        if self.stream:
+            # the index was built during the crawl
+            if self.index is None:
+                self.crawl()
+            if self.index is None:
+                self.index = self.trie_class()
+            return self.index
+
         # If crawl hasn't been performed, perform it
         if not self.results:
             self.crawl()
 
-        trie = Trie()
-        for url, words in self.results.items():
-            for word in words:
-                # Normalize word to lowercase
-                word = word.lower()
-                if word not in trie:
-                    trie[word] = set()
-                trie[word].add(url)
+        # Each page's words are counted once, so every word of a page costs
+        # one step however often it appears. Pages go in document id order,
+        # which lists each word's pages already sorted, as a PostingList
+        # keeps them; bulk_load then inserts each word once, in trie order.
+        start = perf_counter()
+        documents = self.documents
+        self.frequencies = {}
+        self.lengths = array("I")
+        pages = sorted(((documents.add(url), words)
+                        for url, words in self.results.items()),
+                       key=itemgetter(0))
+        postings: Dict[str, array] = {}
+        for doc_id, words in pages:
+            self._count_words(doc_id, words, postings)
+        trie = self.trie_class()
+        trie.bulk_load((word, PostingList.from_ids(documents, ids))
+                       for word, ids in postings.items())
+        if self.stats is not None:
+            words = sum(len(words) for words in self.results.values())
+            self.stats.record_index(perf_counter() - start, words)
 
         return trie
 
 
 # Convenience functions maintaining original interface
-def crawl_site(start_url: str, max_depth: int) -> Dict[str, List[str]]:
+def crawl_site(start_url: str, max_depth: int,
+               cache: Optional[ResponseCache] = None) -> Dict[str, List[str]]:
     """
     Compatibility wrapper for the original crawl_site function.
     
     Args:
         start_url (str): URL to start crawling
         max_depth (int): Maximum crawl depth
+        cache (Optional[ResponseCache]): Cache to read pages through, if any
     
     Returns:
         Dict[str, List[str]]: Mapping of URLs to words
     """
-    crawler = WebCrawler(start_url, max_depth)
+    crawler = WebCrawler(start_url, max_depth, cache=cache)
     return crawler.crawl()
 
 
-def build_index(site_url: str, max_depth: int) -> Trie:
+def build_index(site_url: str, max_depth: int, trie_class: Type[Trie] = Trie,
+                cache: Optional[ResponseCache] = None) -> Trie:
     """
     Compatibility wrapper for the original build_index function.
     
     Args:
         site_url (str): URL to start crawling
         max_depth (int): Maximum crawl depth
+        trie_class (Type[Trie]): Trie implementation to build
+        cache (Optional[ResponseCache]): Cache to read pages through, if any
     
     Returns:
         Trie: Indexed words mapped to URLs
     """
-    crawler = WebCrawler(site_url, max_depth)
+    crawler = WebCrawler(site_url, max_depth, trie_class, cache=cache)
     return crawler.build_index()
\ No newline at end of file
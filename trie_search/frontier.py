@@ -0,0 +1,232 @@
+import hashlib
+import math
+import time
+from heapq import heappop, heappush
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit, urlunsplit
+
+from .utils import ALLOWED_DOMAINS
+
+_DEFAULT_PORTS = {"http": ":80", "https": ":443"}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Rewrite a URL in one standard form, so equivalent links are fetched once.
+
+    The scheme and host are lowercased, a default port and the fragment are
+    dropped, an empty path or "/" alone is removed ("https://example.com/"
+    becomes "https://example.com") and query parameters are sorted by name.
+    The rest of the path is kept as is: "/parks/" and "/parks" can be
+    different pages, see url_key.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    userinfo, at, host = parts.netloc.rpartition("@")
+    host = host.lower()
+    port = _DEFAULT_PORTS.get(scheme)
+    if port is not None and host.endswith(port):
+        host = host[:-len(port)]
+    path = "" if parts.path == "/" else parts.path
+    query = parts.query
+    if "&" in query:
+        # stable, so repeated parameters keep their order
+        query = "&".join(sorted((pair for pair in query.split("&") if pair),
+                                key=lambda pair: pair.partition("=")[0]))
+    return urlunsplit((scheme, userinfo + at + host, path, query, ""))
+
+
+def url_key(url: str) -> str:
+    """
+    Return the key a canonical URL is deduplicated by: the URL without a trailing slash.
+    """
+    base, question, query = url.partition("?")
+    return base.rstrip("/") + question + query
+
+
+class BloomFilter:
+    """
+    A fixed-size set of strings that may answer "seen" for a string never added.
+
+    Takes about 1.8 bytes per item at a 0.1% false positive rate, whatever
+    the length of the strings, instead of keeping every string. Used as the
+    frontier's seen set on very large crawls, where skipping a few
+    unvisited URLs is acceptable.
+    """
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        """
+        Args:
+            capacity (int): Number of items the error rate is for
+            error_rate (float): Chance of a false positive once `capacity` items are in
+        """
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError("capacity must be positive and error_rate between 0 and 1")
+        optimal = -capacity * math.log(error_rate) / math.log(2) ** 2
+        self.size = max(8, math.ceil(optimal))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> List[int]:
+        # double hashing: k positions from two halves of one digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str) -> None:
+        bits = self.bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: object) -> bool:
+        if not isinstance(item, str):
+            return False
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(item))
+
+
+class Frontier:
+    """
+    The URLs a crawl has still to fetch, with the depth each was found at.
+
+    add canonicalizes a URL and drops it straight away if it is too deep,
+    outside the allowed domains or was ever added before, so every URL is
+    queued (and fetched) at most once and the queue holds no duplicates.
+    URLs are queued per host; pop returns the shallowest URL, first found
+    first, of any host that may be fetched from now, which without a delay
+    is the order of a breadth-first crawl.
+
+    With a `delay`, fetches from one host are at least that many seconds
+    apart: pop prefers hosts that are ready and sleeps only when none is,
+    and reserve books a slot for crawlers that fetch a whole level at once.
+    """
+    def __init__(self, max_depth: int, allowed: Tuple[str, ...] = ALLOWED_DOMAINS,
+                 delay: float = 0.0, seen: Optional[Union[set, BloomFilter]] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            max_depth (int): Deepest depth a URL is queued at
+            allowed (Tuple[str, ...]): Prefixes a URL must start with
+            delay (float): Minimum seconds between two fetches from one host
+            seen (Optional[Union[set, BloomFilter]]): Keys of URLs added so
+                far, a new set by default; a BloomFilter bounds its memory
+            clock (Callable[[], float]): Current time in seconds
+            sleep (Callable[[float], None]): Waits for a number of seconds
+        """
+        self.max_depth = max_depth
+        self.allowed = allowed
+        self.delay = delay
+        self.seen = seen if seen is not None else set()
+        self.clock = clock
+        self.sleep = sleep
+        # host -> heap of (depth, order added, url)
+        self._queues: Dict[str, list] = {}
+        # host -> earliest time its next fetch may start
+        self._next_fetch: Dict[str, float] = {}
+        self._added = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, url: str, depth: int) -> bool:
+        """
+        Queue `url` found at `depth`, returning whether it was new and crawlable.
+        """
+        if depth > self.max_depth:
+            return False
+        url = canonicalize_url(url)
+        if not url.startswith(self.allowed):
+            return False
+        key = url_key(url)
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        host = urlsplit(url).netloc
+        queue = self._queues.get(host)
+        if queue is None:
+            queue = self._queues[host] = []
+        heappush(queue, (depth, self._added, url))
+        self._added += 1
+        self._size += 1
+        return True
+
+    def _take(self, host: str) -> Tuple[int, int, str]:
+        queue = self._queues[host]
+        entry = heappop(queue)
+        if not queue:
+            del self._queues[host]
+        self._size -= 1
+        return entry
+
+    def pop(self) -> Tuple[str, int]:
+        """
+        Remove and return the next (url, depth) to fetch, waiting for its host
+        if needed.
+
+        Raises:
+            IndexError: if the frontier is empty
+        """
+        if not self._size:
+            raise IndexError("pop from an empty frontier")
+        queues = self._queues
+        if not self.delay:
+            host = min(queues, key=lambda host: queues[host][0])
+        else:
+            now = self.clock()
+            next_fetch = self._next_fetch
+            ready = [host for host in queues if next_fetch.get(host, now) <= now]
+            if ready:
+                host = min(ready, key=lambda host: queues[host][0])
+            else:
+                host = min(queues, key=lambda host: next_fetch[host])
+            seconds = self._reserve(host)
+            if seconds > 0:
+                self.sleep(seconds)
+        depth, _, url = self._take(host)
+        return url, depth
+
+    def pop_level(self) -> Tuple[int, List[str]]:
+        """
+        Remove and return every queued URL of the shallowest depth, in the
+        order they were added.
+
+        Does not wait for hosts; call reserve or wait before each fetch.
+
+        Raises:
+            IndexError: if the frontier is empty
+        """
+        if not self._size:
+            raise IndexError("pop from an empty frontier")
+        depth = min(queue[0][0] for queue in self._queues.values())
+        entries = []
+        for host in list(self._queues):
+            while host in self._queues and self._queues[host][0][0] == depth:
+                entries.append(self._take(host))
+        entries.sort()
+        return depth, [url for _, _, url in entries]
+
+    def reserve(self, url: str) -> float:
+        """
+        Book the next fetch from the host of `url` and return how many
+        seconds to wait for it.
+        """
+        if not self.delay:
+            return 0.0
+        return self._reserve(urlsplit(url).netloc)
+
+    def _reserve(self, host: str) -> float:
+        now = self.clock()
+        start = max(now, self._next_fetch.get(host, now))
+        self._next_fetch[host] = start + self.delay
+        return start - now
+
+    def wait(self, url: str) -> None:
+        """
+        Reserve a fetch from the host of `url` and sleep until it may start.
+        """
+        seconds = self.reserve(url)
+        if seconds > 0:
+            self.sleep(seconds)
@@ -0,0 +1,128 @@
+import gzip
+import hashlib
+import os
+import time
+import zlib
+from typing import Callable, Iterator, Optional, Tuple
+
+from .frontier import canonicalize_url
+
+
+class ResponseCache:
+    """
+    Fetched pages kept on disk, so a crawl can be run again without the network.
+
+    Each page is stored gzip-compressed in a file named after the SHA-256
+    of its canonical URL, so links differing only by a fragment share an
+    entry. A file's modification time is when the page was fetched; a
+    page older than `ttl` seconds is fetched again. With `max_bytes` the
+    oldest pages are deleted once the files take more than that.
+
+    In replay mode only the cache is read: every cached page is used
+    whatever its age and pages that are not cached count as failed
+    fetches, so a crawl recorded once can be rerun offline.
+    """
+    def __init__(self, directory: str, ttl: Optional[float] = 7 * 24 * 3600,
+                 max_bytes: Optional[int] = None, replay: bool = False,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            directory (str): Where the cache files are, created if missing
+            ttl (Optional[float]): Seconds a page stays fresh, None for ever
+            max_bytes (Optional[int]): Most bytes of compressed pages to keep
+            replay (bool): Never fetch, only serve what is cached
+            clock (Callable[[], float]): Current time in seconds since the epoch
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.replay = replay
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self.bytes = sum(size for _, size, _ in self._entries())
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha256(canonicalize_url(url).encode("utf-8")).hexdigest()
+        # a level of subdirectories keeps directories small on large crawls
+        return os.path.join(self.directory, key[:2], key + ".gz")
+
+    def _entries(self) -> Iterator[Tuple[float, int, str]]:
+        """
+        Yield (fetch time, size, path) of every cached page.
+        """
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".gz"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, path
+
+    def _remove(self, path: str) -> None:
+        try:
+            size = os.stat(path).st_size
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        self.bytes -= size
+
+    def get(self, url: str) -> Optional[str]:
+        """
+        Return the cached HTML of `url`, or None if it is not cached or too old.
+        """
+        path = self._path(url)
+        try:
+            fetched = os.stat(path).st_mtime
+            expired = self.ttl is not None and self.clock() - fetched > self.ttl
+            if not self.replay and expired:
+                self._remove(path)
+                self.misses += 1
+                return None
+            with open(path, "rb") as file:
+                html = gzip.decompress(file.read()).decode("utf-8")
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, EOFError, zlib.error, UnicodeDecodeError):
+            # a damaged entry, e.g. from a crash; fetch the page again
+            self._remove(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return html
+
+    def put(self, url: str, html: str) -> None:
+        """
+        Store the HTML fetched from `url`, evicting the oldest pages if over
+        `max_bytes`.
+        """
+        path = self._path(url)
+        data = gzip.compress(html.encode("utf-8"), mtime=0)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # written aside and renamed, so a reader never sees half a file
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(data)
+        now = self.clock()
+        os.utime(temporary, (now, now))
+        self._remove(path)
+        os.replace(temporary, path)
+        self.bytes += len(data)
+        if self.max_bytes is not None and self.bytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self) -> None:
+        """
+        Delete the oldest pages until the cache is back under 90% of `max_bytes`.
+
+        Going below the limit means the directory is not scanned on every put.
+        """
+        target = self.max_bytes * 0.9
+        for _, _, path in sorted(self._entries()):
+            if self.bytes <= target:
+                break
+            self._remove(path)
@@ -0,0 +1,291 @@
+import hashlib
+import json
+from time import perf_counter
+from typing import Dict, List, Optional, Set, Type
+
+import httpx
+
+from .crawler import WebCrawler, parse_page, parse_page_timed
+from .frontier import Frontier
+from .postings import DocumentTable, PostingList
+from .stats import CrawlStats
+from .tokenizer import Tokenizer
+from .trie import Trie, normalize_key
+from .utils import FetchException
+
+
+class CrawlState:
+    """
+    What an incremental crawl remembers about each page between runs.
+
+    `pages` maps a URL to a dict with the page's validators ("etag",
+    "last_modified"), a "hash" of its HTML, the sorted normalized "words"
+    it was indexed under and the "links" it contains, so an unchanged page
+    can be skipped without losing the pages it leads to.
+    """
+    def __init__(self, pages: Optional[Dict[str, dict]] = None):
+        self.pages: Dict[str, dict] = pages if pages is not None else {}
+
+    @classmethod
+    def load(cls, path: str) -> "CrawlState":
+        """
+        Read a state saved by save.
+        """
+        with open(path, encoding="utf-8") as file:
+            return cls(json.load(file))
+
+    def save(self, path: str) -> None:
+        """
+        Write the state to `path` as JSON.
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.pages, file)
+
+
+class IncrementalCrawler(WebCrawler):
+    """
+    A web crawler that keeps an index up to date across runs.
+
+    Every page is requested with If-None-Match / If-Modified-Since from the
+    previous run. Pages answering 304, or with the same content hash, are
+    not parsed again; their stored links keep the crawl going. Only new and
+    changed pages are parsed, and update_index applies just the words they
+    gained or lost to the trie. Pages that are gone (404/410, or no longer
+    linked) are removed from every word, and a word whose last URL goes is
+    deleted from the trie. A page that fails to fetch or answers another
+    error status (a 503, a redirect loop, ...) keeps its indexed words.
+
+    `results` only holds the pages parsed in this run.
+    """
+    def __init__(
+        self,
+        start_url: str,
+        max_depth: int,
+        state: Optional[CrawlState] = None,
+        trie: Optional[Trie] = None,
+        documents: Optional[DocumentTable] = None,
+        trie_class: Type[Trie] = Trie,
+        timeout: float = 10.0,
+        transport: Optional[httpx.BaseTransport] = None,
+        stats: Optional[CrawlStats] = None,
+        tokenizer: Optional[Tokenizer] = None,
+    ):
+        """
+        Initialize the crawler.
+
+        Args:
+            start_url (str): The initial URL to start crawling from
+            max_depth (int): Maximum depth to crawl into the website
+            state (Optional[CrawlState]): State from the previous run, if any
+            trie (Optional[Trie]): Index from the previous run; rebuilt from
+                `state` when not given
+            documents (Optional[DocumentTable]): The table the posting lists
+                of `trie` use; required along with `trie`
+            trie_class (Type[Trie]): Trie implementation used when rebuilding
+            timeout (float): Per-request timeout in seconds
+            transport (Optional[httpx.BaseTransport]): Transport for the client,
+                e.g. httpx.MockTransport in tests
+            stats (Optional[CrawlStats]): Where to count fetches, parse and
+                index times, None to not measure anything
+            tokenizer (Optional[Tokenizer]): Splits each page's text into
+                words, None splits it on whitespace; use the same one every run
+        """
+        super().__init__(start_url, max_depth, trie_class, stats=stats,
+                         tokenizer=tokenizer)
+        self.state = state if state is not None else CrawlState()
+        self.trie = trie
+        if documents is not None:
+            self.documents = documents
+        self.timeout = timeout
+        self.transport = transport
+        # filled by crawl: new state of each parsed page, pages found unchanged,
+        # and previously indexed pages that could not be fetched (kept as they were)
+        self.changed: Dict[str, dict] = {}
+        self.unchanged: Set[str] = set()
+        self.failed: Set[str] = set()
+
+    def _fetch(self, client: httpx.Client, url: str) -> httpx.Response:
+        """
+        Request `url`, conditional on the validators stored for it.
+
+        Raises:
+            FetchException: if the request fails
+        """
+        headers = {}
+        previous = self.state.pages.get(url, {})
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+        try:
+            return client.get(url, headers=headers)
+        except Exception as e:
+            raise FetchException(str(e))
+
+    def crawl(self) -> Dict[str, List[str]]:
+        """
+        Crawl the website, parsing only pages that are new or changed.
+
+        Returns:
+            Dict[str, List[str]]: Mapping of new and changed URLs to their words
+        """
+        frontier = self._new_frontier()
+
+        with httpx.Client(timeout=self.timeout, transport=self.transport) as client:
+            while frontier:
+                url, depth = frontier.pop()
+                self.visited.add(url)
+                previous = self.state.pages.get(url)
+
+                start = perf_counter()
+                try:
+                    response = self._fetch(client, url)
+                except FetchException as e:
+                    if self.stats is not None:
+                        self.stats.record_failure(e)
+                    self._keep_page(url, previous, depth, frontier)
+                    continue
+
+                if self.stats is not None:
+                    # a 304 is a fetch too, just a cheap one
+                    self.stats.record_fetch(perf_counter() - start,
+                                            len(response.content))
+
+                if response.status_code == 304 and previous is not None:
+                    self.unchanged.add(url)
+                    self._queue_links(previous["links"], depth, frontier)
+                    continue
+                if response.status_code in (404, 410):
+                    continue
+                if not response.is_success:
+                    # e.g. a 503 maintenance page, not the page's content
+                    if self.stats is not None:
+                        self.stats.record_failure(
+                            FetchException(f"HTTP {response.status_code}"))
+                    self._keep_page(url, previous, depth, frontier)
+                    continue
+
+                html = response.text
+                digest = hashlib.sha256(html.encode("utf-8")).hexdigest()
+                entry = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "hash": digest,
+                }
+                if previous is not None and previous["hash"] == digest:
+                    # same content, only the validators may have changed
+                    previous.update(entry)
+                    self.unchanged.add(url)
+                    self._queue_links(previous["links"], depth, frontier)
+                    continue
+
+                if self.stats is None:
+                    words, links = parse_page(html, url, tokenizer=self.tokenizer)
+                else:
+                    words, links, parse_seconds, tokenize_seconds = parse_page_timed(
+                        html, url, tokenizer=self.tokenizer)
+                    self.stats.record_parse(parse_seconds, 1, len(words))
+                    self.stats.record_tokenize(tokenize_seconds)
+                entry["words"] = sorted({normalize_key(word) for word in words})
+                entry["links"] = links
+                self.changed[url] = entry
+                self.results[url] = words
+                self._queue_links(links, depth, frontier)
+
+        return self.results
+
+    def _keep_page(self, url: str, previous: Optional[dict], depth: int,
+                   frontier: Frontier) -> None:
+        """
+        Keep a page that could not be fetched as it was indexed, if it was.
+
+        A transient failure should not drop a page from the index; its
+        stored links are queued so the pages it leads to are still crawled.
+        """
+        if previous is not None:
+            self.failed.add(url)
+            self.unchanged.add(url)
+            self._queue_links(previous["links"], depth, frontier)
+
+    def _rebuild_trie(self) -> Trie:
+        """
+        Build the index of the previous run from the words stored in the state.
+        """
+        documents = self.documents
+        trie = self.trie_class()
+        trie.bulk_update(
+            ((word, url) for url, page in self.state.pages.items()
+             for word in page["words"]),
+            factory=lambda urls: PostingList(documents, urls),
+        )
+        return trie
+
+    def update_index(self) -> Trie:
+        """
+        Crawl, then apply the words gained and lost by each page to the index.
+
+        The state is updated to describe this run; save it for the next one.
+
+        Returns:
+            Trie: The updated index
+        """
+        if self.trie is None:
+            self.trie = self._rebuild_trie()
+        self.crawl()
+
+        start = perf_counter()
+        pages = self.state.pages
+        removed = [url for url in pages
+                   if url not in self.changed and url not in self.unchanged]
+        for url in removed:
+            self._remove_words(url, pages.pop(url)["words"])
+
+        for url, entry in self.changed.items():
+            old_words = set(pages[url]["words"]) if url in pages else set()
+            new_words = set(entry["words"])
+            self._remove_words(url, old_words - new_words)
+            self._add_words(url, new_words - old_words)
+            pages[url] = entry
+
+        if self.stats is not None:
+            changed_words = sum(len(entry["words"]) for entry in self.changed.values())
+            self.stats.record_index(perf_counter() - start, changed_words)
+        return self.trie
+
+    def _add_words(self, url: str, words: Set[str]) -> None:
+        """
+        Add `url` to the posting list of every word in `words`.
+        """
+        trie = self.trie
+        for word in words:
+            postings = trie.get(word)
+            if postings is None:
+                postings = PostingList(self.documents)
+            postings.add(url)
+            # store it back so the trie sees the change
+            trie[word] = postings
+
+    def _remove_words(self, url: str, words: Set[str]) -> None:
+        """
+        Remove `url` from the posting list of every word in `words`, deleting
+        emptied words.
+        """
+        trie = self.trie
+        for word in words:
+            postings = trie.get(word)
+            if postings is None:
+                continue
+            postings.discard(url)
+            if postings:
+                trie[word] = postings
+            else:
+                del trie[word]
+
+    def build_index(self) -> Trie:
+        """
+        Build or update the index, see update_index.
+
+        Returns:
+            Trie: Indexed words mapped to a PostingList of the URLs they appear on
+        """
+        return self.update_index()
@@ -0,0 +1,277 @@
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Any, BinaryIO, Iterator, Optional
+
+from .postings import DocumentTable, PostingList
+from .trie import Trie, encode_key
+
+# File layout, all integers in native byte order (recorded in the header):
+#
+#   header     MAGIC, format version, byte order flag, then the counts and
+#              (offset, length) of every section below
+#   labels     u8  per node   character_to_key index of the edge into the node
+#   first      u32 per node   id of the node's first child
+#   counts     u8  per node   number of children, which have consecutive ids
+#   slots      i32 per node   index of the node's value, -1 if no key ends here
+#   postings   u32 per value + 1, start of each value's list in `items`
+#   items      u32            string ids, the values' items
+#   offsets    u32 per string + 1, start of each string in `strings`
+#   strings    utf-8 bytes of every distinct string
+#
+# Nodes are numbered breadth first, so the children of a node are a
+# contiguous run sorted by label. Every section starts 8-byte aligned.
+
+MAGIC = b"TRIEIDX1"
+VERSION = 1
+_HEADER = struct.Struct("=8sIIQQQ" + "QQ" * 8)
+_SECTIONS = ("labels", "first", "counts", "slots",
+             "postings", "items", "offsets", "strings")
+_FORMATS = {"labels": "B", "first": "I", "counts": "B", "slots": "i",
+            "postings": "I", "items": "I", "offsets": "I", "strings": "B"}
+
+
+def write_trie(trie: Trie, file: BinaryIO) -> None:
+    """
+    Write `trie` to an open binary file in the MappedTrie format.
+
+    Every value must be a collection of strings, like the PostingLists of
+    URLs built by build_index; the strings are stored once in a shared table.
+
+    Raises:
+        TypeError: if a value is not a collection of strings
+    """
+    labels = bytearray()
+    first = array("I")
+    counts = bytearray()
+    slots = array("i")
+    values = []
+
+    # breadth first, so each node's children get consecutive ids
+    level = [(0, trie._root())]
+    next_id = 1
+    while level:
+        next_level = []
+        for label, node in level:
+            labels.append(label)
+            children = list(trie._children(node))
+            first.append(next_id)
+            counts.append(len(children))
+            next_id += len(children)
+            next_level.extend(children)
+
+            if not trie._has_value(node):
+                slots.append(-1)
+                continue
+            value = trie._value(node)
+            if (isinstance(value, str)
+                    or not all(isinstance(item, str) for item in value)):
+                raise TypeError(f"can only save collections of strings, not {value!r}")
+            slots.append(len(values))
+            values.append(value)
+        level = next_level
+
+    # sorted, so a string's id can be found again by binary search
+    string_list = sorted({item for value in values for item in value})
+    string_ids = {string: string_id for string_id, string in enumerate(string_list)}
+    postings = array("I", [0])
+    items = array("I")
+    for value in values:
+        items.extend(sorted(string_ids[item] for item in value))
+        postings.append(len(items))
+
+    offsets = array("I", [0])
+    strings = bytearray()
+    for string in string_list:
+        strings += string.encode("utf-8")
+        offsets.append(len(strings))
+
+    sections = [bytes(labels), first.tobytes(), bytes(counts), slots.tobytes(),
+                postings.tobytes(), items.tobytes(), offsets.tobytes(), bytes(strings)]
+    position = _HEADER.size
+    layout = []
+    for data in sections:
+        position += -position % 8
+        layout.extend((position, len(data)))
+        position += len(data)
+
+    file.write(_HEADER.pack(MAGIC, VERSION, sys.byteorder == "little",
+                            len(labels), len(trie), len(string_ids), *layout))
+    position = _HEADER.size
+    for offset, data in zip(layout[::2], sections):
+        file.write(b"\0" * (offset - position))
+        file.write(data)
+        position = offset + len(data)
+
+
+class MappedDocuments(DocumentTable):
+    """
+    The read-only DocumentTable of a saved index, decoding URLs from the file on demand.
+
+    URLs are stored sorted, so looking up the id of one is a binary search.
+    """
+    def __init__(self, offsets: memoryview, strings: memoryview):
+        self._offsets = offsets
+        self._strings = strings
+        # nothing is cached in memory, lookups go through get_id
+        self.ids: dict[str, int] = {}
+
+    def __getitem__(self, doc_id: int) -> str:
+        start, end = self._offsets[doc_id], self._offsets[doc_id + 1]
+        return str(self._strings[start:end], "utf-8")
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def get_id(self, url: str) -> Optional[int]:
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self[middle] < url:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self) and self[low] == url:
+            return low
+        return None
+
+    def add(self, url: str) -> int:
+        doc_id = self.get_id(url)
+        if doc_id is None:
+            raise TypeError("the documents of a MappedTrie are read-only")
+        return doc_id
+
+
+class MappedTrie(Trie):
+    """
+    A read-only Trie served straight from a file written by Trie.save.
+
+    The file is memory mapped and the node arrays are read through
+    memoryviews, so opening it costs the same whatever its size, only the
+    pages a query touches are read, and processes mapping the same file
+    share one copy in the page cache.
+
+    Values come back as PostingLists over the file's string table.
+    Use as a context manager, or call close(), to release the file.
+    """
+
+    def __init__(self, path: str):
+        """
+        Raises:
+            ValueError: if the file is not a complete index saved on a
+                machine with the same byte order
+        """
+        with open(path, "rb") as file:
+            try:
+                self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # an empty file cannot be mapped
+                raise ValueError(f"{path} is not a saved trie index") from None
+        self._buffer = memoryview(self._mmap)
+        try:
+            self._map_sections(path)
+        except BaseException:
+            self.close()
+            raise
+        self._init_caches()
+
+    def _map_sections(self, path: str) -> None:
+        """
+        Check the header of the mapped file and set up a view of each section.
+        """
+        if len(self._buffer) < _HEADER.size:
+            raise ValueError(f"{path} is not a saved trie index")
+        header = _HEADER.unpack_from(self._buffer)
+        magic, version, little, self._node_count, self.size, _ = header[:6]
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a saved trie index")
+        if little != (sys.byteorder == "little"):
+            raise ValueError(
+                f"{path} was saved on a machine with a different byte order")
+
+        layout = header[6:]
+        for index, name in enumerate(_SECTIONS):
+            offset, length = layout[2 * index], layout[2 * index + 1]
+            itemsize = struct.calcsize(_FORMATS[name])
+            if offset + length > len(self._buffer) or length % itemsize:
+                raise ValueError(f"{path} is truncated or damaged")
+            view = self._buffer[offset:offset + length].cast(_FORMATS[name])
+            setattr(self, "_" + name, view)
+        self.documents = MappedDocuments(self._offsets, self._strings)
+
+    def close(self) -> None:
+        """
+        Release the memory map. The trie cannot be used afterwards.
+        """
+        self.__dict__.pop("documents", None)
+        for name in _SECTIONS:
+            view = self.__dict__.pop("_" + name, None)
+            if view is not None:
+                view.release()
+        self._buffer.release()
+        self._mmap.close()
+
+    def __enter__(self) -> "MappedTrie":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _root(self) -> int:
+        return 0
+
+    def _child(self, node: int, index: int) -> Any:
+        start = self._first[node]
+        end = start + self._counts[node]
+        labels = self._labels
+        child = bisect_left(labels, index, start, end)
+        if child < end and labels[child] == index:
+            return child
+        return None
+
+    def _children(self, node: int) -> Iterator[tuple[int, int]]:
+        start = self._first[node]
+        labels = self._labels
+        for child in range(start, start + self._counts[node]):
+            yield labels[child], child
+
+    def _has_value(self, node: int) -> bool:
+        return self._slots[node] != -1
+
+    def _value(self, node: int) -> PostingList:
+        slot = self._slots[node]
+        ids = array("I", self._items[self._postings[slot]:self._postings[slot + 1]])
+        return PostingList.from_ids(self.documents, ids)
+
+    def __getitem__(self, key: str) -> Any:
+        """
+        Given a key, return the value associated with it in the trie.
+
+        If the key has not been added to this trie, raise `KeyError(key)`.
+        If the key is not a string, raise `KeyError(key)`
+        """
+        if not isinstance(key, str):
+            raise KeyError(key)
+
+        node = 0
+        for index in encode_key(key):
+            node = self._child(node, index)
+            if node is None:
+                raise KeyError(key)
+        if self._slots[node] == -1:
+            raise KeyError(key)
+        return self._value(node)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        raise TypeError("MappedTrie is read-only")
+
+    def __delitem__(self, key: str) -> None:
+        raise TypeError("MappedTrie is read-only")
+
+    def _ensure_child(self, node: int, index: int) -> int:
+        raise TypeError("MappedTrie is read-only")
+
+    def _store(self, node: int, value: Any) -> None:
+        raise TypeError("MappedTrie is read-only")
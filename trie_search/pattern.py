@@ -0,0 +1,185 @@
+import threading
+from functools import lru_cache
+from typing import Optional
+
+from .trie import KEY_CHARS, character_to_key
+
+# a compiled pattern is a list of tokens: STAR, or the frozenset of
+# character_to_key indexes one character may take (all of them for '?')
+STAR = None
+_ANY = frozenset(range(len(KEY_CHARS)))
+# a state allowing more characters than this goes over a node's children
+# instead of looking each allowed character up
+_PROBE_LIMIT = 8
+
+
+def _parse_class(pattern: str, start: int) -> tuple[frozenset, int]:
+    """
+    Parse the class starting after the '[' at pattern[start - 1].
+
+    Returns the set of indexes it matches and the position after its ']'.
+
+    Raises:
+        ValueError: if the class is not closed
+    """
+    i = start
+    negate = i < len(pattern) and pattern[i] in "!^"
+    if negate:
+        i += 1
+    indexes = set()
+    first = True
+    while i < len(pattern) and (pattern[i] != "]" or first):
+        first = False
+        char = pattern[i]
+        if i + 2 < len(pattern) and pattern[i + 1] == "-" and pattern[i + 2] != "]":
+            # a range such as a-f, by key index so it stays inside the 27 characters
+            low, high = character_to_key(char), character_to_key(pattern[i + 2])
+            indexes.update(range(low, high + 1))
+            i += 3
+        else:
+            indexes.add(character_to_key(char))
+            i += 1
+    if i == len(pattern):
+        raise ValueError(f"unterminated character class in {pattern!r}")
+    return (_ANY - indexes if negate else frozenset(indexes)), i + 1
+
+
+class GlobPattern:
+    """
+    A glob pattern compiled into a lazily built deterministic automaton over
+    key indexes.
+
+    Supports '?' (any one character), '*' (any run of characters, possibly
+    empty), '[abc]' / '[a-c]' classes and '[!abc]' negated classes; every
+    other character matches itself after normalization, like a trie key.
+
+    A state is the set of pattern positions the text read so far can be at.
+    States and their transitions are numbered and cached as they are first
+    needed, so a trie walk carries a single state per node and never
+    backtracks, however many '*' the pattern has. Several threads may use
+    one pattern; new states are added under a lock.
+    """
+    DEAD = 0
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.tokens: list[Optional[frozenset]] = []
+        i = 0
+        while i < len(pattern):
+            char = pattern[i]
+            if char == "*":
+                # '**' matches the same as '*'
+                if not self.tokens or self.tokens[-1] is not STAR:
+                    self.tokens.append(STAR)
+                i += 1
+            elif char == "?":
+                self.tokens.append(_ANY)
+                i += 1
+            elif char == "[":
+                indexes, i = _parse_class(pattern, i + 1)
+                self.tokens.append(indexes)
+            else:
+                self.tokens.append(frozenset((character_to_key(char),)))
+                i += 1
+
+        # per state: its positions, its transitions (index -> state, filled
+        # on demand), whether it accepts, and the sorted indexes it can move
+        # on (None when there are more than _PROBE_LIMIT of them)
+        self._positions: list[frozenset] = []
+        self._transitions: list[dict[int, int]] = []
+        self.accepting: list[bool] = []
+        self.moves: list[Optional[tuple[int, ...]]] = []
+        self._numbers: dict[frozenset, int] = {}
+        # compiled patterns are shared between threads, see compile_glob
+        self._lock = threading.Lock()
+        self._state(frozenset())
+        self.start = self._state(self._closure({0}))
+
+    def _closure(self, positions: set) -> frozenset:
+        """
+        Add the positions reachable by letting each '*' match nothing.
+        """
+        tokens = self.tokens
+        stack = list(positions)
+        result = set(positions)
+        while stack:
+            position = stack.pop()
+            if (position < len(tokens) and tokens[position] is STAR
+                    and position + 1 not in result):
+                result.add(position + 1)
+                stack.append(position + 1)
+        return frozenset(result)
+
+    def _state(self, positions: frozenset) -> int:
+        """
+        Return the number of the state for `positions`, creating it if new.
+        """
+        state = self._numbers.get(positions)
+        if state is not None:
+            return state
+        tokens = self.tokens
+        moves: Optional[set] = set()
+        for position in positions:
+            if position == len(tokens):
+                continue
+            token = tokens[position]
+            if token is STAR or token is _ANY:
+                moves = None
+                break
+            moves |= token
+        if moves is not None and len(moves) > _PROBE_LIMIT:
+            moves = None
+        with self._lock:
+            state = self._numbers.get(positions)
+            if state is not None:
+                return state
+            state = len(self._positions)
+            self._positions.append(positions)
+            self._transitions.append({})
+            self.accepting.append(len(tokens) in positions)
+            self.moves.append(None if moves is None else tuple(sorted(moves)))
+            # numbered last: other threads look states up without the lock
+            self._numbers[positions] = state
+        return state
+
+    def step(self, state: int, index: int) -> int:
+        """
+        Return the state after reading the character with key index `index`.
+        """
+        transitions = self._transitions[state]
+        target = transitions.get(index)
+        if target is None:
+            tokens = self.tokens
+            positions = set()
+            for position in self._positions[state]:
+                if position == len(tokens):
+                    continue
+                token = tokens[position]
+                if token is STAR:
+                    positions.add(position)
+                elif index in token:
+                    positions.add(position + 1)
+            target = transitions[index] = self._state(self._closure(positions))
+        return target
+
+    def match(self, key: str) -> bool:
+        """
+        Return whether the whole of `key` matches the pattern.
+        """
+        state = self.start
+        for char in key:
+            state = self.step(state, character_to_key(char))
+            if state == self.DEAD:
+                return False
+        return self.accepting[state]
+
+
+@lru_cache(maxsize=256)
+def compile_glob(pattern: str) -> GlobPattern:
+    """
+    Return the compiled GlobPattern for `pattern`, reusing it for repeated queries.
+
+    Raises:
+        ValueError: if the pattern has an unterminated character class
+    """
+    return GlobPattern(pattern)
@@ -0,0 +1,208 @@
+from array import array
+from bisect import bisect_left
+from collections.abc import Collection, Set
+from heapq import merge
+from typing import Iterable, Iterator, Optional
+
+
+class DocumentTable:
+    """
+    A dictionary between URLs and small integer document ids.
+
+    Ids are handed out in the order URLs are added, starting at 0.
+    """
+    def __init__(self, urls: Iterable[str] = ()):
+        self.urls: list[str] = []
+        self.ids: dict[str, int] = {}
+        for url in urls:
+            self.add(url)
+
+    def add(self, url: str) -> int:
+        """
+        Return the id of `url`, assigning the next free one if it is new.
+        """
+        doc_id = self.ids.get(url)
+        if doc_id is None:
+            doc_id = self.ids[url] = len(self.urls)
+            self.urls.append(url)
+        return doc_id
+
+    def get_id(self, url: str) -> Optional[int]:
+        """
+        Return the id of `url`, or None if it has no id.
+        """
+        return self.ids.get(url)
+
+    def __getitem__(self, doc_id: int) -> str:
+        return self.urls[doc_id]
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+
+class PostingList(Set):
+    """
+    The set of URLs a word appears on, stored as a sorted array of document ids.
+
+    Behaves like a set of URL strings (so it compares equal to one), but a
+    posting costs 4 bytes instead of a hash table slot, and union and
+    intersection with other lists over the same DocumentTable work on the
+    sorted ids directly.
+    """
+    __slots__ = ("documents", "ids")
+
+    def __init__(self, documents: DocumentTable, urls: Iterable[str] = ()):
+        """
+        Args:
+            documents (DocumentTable): Table the ids refer to, new URLs are added to it
+            urls (Iterable[str]): URLs in the list
+        """
+        self.documents = documents
+        if not isinstance(urls, Collection):
+            # may be read twice below
+            urls = list(urls)
+        known = documents.ids
+        try:
+            # fast path: every URL already has an id, as when building an index
+            ids = {known[url] for url in urls}
+        except KeyError:
+            ids = {documents.add(url) for url in urls}
+        self.ids = array("I", sorted(ids))
+
+    @classmethod
+    def from_ids(cls, documents: DocumentTable, ids: Iterable[int]) -> "PostingList":
+        """
+        Build a list straight from document ids that are already sorted and distinct.
+        """
+        postings = cls.__new__(cls)
+        postings.documents = documents
+        postings.ids = ids if isinstance(ids, array) else array("I", ids)
+        return postings
+
+    def copy(self) -> "PostingList":
+        """
+        Return a new list with the same URLs.
+        """
+        return PostingList.from_ids(self.documents, array("I", self.ids))
+
+    def _position(self, url: str) -> Optional[int]:
+        """
+        Return where the id of `url` is in `ids`, or None if it is not in the list.
+        """
+        doc_id = self.documents.get_id(url)
+        if doc_id is None:
+            return None
+        position = bisect_left(self.ids, doc_id)
+        if position < len(self.ids) and self.ids[position] == doc_id:
+            return position
+        return None
+
+    def __contains__(self, url: object) -> bool:
+        return isinstance(url, str) and self._position(url) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        urls = self.documents
+        return (urls[doc_id] for doc_id in self.ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __repr__(self) -> str:
+        return f"PostingList({set(self)!r})"
+
+    def add(self, url: str) -> None:
+        """
+        Add `url` to the list.
+        """
+        doc_id = self.documents.add(url)
+        position = bisect_left(self.ids, doc_id)
+        if position == len(self.ids) or self.ids[position] != doc_id:
+            self.ids.insert(position, doc_id)
+
+    def update(self, urls: Iterable[str]) -> None:
+        """
+        Add every URL in `urls` to the list.
+        """
+        new = sorted({self.documents.add(url) for url in urls})
+        if not new:
+            return
+        ids = self.ids
+        if not ids or new[0] > ids[-1]:
+            # newer documents than any in the list, as when indexing page by page
+            ids.extend(new)
+            return
+        present = set(ids)
+        new = [doc_id for doc_id in new if doc_id not in present]
+        if new:
+            self.ids = array("I", merge(ids, new))
+
+    def discard(self, url: str) -> None:
+        """
+        Remove `url` from the list if it is there.
+        """
+        position = self._position(url)
+        if position is not None:
+            del self.ids[position]
+
+    def __and__(self, other):
+        if isinstance(other, PostingList) and other.documents is self.documents:
+            return intersect(self, other)
+        return super().__and__(other)
+
+    def __or__(self, other):
+        if isinstance(other, PostingList) and other.documents is self.documents:
+            return union(self, other)
+        return super().__or__(other)
+
+    def _from_iterable(self, urls: Iterable[str]) -> "PostingList":
+        # used by the Set mixin operators for anything not handled above
+        return PostingList(self.documents, urls)
+
+
+def _intersect_ids(small: array, large: array) -> array:
+    """
+    Intersect two sorted id arrays by binary searching each id of `small` in `large`.
+    """
+    result = array("I")
+    low = 0
+    end = len(large)
+    for doc_id in small:
+        low = bisect_left(large, doc_id, low, end)
+        if low == end:
+            break
+        if large[low] == doc_id:
+            result.append(doc_id)
+    return result
+
+
+def intersect(*lists: PostingList) -> PostingList:
+    """
+    Return the URLs present in every list.
+
+    Lists are intersected smallest first and stop as soon as the running
+    result is empty. All lists must share one DocumentTable.
+    """
+    if not lists:
+        raise ValueError("intersect needs at least one posting list")
+    ordered = sorted(lists, key=len)
+    ids = ordered[0].ids
+    for postings in ordered[1:]:
+        if not ids:
+            break
+        ids = _intersect_ids(ids, postings.ids)
+    return PostingList.from_ids(ordered[0].documents, array("I", ids))
+
+
+def union(*lists: PostingList) -> PostingList:
+    """
+    Return the URLs present in any list. All lists must share one DocumentTable.
+    """
+    if not lists:
+        raise ValueError("union needs at least one posting list")
+    ids = array("I")
+    last = -1
+    for doc_id in merge(*(postings.ids for postings in lists)):
+        if doc_id != last:
+            ids.append(doc_id)
+            last = doc_id
+    return PostingList.from_ids(lists[0].documents, ids)
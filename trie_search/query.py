@@ -0,0 +1,278 @@
+import heapq
+import math
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .postings import DocumentTable, PostingList, intersect, union
+from .tokenizer import Tokenizer
+from .trie import Trie, normalize_key
+
+# characters that make a query term a glob pattern, see Trie.glob_search
+GLOB_CHARS = "*?["
+
+
+class Query:
+    """
+    A parsed boolean query: a disjunction of AND groups.
+
+    Words are separated by spaces and all must match (AND). `OR` (in capitals)
+    separates alternative groups, and a word starting with `-`, or following
+    `NOT`, must not appear. Words containing `*`, `?` or `[` are glob patterns
+    standing for every indexed word they match.
+
+        park chicago          pages with both words
+        park OR garden        pages with either word
+        park -dog             pages with "park" but not "dog"
+        park* NOT parking     pages with a word starting with "park", but not "parking"
+    """
+    def __init__(self, groups: List[Tuple[List[str], List[str]]]):
+        # one (included words, excluded words) pair per OR group, words normalized
+        self.groups = groups
+
+    @classmethod
+    def parse(cls, text: str, tokenizer: Optional[Tokenizer] = None) -> "Query":
+        """
+        Parse a query string, see the class docstring for the syntax.
+
+        With a `tokenizer`, each word goes through it like the indexed pages
+        did: a stopword drops out and a word it splits ("new-york") stands
+        for all its parts.
+        """
+        groups = []
+        include: List[str] = []
+        exclude: List[str] = []
+        negate = False
+        for token in text.split():
+            if token == "OR":
+                if include or exclude:
+                    groups.append((include, exclude))
+                include, exclude = [], []
+                negate = False
+                continue
+            if token == "NOT":
+                negate = True
+                continue
+            if token.startswith("-") and len(token) > 1:
+                token = token[1:]
+                negate = True
+            if any(char in token for char in GLOB_CHARS):
+                terms = [token]
+            elif tokenizer is not None:
+                terms = [normalize_key(word) for word in tokenizer(token)]
+            else:
+                terms = [normalize_key(token)]
+            (exclude if negate else include).extend(terms)
+            negate = False
+        if include or exclude:
+            groups.append((include, exclude))
+        return cls(groups)
+
+    def terms(self) -> List[str]:
+        """
+        Return the distinct included words and patterns, which are the ones
+        ranking scores.
+        """
+        return list(dict.fromkeys(term for include, _ in self.groups
+                                  for term in include))
+
+
+class QueryEngine:
+    """
+    Boolean and ranked multi-word search over an index built by build_index.
+
+    Posting lists of the words of an AND group are intersected smallest
+    first, stopping as soon as the result is empty. Matching pages are then
+    ranked with BM25 (or plain TF-IDF) over the per-page term frequencies
+    given at construction; without them every occurrence counts once, which
+    ranks by how rare the matched words are.
+    """
+    def __init__(
+        self,
+        trie: Trie,
+        documents: DocumentTable,
+        frequencies: Optional[Mapping[str, array]] = None,
+        lengths: Optional[array] = None,
+        max_expansions: int = 50,
+        tokenizer: Optional[Tokenizer] = None,
+    ):
+        """
+        Args:
+            trie (Trie): Index of words to PostingLists over `documents`
+            documents (DocumentTable): Table of the pages in the index
+            frequencies (Optional[Mapping[str, array]]): For each normalized
+                word, how often it occurs on each page of its posting list,
+                in posting list order
+            lengths (Optional[array]): Number of words on each page, by document id
+            max_expansions (int): Most words of a glob pattern whose counts
+                add to a page's score; pages match on every word it matches
+            tokenizer (Optional[Tokenizer]): The tokenizer the pages were
+                indexed with, applied to query words too
+        """
+        self.trie = trie
+        self.documents = documents
+        self.frequencies = frequencies if frequencies is not None else {}
+        self.lengths = lengths
+        self.average_length = sum(lengths) / len(lengths) if lengths else 1.0
+        self.max_expansions = max_expansions
+        self.tokenizer = tokenizer
+
+    @classmethod
+    def from_results(cls, trie: Trie, documents: DocumentTable,
+                     results: Mapping[str, List[str]], **kwargs) -> "QueryEngine":
+        """
+        Build an engine for the index built from crawl `results`, counting
+        each page's words.
+
+        Args:
+            trie (Trie): Index built from `results`
+            documents (DocumentTable): Table the index's posting lists use
+            results (Mapping[str, List[str]]): Mapping of URLs to the words on each page
+        """
+        return cls(trie, documents, *count_terms(documents, results.items()), **kwargs)
+
+    def _postings(self, term: str,
+                  limit: Optional[int] = None) -> List[Tuple[str, PostingList]]:
+        """
+        Return the (word, posting list) of a word, or of the words a glob
+        pattern matches.
+
+        A pattern stands for every word it matches, or the first `limit` of them.
+        """
+        if any(char in term for char in GLOB_CHARS):
+            return [(word, postings) for word, postings
+                    in self.trie.glob_search(term, limit=limit)]
+        postings = self.trie.get(term)
+        return [] if postings is None else [(term, postings)]
+
+    def _lists(self, term: str) -> Optional[PostingList]:
+        """
+        Return the pages with `term` (any of its words for a pattern), or None
+        if there are none.
+        """
+        lists = [postings for _, postings in self._postings(term)]
+        if not lists:
+            return None
+        return lists[0] if len(lists) == 1 else union(*lists)
+
+    def match(self, query: str) -> PostingList:
+        """
+        Return every page matching the boolean query, see Query for the syntax.
+        """
+        documents = self.documents
+        results = []
+        for include, exclude in Query.parse(query, self.tokenizer).groups:
+            lists = []
+            for term in include:
+                postings = self._lists(term)
+                if postings is None:
+                    # one missing word empties the whole group
+                    break
+                lists.append(postings)
+            else:
+                if lists:
+                    matched = intersect(*lists)
+                else:
+                    # only exclusions: start from every page
+                    matched = PostingList.from_ids(documents, range(len(documents)))
+                excluded = [postings for term in exclude
+                            for postings in (self._lists(term),)
+                            if postings is not None]
+                if excluded and matched:
+                    removed = set(union(*excluded).ids)
+                    matched = PostingList.from_ids(
+                        documents,
+                        [doc_id for doc_id in matched.ids if doc_id not in removed])
+                results.append(matched)
+        if not results:
+            return PostingList(documents)
+        return results[0] if len(results) == 1 else union(*results)
+
+    def search(self, query: str, k: int = 10, scoring: str = "bm25",
+               k1: float = 1.2, b: float = 0.75) -> List[Tuple[str, float]]:
+        """
+        Return the k best pages matching the query as (url, score), best first.
+
+        Args:
+            query (str): Query, see Query for the syntax
+            k (int): Number of pages to return
+            scoring (str): "bm25" or "tfidf"
+            k1 (float): BM25 term frequency saturation
+            b (float): BM25 document length normalization
+
+        Raises:
+            ValueError: if `scoring` is not "bm25" or "tfidf"
+        """
+        if scoring not in ("bm25", "tfidf"):
+            raise ValueError(f"unknown scoring {scoring!r}")
+        matched = self.match(query).ids
+        if not matched or k <= 0:
+            return []
+
+        total = len(self.documents)
+        if scoring == "bm25":
+            # the length part of BM25 only depends on the page, work it out once
+            lengths = self.lengths
+            average = self.average_length
+            norms = [k1 * (1 - b + b * (lengths[doc_id] if lengths else average)
+                           / average)
+                     for doc_id in matched]
+        scores = [0.0] * len(matched)
+        for term in Query.parse(query, self.tokenizer).terms():
+            # matching took every word of a pattern, scoring only counts the first few
+            for word, postings in self._postings(term, self.max_expansions):
+                ids = postings.ids
+                counts = self.frequencies.get(word)
+                df = len(ids)
+                if scoring == "bm25":
+                    idf = math.log((total - df + 0.5) / (df + 0.5) + 1)
+                else:
+                    idf = math.log(total / df) + 1
+                # both id lists are sorted, so each search starts where the last stopped
+                low = 0
+                for position, doc_id in enumerate(matched):
+                    low = bisect_left(ids, doc_id, low)
+                    if low == df:
+                        break
+                    if ids[low] != doc_id:
+                        continue
+                    tf = counts[low] if counts is not None else 1
+                    if scoring == "bm25":
+                        scores[position] += idf * tf * (k1 + 1) / (tf + norms[position])
+                    else:
+                        scores[position] += idf * tf
+
+        documents = self.documents
+        # ties go to the page added first
+        best = heapq.nsmallest(k, zip(matched, scores),
+                               key=lambda item: (-item[1], item[0]))
+        return [(documents[doc_id], score) for doc_id, score in best]
+
+
+def count_terms(
+    documents: DocumentTable, pages: Iterable[Tuple[str, List[str]]],
+) -> Tuple[Dict[str, array], array]:
+    """
+    Count how often each normalized word occurs on each page, for QueryEngine.
+
+    Args:
+        documents (DocumentTable): Table the pages' ids come from (new URLs are added)
+        pages (Iterable[Tuple[str, List[str]]]): (url, words) of each page
+
+    Returns:
+        Tuple[Dict[str, array], array]: For each word its counts in document id
+        order (the order of its posting list), and each page's number of words
+    """
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    lengths = array("I")
+    for url, words in pages:
+        doc_id = documents.add(url)
+        if doc_id >= len(lengths):
+            lengths.extend([0] * (doc_id + 1 - len(lengths)))
+        lengths[doc_id] = len(words)
+        for word, count in Counter(normalize_key(word) for word in words).items():
+            postings.setdefault(word, []).append((doc_id, count))
+    frequencies = {word: array("I", (count for _, count in sorted(pairs)))
+                   for word, pairs in postings.items()}
+    return frequencies, lengths
@@ -0,0 +1,151 @@
+import sys
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Hashable, Optional
+
+
+class QueryCache:
+    """
+    A bounded LRU cache of query results, tagged with the version of the
+    trie they came from.
+
+    A result is only returned while the trie is still at the version it was
+    stored under; anything older counts as a miss (and an invalidation) and
+    is dropped. The cache holds at most `max_entries` results and, if
+    `max_bytes` is set, roughly that many bytes of them, evicting the least
+    recently used first.
+
+    `hits`, `misses`, `evictions` and `invalidations` count what happened
+    since the cache was made, see stats(). A lock guards the entries, so
+    readers of a SnapshotTrie in several threads can share the cache.
+    """
+    def __init__(self, max_entries: int = 256, max_bytes: Optional[int] = None):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (trie version, results, estimated size)
+        self._entries: OrderedDict[Hashable, tuple[int, list, int]] = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, version: int) -> Optional[list]:
+        """
+        Return the results stored for `key` at `version`, or None.
+        """
+        with self._lock:
+            return self._get(key, version)
+
+    def _get(self, key: Hashable, version: int) -> Optional[list]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] != version:
+            # the trie changed since: the stored results may be wrong
+            self._drop(key)
+            self.invalidations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, version: int, results: list) -> None:
+        """
+        Store the results of `key` computed at `version`, evicting old
+        entries if over a limit.
+        """
+        size = _estimate_size(results)
+        with self._lock:
+            self._put(key, version, results, size)
+
+    def _put(self, key: Hashable, version: int, results: list, size: int) -> None:
+        if key in self._entries:
+            self._drop(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            # would push out everything else and still not fit
+            return
+        self._entries[key] = (version, results, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self.bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key: Hashable) -> None:
+        _, _, size = self._entries.pop(key)
+        self.bytes -= size
+
+    def clear(self) -> None:
+        """
+        Drop every entry, keeping the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Return the counters and current size, e.g. for monitoring.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+        }
+
+
+def _estimate_size(results: list) -> int:
+    """
+    Estimate the memory a cached result list keeps alive.
+
+    Counts the list, its tuples and their key strings; the values are shared
+    with the trie, so they are not counted.
+    """
+    size = sys.getsizeof(results)
+    for item in results:
+        size += sys.getsizeof(item) + sys.getsizeof(item[0])
+    return size
+
+
+def cached_query(method: Callable) -> Callable:
+    """
+    Serve a Trie search method from the trie's QueryCache, when one is enabled.
+
+    The method's results are materialized into a list on a miss; hits return
+    an iterator over the stored list, so callers see the same iterable
+    whether or not the cache is on. Pass `cached=False` to the method to
+    search lazily past the cache, e.g. to page through more results than
+    are worth storing.
+    """
+    @wraps(method)
+    def wrapper(self, *args: Any, cached: bool = True, **kwargs: Any):
+        cache = self._query_cache
+        if cache is None or not cached:
+            return method(self, *args, **kwargs)
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        # read before searching: a write published during the search (on a
+        # SnapshotTrie) leaves the results under the older version, which it
+        # makes stale
+        version = self.version
+        results = cache.get(key, version)
+        if results is None:
+            results = list(method(self, *args, **kwargs))
+            cache.put(key, version, results)
+        return iter(results)
+    return wrapper
@@ -0,0 +1,385 @@
+from typing import Any, Callable, Hashable, Iterable, Iterator, Optional
+from .query_cache import cached_query
+from .trie import KEY_CHARS, Trie, character_to_key, normalize_key
+
+
+class RadixNode:
+    '''
+    A node in a path-compressed trie.
+
+    `edges` maps the first character of each outgoing edge label to a
+    (label, child) pair, so a chain of single-child nodes becomes one edge.
+    '''
+    __slots__ = ("edges", "value", "has_value")
+
+    def __init__(self):
+        self.edges: dict[str, tuple[str, "RadixNode"]] = {}
+        self.value = None
+        self.has_value = False
+
+
+class RadixTrie(Trie):
+    """
+    A path-compressed (radix) Trie.
+
+    Edge labels are normalized strings (see normalize_key) rather than single
+    characters, so words with long unique suffixes cost one node instead of
+    one node per character, and lookups compare whole labels at once.
+
+    Nodes are split when an insert diverges in the middle of a label and
+    merged back when a delete leaves a valueless node with a single child.
+    """
+
+    def __init__(self):
+        self.root = RadixNode()
+        self.size = 0
+        self._init_caches()
+
+    # For the character-at-a-time protocol a position is a cursor
+    # (node, label, offset): `offset` characters into the edge `label`
+    # that leads to `node`. offset == len(label) means we are at `node`.
+
+    def _root(self) -> tuple[RadixNode, str, int]:
+        return (self.root, "", 0)
+
+    def _child(self, cursor: tuple[RadixNode, str, int], index: int) -> Any:
+        node, label, offset = cursor
+        char = KEY_CHARS[index]
+        if offset < len(label):
+            return (node, label, offset + 1) if label[offset] == char else None
+        edge = node.edges.get(char)
+        if edge is None:
+            return None
+        return (edge[1], edge[0], 1)
+
+    def _children(self,
+                  cursor: tuple[RadixNode, str, int]) -> Iterator[tuple[int, Any]]:
+        node, label, offset = cursor
+        if offset < len(label):
+            yield character_to_key(label[offset]), (node, label, offset + 1)
+            return
+        for child_label, child in self._edges(node):
+            yield character_to_key(child_label[0]), (child, child_label, 1)
+
+    def _has_value(self, cursor: tuple[RadixNode, str, int]) -> bool:
+        node, label, offset = cursor
+        return offset == len(label) and node.has_value
+
+    def _value(self, cursor: tuple[RadixNode, str, int]) -> Any:
+        return cursor[0].value
+
+    def _find(self, key: str) -> RadixNode:
+        """
+        Return the node the normalized `key` ends at, or None.
+        """
+        node = self.root
+        i = 0
+        while i < len(key):
+            edge = node.edges.get(key[i])
+            if edge is None:
+                return None
+            label, child = edge
+            if not key.startswith(label, i):
+                return None
+            i += len(label)
+            node = child
+        return node
+
+    def __getitem__(self, key: str) -> Any:
+        """
+        Given a key, return the value associated with it in the trie.
+
+        If the key has not been added to this trie, raise `KeyError(key)`.
+        If the key is not a string, raise `KeyError(key)`
+        """
+        if not isinstance(key, str):
+            raise KeyError(key)
+
+        node = self._find(normalize_key(key))
+        if node is None or not node.has_value:
+            raise KeyError(key)
+        return node.value
+
+    def _insert(self, key: str) -> RadixNode:
+        """
+        Return the node the normalized `key` ends at, splitting edges and
+        adding a leaf as needed.
+        """
+        node = self.root
+        i = 0
+        while i < len(key):
+            edge = node.edges.get(key[i])
+            if edge is None:
+                # no edge shares a first character: hang the rest of the key as one leaf
+                leaf = RadixNode()
+                node.edges[key[i]] = (key[i:], leaf)
+                return leaf
+
+            label, child = edge
+            if key.startswith(label, i):
+                i += len(label)
+                node = child
+                continue
+
+            # the key diverges inside the label: split the edge at the common prefix
+            common = 1
+            while i + common < len(key) and key[i + common] == label[common]:
+                common += 1
+            middle = RadixNode()
+            middle.edges[label[common]] = (label[common:], child)
+            node.edges[key[i]] = (label[:common], middle)
+            node = middle
+            i += common
+        return node
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        """
+        Given a key and value, store the value associated with key.
+
+        Like a dictionary, will overwrite existing data if key already exists.
+
+        If the key is not a string, raise `KeyError(key)`
+        """
+        if not isinstance(key, str):
+            raise KeyError(key)
+
+        node = self._insert(normalize_key(key))
+        is_new = not node.has_value
+        if is_new:
+            self.size += 1
+        node.value = value
+        node.has_value = True
+        self._on_set(key, value, is_new)
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        """
+        Return the value for `key`, first storing `default` if the key is not set.
+
+        If the key is not a string, raise `KeyError(key)`
+        """
+        if not isinstance(key, str):
+            raise KeyError(key)
+
+        node = self._insert(normalize_key(key))
+        if node.has_value:
+            return node.value
+        self.size += 1
+        node.value = default
+        node.has_value = True
+        self._on_set(key, default, True)
+        return default
+
+    def bulk_update(self, pairs: Iterable[tuple[str, Hashable]],
+                    presorted: bool = False,
+                    factory: Optional[Callable[[set], Any]] = None) -> None:
+        """
+        Add every (key, item) pair to the set of items stored under key.
+
+        Labels are compared a whole string at a time, so instead of sharing
+        the walk between keys this groups the pairs and does one walk per
+        distinct key. See Trie.bulk_update for `factory`.
+
+        If a key is not a string, raise `KeyError(key)`
+        """
+        # the order of the walks does not matter here, so skip the sort
+        for key, items in self._group_pairs(pairs, normalize_key, True):
+            node = self._insert(key)
+            if node.has_value:
+                node.value.update(items)
+                self._on_set(key, node.value, False)
+            else:
+                self.size += 1
+                node.value = items if factory is None else factory(items)
+                node.has_value = True
+                self._on_set(key, node.value, True)
+
+    def bulk_load(self, items: Iterable[tuple[str, Any]],
+                  presorted: bool = False) -> None:
+        """
+        Store every (key, value) pair, replacing the value of a key already set.
+
+        Labels are compared a whole string at a time, so each key is a walk
+        of its own and the order does not matter. See Trie.bulk_load.
+
+        If a key is not a string, raise `KeyError(key)`
+        """
+        for key, value in items:
+            self[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        """
+        Remove data associated with `key` from the trie.
+
+        If the key is not a string, raise `KeyError(key)`
+        """
+        if not isinstance(key, str):
+            raise KeyError(key)
+
+        norm = normalize_key(key)
+        node = self.root
+        # (parent, first character of the edge taken) for every step
+        path = []
+        i = 0
+        while i < len(norm):
+            edge = node.edges.get(norm[i])
+            if edge is None or not norm.startswith(edge[0], i):
+                raise KeyError(key)
+            path.append((node, norm[i]))
+            i += len(edge[0])
+            node = edge[1]
+
+        if not node.has_value:
+            raise KeyError(key)
+        node.has_value = False
+        node.value = None
+        self.size -= 1
+        self._on_delete(norm)
+
+        if not path:
+            return
+        parent, char = path[-1]
+        if not node.edges:
+            # drop the now empty leaf, which may leave its parent mergeable
+            del parent.edges[char]
+            if len(path) > 1:
+                self._merge(*path[-2])
+        else:
+            self._merge(parent, char)
+
+    def _merge(self, parent: RadixNode, char: str) -> None:
+        """
+        Fold the node under parent.edges[char] into its only child if it has no value.
+        """
+        label, node = parent.edges[char]
+        if node.has_value or len(node.edges) != 1:
+            return
+        (child_label, child), = node.edges.values()
+        parent.edges[char] = (label + child_label, child)
+
+    def _edges(self, node: RadixNode) -> Iterator[tuple[str, RadixNode]]:
+        """
+        Yield the (label, child) edges of `node` in alphabetical order.
+        """
+        edges = node.edges
+        for char in sorted(edges, key=character_to_key):
+            yield edges[char]
+
+    def _walk(self, cursor: tuple[RadixNode, str, int], prefix: str,
+              limit: Optional[int] = None) -> Iterator[tuple[str, Any]]:
+        """
+        Lazily yield (key, value) pairs below `cursor`, one whole label per step.
+        """
+        if limit is not None and limit <= 0:
+            return
+        node, label, offset = cursor
+        # finish the edge the cursor is in the middle of
+        prefix += label[offset:]
+        count = 0
+        if node.has_value:
+            yield prefix, node.value
+            count += 1
+            if count == limit:
+                return
+
+        path = [prefix]
+        stack = [self._edges(node)]
+        while stack:
+            for label, child in stack[-1]:
+                path.append(label)
+                if child.has_value:
+                    yield "".join(path), child.value
+                    count += 1
+                    if count == limit:
+                        return
+                stack.append(self._edges(child))
+                break
+            else:
+                stack.pop()
+                if stack:
+                    path.pop()
+
+    @cached_query
+    def wildcard_search(self, key: str,
+                        limit: Optional[int] = None) -> Iterator[tuple[str, Any]]:
+        """
+        Search for keys that match a wildcard pattern where a '*' can represent any single character.
+
+        Matches whole edge labels against slices of the pattern; results are
+        the same as Trie.wildcard_search.
+        """
+        if limit is not None and limit <= 0:
+            return
+        pattern = [None if char == '*' else KEY_CHARS[character_to_key(char)]
+                   for char in key]
+        count = 0
+
+        def matches(node, i):
+            '''
+            Yield (matched text, child) for each edge of `node` that fits the
+            pattern at i.
+            '''
+            for label, child in self._edges(node):
+                if i + len(label) > len(key):
+                    continue
+                matched = []
+                for offset, label_char in enumerate(label):
+                    wanted = pattern[i + offset]
+                    if wanted is None:
+                        matched.append(label_char)
+                    elif wanted == label_char:
+                        # literal positions echo the pattern, like Trie does
+                        matched.append(key[i + offset])
+                    else:
+                        break
+                else:
+                    yield "".join(matched), child
+
+        if not key:
+            if self.root.has_value:
+                yield "", self.root.value
+            return
+
+        path = []
+        # ends[-1] is the pattern position reached by the frame stack[-1] expands
+        ends = [0]
+        stack = [matches(self.root, 0)]
+        while stack:
+            for piece, child in stack[-1]:
+                end = ends[-1] + len(piece)
+                if end == len(key):
+                    if child.has_value:
+                        yield "".join(path) + piece, child.value
+                        count += 1
+                        if count == limit:
+                            return
+                    continue
+                path.append(piece)
+                ends.append(end)
+                stack.append(matches(child, end))
+                break
+            else:
+                stack.pop()
+                ends.pop()
+                if stack:
+                    path.pop()
+
+    def _map_values(self, convert: Callable[[Any], Any]) -> None:
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.has_value:
+                node.value = convert(node.value)
+            stack.extend(child for _, child in node.edges.values())
+        self.version += 1
+
+    def node_count(self) -> int:
+        """
+        Return the number of nodes in the trie, including the root.
+        """
+        count = 0
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            count += 1
+            stack.extend(child for _, child in node.edges.values())
+        return count
@@ -0,0 +1,317 @@
+import heapq
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Any, Callable, Hashable, Iterable, Iterator, Optional, Type
+
+from .query_cache import cached_query
+from .trie import KEY_CHARS, Trie, encode_key
+
+PARTITIONS = ("first", "hash")
+_GLOB_CHARS = "*?["
+
+
+def _trie_order(pair: tuple) -> bytes:
+    return encode_key(pair[0])
+
+
+def _group_shard(pairs: list) -> list:
+    """
+    Group one shard's (key, item) pairs into (key, set of items), in trie order.
+
+    Runs in a worker process. Flat pairs go back to the parent instead of a
+    built trie: pickling the nested nodes of a trie recurses once per
+    character of its longest key.
+    """
+    groups: dict[str, set] = {}
+    for key, item in pairs:
+        items = groups.get(key)
+        if items is None:
+            items = groups[key] = set()
+        items.add(item)
+    return sorted(groups.items(), key=_trie_order)
+
+
+class ShardedTrie(Trie):
+    """
+    A Trie split into independent shards, each an ordinary trie of `trie_class`.
+
+    With partition="first" a key goes to the shard of its first character
+    (character_to_key's 27 buckets, split into `num_shards` alphabetical
+    ranges), so a prefix or a pattern starting with a literal character is
+    answered by one shard, and the shards' results simply follow each other.
+    With partition="hash" keys are spread by a CRC of the key, which
+    balances shards better; results of every shard are then merged back
+    into alphabetical order with a k-way heap merge.
+
+    With `workers` > 1, bulk_update groups and sorts the pairs of empty
+    shards in that many worker processes, and loads them into the shards
+    here.
+    """
+
+    def __init__(self, num_shards: int = 27, partition: str = "first",
+                 trie_class: Type[Trie] = Trie, workers: int = 0):
+        """
+        Args:
+            num_shards (int): Number of shards
+            partition (str): "first" (by first character) or "hash"
+            trie_class (Type[Trie]): Trie implementation of each shard
+            workers (int): Worker processes bulk_update groups pairs in, 0
+                groups them here
+
+        Raises:
+            ValueError: for an unknown partition or a number of shards out of range
+        """
+        if partition not in PARTITIONS:
+            raise ValueError(
+                f"partition must be one of {PARTITIONS}, not {partition!r}")
+        if num_shards < 1 or (partition == "first" and num_shards > len(KEY_CHARS)):
+            raise ValueError(
+                f"cannot make {num_shards} shards partitioned by {partition}")
+        self.partition = partition
+        self.trie_class = trie_class
+        self.workers = workers
+        self.shards: list[Trie] = [trie_class() for _ in range(num_shards)]
+        self._init_caches()
+
+    @property
+    def size(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+    def _shard_index(self, codes: bytes) -> int:
+        """
+        Return the number of the shard a key with encode_key `codes` belongs in.
+        """
+        if self.partition == "first":
+            # contiguous ranges of first characters keep shards in alphabetical order
+            return (codes[0] if codes else 0) * len(self.shards) // len(KEY_CHARS)
+        return zlib.crc32(codes) % len(self.shards)
+
+    def shard_for(self, key: str) -> Trie:
+        """
+        Return the shard `key` is stored in.
+        """
+        return self.shards[self._shard_index(encode_key(key))]
+
+    # The whole trie is also readable through the node protocol, so save,
+    # autocomplete and the rest work unchanged: a node is the tuple of
+    # (shard, node) pairs for every shard that has that prefix.
+
+    def _root(self) -> tuple:
+        return tuple((shard, shard._root()) for shard in self.shards)
+
+    def _child(self, node: tuple, index: int) -> Any:
+        found = []
+        for shard, shard_node in node:
+            child = shard._child(shard_node, index)
+            if child is not None:
+                found.append((shard, child))
+        return tuple(found) if found else None
+
+    def _children(self, node: tuple) -> Iterator[tuple[int, tuple]]:
+        if len(node) == 1:
+            shard, shard_node = node[0]
+            for index, child in shard._children(shard_node):
+                yield index, ((shard, child),)
+            return
+        grouped: dict[int, list] = {}
+        for shard, shard_node in node:
+            for index, child in shard._children(shard_node):
+                grouped.setdefault(index, []).append((shard, child))
+        for index in sorted(grouped):
+            yield index, tuple(grouped[index])
+
+    def _has_value(self, node: tuple) -> bool:
+        return any(shard._has_value(shard_node) for shard, shard_node in node)
+
+    def _value(self, node: tuple) -> Any:
+        for shard, shard_node in node:
+            if shard._has_value(shard_node):
+                return shard._value(shard_node)
+        raise KeyError(node)
+
+    def __getitem__(self, key: str) -> Any:
+        """
+        Given a key, return the value associated with it in the trie.
+
+        If the key has not been added to this trie, raise `KeyError(key)`.
+        If the key is not a string, raise `KeyError(key)`
+        """
+        if not isinstance(key, str):
+            raise KeyError(key)
+        return self.shard_for(key)[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        """
+        Given a key and value, store the value associated with key.
+
+        Like a dictionary, will overwrite existing data if key already exists.
+
+        If the key is not a string, raise `KeyError(key)`
+        """
+        if not isinstance(key, str):
+            raise KeyError(key)
+        self.shard_for(key)[key] = value
+        self.version += 1
+
+    def __delitem__(self, key: str) -> None:
+        """
+        Remove data associated with `key` from the trie.
+
+        If the key is not a string, raise `KeyError(key)`
+        """
+        if not isinstance(key, str):
+            raise KeyError(key)
+        del self.shard_for(key)[key]
+        self.version += 1
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        """
+        Return the value for `key`, first storing `default` if the key is not set.
+
+        If the key is not a string, raise `KeyError(key)`
+        """
+        if not isinstance(key, str):
+            raise KeyError(key)
+        self.version += 1
+        return self.shard_for(key).setdefault(key, default)
+
+    def bulk_update(self, pairs: Iterable[tuple[str, Hashable]],
+                    presorted: bool = False,
+                    factory: Optional[Callable[[set], Any]] = None) -> None:
+        """
+        Add every (key, item) pair to the set of items stored under key, see
+        Trie.bulk_update.
+
+        Pairs are split per shard first. With `workers` > 1, the pairs of
+        shards that are still empty are grouped per key and sorted in worker
+        processes, then bulk_loaded here with `factory` applied, so neither
+        `factory` nor the shards need to be picklable; the other shards are
+        updated in this process.
+
+        If a key is not a string, raise `KeyError(key)`
+        """
+        buckets: list[list] = [[] for _ in self.shards]
+        for key, item in pairs:
+            if not isinstance(key, str):
+                raise KeyError(key)
+            buckets[self._shard_index(encode_key(key))].append((key, item))
+
+        fresh = []
+        if self.workers > 1:
+            fresh = [number for number, bucket in enumerate(buckets)
+                     if bucket and not len(self.shards[number])]
+        if len(fresh) > 1:
+            with ProcessPoolExecutor(min(self.workers, len(fresh))) as executor:
+                grouped = executor.map(_group_shard,
+                                       [buckets[number] for number in fresh])
+                for number, groups in zip(fresh, grouped):
+                    if factory is not None:
+                        groups = [(key, factory(items)) for key, items in groups]
+                    self.shards[number].bulk_load(groups, presorted=True)
+                    buckets[number] = []
+
+        for shard, bucket in zip(self.shards, buckets):
+            if bucket:
+                shard.bulk_update(bucket, presorted, factory)
+        self.version += 1
+
+    def bulk_load(self, items: Iterable[tuple[str, Any]],
+                  presorted: bool = False) -> None:
+        """
+        Store every (key, value) pair, see Trie.bulk_load. Pairs are split per
+        shard first.
+
+        If a key is not a string, raise `KeyError(key)`
+        """
+        buckets: list[list] = [[] for _ in self.shards]
+        for key, value in items:
+            if not isinstance(key, str):
+                raise KeyError(key)
+            buckets[self._shard_index(encode_key(key))].append((key, value))
+        for shard, bucket in zip(self.shards, buckets):
+            if bucket:
+                shard.bulk_load(bucket, presorted)
+        self.version += 1
+
+    def _merge(self, results: list[Iterator], limit: Optional[int]) -> Iterator:
+        """
+        Combine per-shard results, each in alphabetical order, into one
+        alphabetical stream.
+        """
+        if self.partition == "first":
+            # shard ranges are alphabetical, one shard's keys all come before the next's
+            merged = chain.from_iterable(results)
+        else:
+            # trie order, where '_' sorts after the letters
+            merged = heapq.merge(*results, key=_trie_order)
+        return merged if limit is None else islice(merged, max(limit, 0))
+
+    def _routed(self, pattern: str, wildcards: str) -> Optional[Trie]:
+        """
+        Return the only shard that can hold keys starting like `pattern`, or
+        None if any may.
+        """
+        if self.partition == "first" and pattern and pattern[0] not in wildcards:
+            return self.shard_for(pattern[0])
+        return None
+
+    def __iter__(self) -> Iterator[tuple[str, Any]]:
+        return self._merge([iter(shard) for shard in self.shards], None)
+
+    @cached_query
+    def prefix_search(self, prefix: str,
+                      limit: Optional[int] = None) -> Iterator[tuple[str, Any]]:
+        shard = self._routed(prefix, "")
+        if shard is not None:
+            return shard.prefix_search(prefix, limit)
+        results = [shard.prefix_search(prefix, limit) for shard in self.shards]
+        return self._merge(results, limit)
+
+    @cached_query
+    def wildcard_search(self, key: str,
+                        limit: Optional[int] = None) -> Iterator[tuple[str, Any]]:
+        shard = self._routed(key, "*")
+        if shard is not None:
+            return shard.wildcard_search(key, limit)
+        results = [shard.wildcard_search(key, limit) for shard in self.shards]
+        return self._merge(results, limit)
+
+    @cached_query
+    def glob_search(self, pattern: str,
+                    limit: Optional[int] = None) -> Iterator[tuple[str, Any]]:
+        shard = self._routed(pattern, _GLOB_CHARS)
+        if shard is not None:
+            return shard.glob_search(pattern, limit)
+        results = [shard.glob_search(pattern, limit) for shard in self.shards]
+        return self._merge(results, limit)
+
+    @cached_query
+    def fuzzy_search(self, word: str, max_distance: int = 1,
+                     limit: Optional[int] = None) -> Iterator[tuple[str, Any, int]]:
+        results = [shard.fuzzy_search(word, max_distance, limit)
+                   for shard in self.shards]
+        return self._merge(results, limit)
+
+    def autocomplete(self, prefix: str, k: int = 10) -> list[tuple[str, Any]]:
+        """
+        Return the k (key, value) pairs starting with `prefix` that have the
+        highest weight.
+
+        Each shard answers from its own cache; their best k are merged here.
+        """
+        candidates = chain.from_iterable(shard.autocomplete(prefix, k)
+                                         for shard in self.shards)
+        weight = self.weight
+        return heapq.nsmallest(k, candidates,
+                               key=lambda pair: (-weight(pair[1]), pair[0]))
+
+    def prefix_count(self, prefix: str) -> int:
+        return sum(shard.prefix_count(prefix) for shard in self.shards)
+
+    def precompute_completions(self, depth: int = 2) -> None:
+        """
+        Have every shard precompute its short prefixes, see Trie.precompute_completions.
+        """
+        for shard in self.shards:
+            shard.precompute_completions(depth)
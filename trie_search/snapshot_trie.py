@@ -0,0 +1,387 @@
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Hashable, Iterable, Iterator, Optional
+
+from .trie import Trie, encode_key
+
+
+class SnapshotNode:
+    """
+    A node of a persistent trie.
+
+    Once a write is published its nodes are never changed again; later
+    writes copy the nodes on the path to the key instead. `owner` is the
+    token of the write that created the node, which may still change it.
+    """
+    __slots__ = ("children", "value", "has_value", "owner")
+
+    def __init__(self, children: Optional[dict] = None, value: Any = None,
+                 has_value: bool = False, owner: object = None):
+        # character_to_key index -> child node
+        self.children: dict[int, "SnapshotNode"] = (
+            children if children is not None else {})
+        self.value = value
+        self.has_value = has_value
+        self.owner = owner
+
+
+class TrieSnapshot(Trie):
+    """
+    A read-only, unchanging view of a SnapshotTrie at one point in time.
+
+    Its nodes are shared with the trie and with other snapshots, so taking
+    one costs nothing, and it can be read from any number of threads
+    without locks. `len` and the keys always agree.
+    """
+
+    def __init__(self, root: SnapshotNode, size: int):
+        # (root, size) are replaced together, in one assignment
+        self._state = (root, size)
+        self._init_caches()
+        # readers share the autocomplete cache, see _completion_entry
+        self._completions_lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._state[1]
+
+    def _root(self) -> SnapshotNode:
+        return self._state[0]
+
+    def _child(self, node: SnapshotNode, index: int) -> Any:
+        return node.children.get(index)
+
+    def _children(self, node: SnapshotNode) -> Iterator[tuple[int, SnapshotNode]]:
+        return iter(sorted(node.children.items()))
+
+    def _has_value(self, node: SnapshotNode) -> bool:
+        return node.has_value
+
+    def _value(self, node: SnapshotNode) -> Any:
+        return node.value
+
+    def __getitem__(self, key: str) -> Any:
+        """
+        Given a key, return the value associated with it in the trie.
+
+        If the key has not been added to this trie, raise `KeyError(key)`.
+        If the key is not a string, raise `KeyError(key)`
+        """
+        if not isinstance(key, str):
+            raise KeyError(key)
+
+        node = self._state[0]
+        for index in encode_key(key):
+            node = node.children.get(index)
+            if node is None:
+                raise KeyError(key)
+        if not node.has_value:
+            raise KeyError(key)
+        return node.value
+
+    def __iter__(self) -> Iterator[tuple[str, Any]]:
+        return self._walk(self._state[0], "")
+
+    def _completion_entry(self, prefix: str, k: int) -> list:
+        """
+        Return [number of keys, best (-weight, key) pairs] for `prefix`, see
+        Trie._completion_entry.
+
+        An entry is computed on one version of the trie and cached with that
+        version. Writes do not update cached entries, which other readers may
+        be using; an entry is only served while the trie is still at its version.
+        """
+        codes = encode_key(prefix)
+        # read before the snapshot is taken: a write published in between
+        # makes the entry newer than its version, never older
+        version = self.version
+        cached = self._completions.get(codes)
+        if cached is not None and cached[0] == version:
+            entry = cached[1]
+            if len(entry[1]) >= k or entry[0] == len(entry[1]):
+                return entry
+
+        size = max(k, self.TOP_K)
+        entry = TrieSnapshot(*self._state)._compute_completions(codes, size)
+        if size == self.TOP_K:
+            with self._completions_lock:
+                completions = self._completions
+                if (len(completions) >= self.MAX_CACHED_PREFIXES
+                        and codes not in completions):
+                    # drop the oldest cached prefix
+                    del completions[next(iter(completions))]
+                completions[codes] = (version, entry)
+        return entry
+
+    def precompute_completions(self, depth: int = 2) -> None:
+        """
+        Compute the autocomplete entries of every prefix up to `depth` letters
+        long, see Trie.precompute_completions.
+
+        Like every cached entry here they are not updated by writes, so they
+        serve until the next write is published.
+        """
+        version = self.version
+        view = TrieSnapshot(*self._state)
+        Trie.precompute_completions(view, depth)
+        with self._completions_lock:
+            self._completions.update((codes, (version, entry))
+                                     for codes, entry in view._completions.items())
+
+    def autocomplete(self, prefix: str, k: int = 10) -> list[tuple[str, Any]]:
+        """
+        Return the k (key, value) pairs starting with `prefix` that have the
+        highest weight, see Trie.autocomplete.
+
+        A key deleted after it was ranked is left out.
+        """
+        if k <= 0:
+            return []
+        _, top = self._completion_entry(prefix, k)
+        view = TrieSnapshot(*self._state)
+        results = []
+        for _, key in top[:k]:
+            try:
+                results.append((key, view[key]))
+            except KeyError:
+                pass
+        return results
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        raise TypeError("TrieSnapshot is read-only")
+
+    def __delitem__(self, key: str) -> None:
+        raise TypeError("TrieSnapshot is read-only")
+
+    def _ensure_child(self, node: SnapshotNode, index: int) -> SnapshotNode:
+        raise TypeError("TrieSnapshot is read-only")
+
+    def _store(self, node: SnapshotNode, value: Any) -> None:
+        raise TypeError("TrieSnapshot is read-only")
+
+
+class _Draft(Trie):
+    """
+    The private, still changing version of a SnapshotTrie that one write builds.
+
+    Starts from a copy of the published root; nodes are copied the first
+    time the write touches them and changed in place afterwards, so a
+    bulk_update copies each shared node once rather than once per key.
+    Reports its writes to the trie it belongs to.
+    """
+
+    def __init__(self, trie: "SnapshotTrie"):
+        root, self.size = trie._state
+        self.trie = trie
+        self.owner = object()
+        self.changed = False
+        self.root = self._own(root)
+
+    def _own(self, node: SnapshotNode) -> SnapshotNode:
+        """
+        Return `node` if this write made it, otherwise a copy this write may change.
+        """
+        if node.owner is self.owner:
+            return node
+        return SnapshotNode(dict(node.children), node.value, node.has_value, self.owner)
+
+    def _root(self) -> SnapshotNode:
+        return self.root
+
+    def _has_value(self, node: SnapshotNode) -> bool:
+        return node.has_value
+
+    def _value(self, node: SnapshotNode) -> Any:
+        return node.value
+
+    def _ensure_child(self, node: SnapshotNode, index: int) -> SnapshotNode:
+        # `node` was returned by _root or _ensure_child, so this write owns it
+        child = node.children.get(index)
+        if child is None:
+            child = SnapshotNode(owner=self.owner)
+        else:
+            child = self._own(child)
+        node.children[index] = child
+        return child
+
+    def _store(self, node: SnapshotNode, value: Any) -> None:
+        if not node.has_value:
+            self.size += 1
+        node.value = value
+        node.has_value = True
+        self.changed = True
+
+    def _on_set(self, key, value: Any, is_new: bool) -> None:
+        self.trie._on_set(key, value, is_new)
+
+    def _on_delete(self, key) -> None:
+        self.trie._on_delete(key)
+
+
+class SnapshotTrie(TrieSnapshot):
+    """
+    A Trie that can be read from many threads while another thread writes to it.
+
+    Writes never change a node readers can see. Each one copies the nodes
+    on the path to its key (path copying), builds the new version on the
+    side, and publishes it by replacing the (root, size) pair in a single
+    assignment. Writers take a lock between themselves; readers take none.
+
+    Every read on the trie itself uses the version current when it starts:
+    a lookup or an iteration never sees half of a write, even if writes are
+    published while it runs. Call snapshot() to make several reads, `len`
+    included, from one and the same version. Cached search results and
+    autocomplete entries are kept with the version they were computed on,
+    and are not served once a later write is published.
+    """
+
+    def __init__(self):
+        super().__init__(SnapshotNode(), 0)
+        self._write_lock = threading.Lock()
+
+    def snapshot(self) -> TrieSnapshot:
+        """
+        Return a read-only view of the current version, consistent however
+        the trie changes later.
+        """
+        return TrieSnapshot(*self._state)
+
+    @contextmanager
+    def _write(self) -> Iterator[_Draft]:
+        """
+        Run a write on a draft, publishing it at the end if it changed anything.
+        """
+        with self._write_lock:
+            draft = _Draft(self)
+            yield draft
+            if draft.changed:
+                self._state = (draft.root, draft.size)
+                # readers that looked the version up before the swap must not
+                # cache what they found under the new version
+                self.version += 1
+
+    def _on_set(self, key, value: Any, is_new: bool) -> None:
+        # cached autocomplete entries are left alone, readers may be using
+        # them; the new version makes them stale, see _completion_entry
+        self.version += 1
+
+    def _on_delete(self, key) -> None:
+        self.version += 1
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        """
+        Given a key and value, store the value associated with key.
+
+        Like a dictionary, will overwrite existing data if key already exists.
+
+        If the key is not a string, raise `KeyError(key)`
+        """
+        if not isinstance(key, str):
+            raise KeyError(key)
+
+        codes = encode_key(key)
+        with self._write() as draft:
+            node = draft.root
+            for index in codes:
+                node = draft._ensure_child(node, index)
+            is_new = not node.has_value
+            draft._store(node, value)
+            self._on_set(codes, value, is_new)
+
+    def __delitem__(self, key: str) -> None:
+        """
+        Remove data associated with `key` from the trie.
+
+        If the key is not a string, raise `KeyError(key)`
+        """
+        if not isinstance(key, str):
+            raise KeyError(key)
+
+        codes = encode_key(key)
+        with self._write() as draft:
+            # check first, so a missing key copies nothing
+            node = draft.root
+            for index in codes:
+                node = node.children.get(index)
+                if node is None:
+                    raise KeyError(key)
+            if not node.has_value:
+                raise KeyError(key)
+
+            path = [draft.root]
+            for index in codes:
+                path.append(draft._ensure_child(path[-1], index))
+            node = path[-1]
+            node.has_value = False
+            node.value = None
+            draft.size -= 1
+            draft.changed = True
+
+            # drop nodes left without a value or children, bottom up
+            for depth in range(len(codes), 0, -1):
+                node = path[depth]
+                if node.children or node.has_value:
+                    break
+                del path[depth - 1].children[codes[depth - 1]]
+            self._on_delete(codes)
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        """
+        Return the value for `key`, first storing `default` if the key is not set.
+
+        If the key is not a string, raise `KeyError(key)`
+        """
+        if not isinstance(key, str):
+            raise KeyError(key)
+        try:
+            return self[key]
+        except KeyError:
+            pass
+        with self._write() as draft:
+            return Trie.setdefault(draft, key, default)
+
+    def bulk_update(self, pairs: Iterable[tuple[str, Hashable]],
+                    presorted: bool = False,
+                    factory: Optional[Callable[[set], Any]] = None) -> None:
+        """
+        Add every (key, item) pair to the set of items stored under key, see
+        Trie.bulk_update.
+
+        All pairs are published as one version: readers see either none or
+        all of them. An existing value is copied (it needs a `copy()`, like
+        set and PostingList) before `.update(items)`, so the value older
+        versions hold does not change under their readers.
+
+        If a key is not a string, raise `KeyError(key)`
+        """
+        groups = self._group_pairs(pairs, encode_key, presorted)
+        with self._write() as draft:
+            for codes, items in groups:
+                node = draft.root
+                for index in codes:
+                    node = draft._ensure_child(node, index)
+                if node.has_value:
+                    value = node.value.copy()
+                    value.update(items)
+                    draft._store(node, value)
+                    self._on_set(codes, value, False)
+                else:
+                    value = items if factory is None else factory(items)
+                    draft._store(node, value)
+                    self._on_set(codes, value, True)
+
+    def bulk_load(self, items: Iterable[tuple[str, Any]],
+                  presorted: bool = False) -> None:
+        """
+        Store every (key, value) pair, see Trie.bulk_load.
+
+        All pairs are published as one version: readers see either none or all of them.
+
+        If a key is not a string, raise `KeyError(key)`
+        """
+        encoded = self._encode_items(items, encode_key, presorted)
+        with self._write() as draft:
+            for codes, value, node in draft._ordered_nodes(encoded):
+                is_new = not node.has_value
+                draft._store(node, value)
+                self._on_set(codes, value, is_new)
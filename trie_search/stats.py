@@ -0,0 +1,159 @@
+import os
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List
+
+# upper bounds in seconds of the fetch latency histogram buckets, as in Prometheus
+FETCH_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class CrawlStats:
+    """
+    Counters and per-stage timers of a crawl.
+
+    Pass one to a crawler (`WebCrawler(..., stats=CrawlStats())`) to find out
+    where a crawl spends its time: fetching (with a latency histogram and
+    the bytes downloaded), parsing the HTML with lxml, tokenizing (splitting
+    the text into words) and building the index. Without one the crawler
+    skips all of this.
+
+    Times are wall-clock seconds. Parse and tokenize times are measured
+    where pages are parsed: with parse workers they are summed over the
+    workers, so they can add up to more than the crawl took.
+    """
+    def __init__(self):
+        self.pages_fetched = 0
+        self.bytes_downloaded = 0
+        self.fetch_seconds = 0.0
+        # fetch_latency[i] counts fetches taking at most FETCH_BUCKETS[i]
+        # seconds (and more than the bucket before); the last counts the rest
+        self.fetch_latency: List[int] = [0] * (len(FETCH_BUCKETS) + 1)
+        self.failures: Counter = Counter()
+        # pages served from a ResponseCache instead of fetched
+        self.cache_hits = 0
+        self.pages_parsed = 0
+        self.parse_seconds = 0.0
+        self.words_parsed = 0
+        self.tokenize_seconds = 0.0
+        self.index_seconds = 0.0
+        self.words_indexed = 0
+
+    def record_fetch(self, seconds: float, size: int) -> None:
+        """
+        Count a successful fetch that took `seconds` and downloaded `size` bytes.
+        """
+        self.pages_fetched += 1
+        self.bytes_downloaded += size
+        self.fetch_seconds += seconds
+        self.fetch_latency[bisect_left(FETCH_BUCKETS, seconds)] += 1
+
+    def record_failure(self, error: BaseException) -> None:
+        """
+        Count a failed fetch by the type of exception it raised.
+        """
+        self.failures[type(error).__name__] += 1
+
+    def record_cache_hit(self) -> None:
+        """
+        Count a page read from the response cache.
+        """
+        self.cache_hits += 1
+
+    def record_parse(self, seconds: float, pages: int, words: int) -> None:
+        """
+        Count `pages` pages parsed into `words` words in `seconds`.
+        """
+        self.pages_parsed += pages
+        self.parse_seconds += seconds
+        self.words_parsed += words
+
+    def record_tokenize(self, seconds: float) -> None:
+        """
+        Count `seconds` spent splitting parsed pages' text into words.
+        """
+        self.tokenize_seconds += seconds
+
+    def record_index(self, seconds: float, words: int) -> None:
+        """
+        Count `words` word occurrences put in the index in `seconds`.
+        """
+        self.index_seconds += seconds
+        self.words_indexed += words
+
+    def as_dict(self) -> Dict[str, object]:
+        """
+        Return every counter, e.g. to log or print.
+        """
+        return {
+            "pages_fetched": self.pages_fetched,
+            "bytes_downloaded": self.bytes_downloaded,
+            "fetch_seconds": self.fetch_seconds,
+            "fetch_latency": dict(zip([*map(str, FETCH_BUCKETS), "+Inf"],
+                                      self.fetch_latency)),
+            "failures": dict(self.failures),
+            "cache_hits": self.cache_hits,
+            "pages_parsed": self.pages_parsed,
+            "parse_seconds": self.parse_seconds,
+            "words_parsed": self.words_parsed,
+            "tokenize_seconds": self.tokenize_seconds,
+            "index_seconds": self.index_seconds,
+            "words_indexed": self.words_indexed,
+        }
+
+    def to_prometheus(self, prefix: str = "crawler") -> str:
+        """
+        Return the stats in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[tuple]) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{prefix}_{name}{suffix}{labels} {value}")
+
+        metric("pages_fetched_total", "counter", "Pages fetched successfully.",
+               [("", "", self.pages_fetched)])
+        metric("bytes_downloaded_total", "counter", "Bytes of HTML downloaded.",
+               [("", "", self.bytes_downloaded)])
+
+        buckets = []
+        cumulative = 0
+        for bound, count in zip([*map(str, FETCH_BUCKETS), "+Inf"], self.fetch_latency):
+            cumulative += count
+            buckets.append(("_bucket", f'{{le="{bound}"}}', cumulative))
+        buckets.append(("_sum", "", self.fetch_seconds))
+        buckets.append(("_count", "", self.pages_fetched))
+        metric("fetch_duration_seconds", "histogram",
+               "Time taken by successful fetches.", buckets)
+
+        metric("fetch_failures_total", "counter", "Failed fetches by exception type.",
+               [("", f'{{exception="{name}"}}', count)
+                for name, count in sorted(self.failures.items())])
+        metric("cache_hits_total", "counter", "Pages read from the response cache.",
+               [("", "", self.cache_hits)])
+        metric("pages_parsed_total", "counter", "Pages parsed.",
+               [("", "", self.pages_parsed)])
+        metric("words_parsed_total", "counter", "Words found on parsed pages.",
+               [("", "", self.words_parsed)])
+        metric("stage_seconds_total", "counter", "Time spent in each crawl stage.", [
+            ("", '{stage="fetch"}', self.fetch_seconds),
+            ("", '{stage="parse"}', self.parse_seconds),
+            ("", '{stage="tokenize"}', self.tokenize_seconds),
+            ("", '{stage="index"}', self.index_seconds),
+        ])
+        metric("words_indexed_total", "counter", "Word occurrences added to the index.",
+               [("", "", self.words_indexed)])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, prefix: str = "crawler") -> None:
+        """
+        Write to_prometheus() to `path`, e.g. for node_exporter's textfile collector.
+
+        Written to a temporary file first and renamed, so a scrape never reads
+        half a file.
+        """
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(self.to_prometheus(prefix))
+        os.replace(temporary, path)
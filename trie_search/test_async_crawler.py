@@ -0,0 +1,71 @@
+import asyncio
+import time
+import httpx
+import pytest
+from trie_search.async_crawler import AsyncWebCrawler
+from trie_search.crawler import WebCrawler
+from trie_search.postings import PostingList
+
+BASE = "https://example.com"
+
+
+@pytest.mark.parametrize("depth", [0, 1, 2, 3])
+def test_async_matches_serial(serial_fetch, transport, depth):
+    expected = WebCrawler(BASE, depth).crawl()
+    crawler = AsyncWebCrawler(BASE, depth, transport=transport)
+    results = crawler.crawl()
+    assert results == expected
+    assert list(results) == list(expected)
+
+
+def test_async_depth_limits(transport):
+    crawler = AsyncWebCrawler(BASE, 2, transport=transport)
+    results = crawler.crawl()
+    assert set(results) == {BASE, BASE + "/one", BASE + "/two", BASE + "/three"}
+    assert "fiji" in results[BASE + "/three"]
+
+
+def test_async_build_index(transport):
+    crawler = AsyncWebCrawler(BASE, 1, transport=transport)
+    trie = crawler.build_index()
+    assert isinstance(trie["page"], PostingList)
+    assert trie["page"] == {BASE, BASE + "/one", BASE + "/two"}
+    assert trie["australia"] == {BASE + "/one"}
+
+
+def test_async_per_host_limit():
+    pages = {BASE: "".join(f'<a href="/p{i}">p</a>' for i in range(20))}
+    active = 0
+    peak = 0
+
+    async def slow_handler(request):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return httpx.Response(200, text=pages.get(str(request.url), "<p>leaf</p>"))
+
+    crawler = AsyncWebCrawler(BASE, 1, max_per_host=3,
+                              transport=httpx.MockTransport(slow_handler))
+    results = crawler.crawl()
+    assert len(results) == 21
+    assert peak == 3
+
+
+@pytest.mark.parametrize("depth", [1, 3])
+def test_parse_workers_match_serial(serial_fetch, transport, depth):
+    expected = WebCrawler(BASE, depth).crawl()
+    results = WebCrawler(BASE, depth, parse_workers=2).crawl()
+    assert list(results.items()) == list(expected.items())
+    crawler = AsyncWebCrawler(BASE, depth, parse_workers=2, transport=transport)
+    assert list(crawler.crawl().items()) == list(expected.items())
+
+
+def test_async_crawl_delay(transport):
+    crawler = AsyncWebCrawler(BASE, 1, crawl_delay=0.02, transport=transport)
+    start = time.monotonic()
+    results = crawler.crawl()
+    assert set(results) == {BASE, BASE + "/one", BASE + "/two"}
+    # the two pages of depth 1 start one and two delays after the first request
+    assert time.monotonic() - start >= 0.04
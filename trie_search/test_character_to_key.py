@@ -1,5 +1,5 @@
 import pytest
-from trie_search.trie import character_to_key
+from trie_search.trie import character_to_key, encode_key, normalize_key, normalize_keys
 
 
 def test_lowercase():
@@ -18,3 +18,23 @@ def test_nonalpha():
 
 def test_underscore():
     assert character_to_key("_") == 26
+
+def test_two_character_lowercase():
+    # 'İ'.lower() is two characters long
+    assert character_to_key("İ") == 26
+
+def test_encode_key():
+    assert encode_key("") == b""
+    assert encode_key("azAZ") == bytes([0, 25, 0, 25])
+    assert encode_key("a_1#") == bytes([0, 26, 26, 26])
+
+def test_encode_key_matches_character_to_key():
+    text = "Chicago Park, café ÉTÉ İstanbul 42 ΩK"
+    assert list(encode_key(text)) == [character_to_key(c) for c in text]
+    # second pass goes through the cached table entries
+    assert list(encode_key(text)) == [character_to_key(c) for c in text]
+
+def test_normalize_key():
+    assert normalize_key("Park.") == "park_"
+    assert normalize_key("café") == "caf_"
+    assert list(normalize_keys(["Park.", "café", ""])) == ["park_", "caf_", ""]
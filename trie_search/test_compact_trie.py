@@ -0,0 +1,39 @@
+import random
+from trie_search.trie import Trie
+from trie_search.compact_trie import CompactTrie
+
+
+def test_compact_matches_trie():
+    rng = random.Random(0)
+    words = ["".join(rng.choices("abcde_", k=rng.randint(1, 6))) for _ in range(500)]
+    t = Trie()
+    c = CompactTrie()
+    for i, word in enumerate(words):
+        t[word] = i
+        c[word] = i
+    for word in words[::3]:
+        if word in t:
+            del t[word]
+            del c[word]
+    assert list(c) == list(t)
+    assert len(c) == len(t)
+
+
+def test_compact_reuses_freed_nodes():
+    c = CompactTrie()
+    c["abc"] = 1
+    nodes = len(c._first)
+    del c["abc"]
+    c["xyz"] = 2
+    assert len(c._first) == nodes
+    assert list(c) == [("xyz", 2)]
+
+
+def test_compact_delete_keeps_siblings():
+    c = CompactTrie()
+    for word in ["ca", "cb", "cc"]:
+        c[word] = word
+    del c["cb"]
+    assert list(c) == [("ca", "ca"), ("cc", "cc")]
+    del c["ca"]
+    assert list(c) == [("cc", "cc")]
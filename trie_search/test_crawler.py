@@ -1,10 +1,17 @@
+from array import array
 import pytest
-from trie_search.crawler import crawl_site, build_index
-from trie_search.utils import _seen_already
+from trie_search.async_crawler import AsyncWebCrawler
+from trie_search.crawler import WebCrawler, crawl_site, build_index, parse_page
+from trie_search.postings import DocumentTable
+from trie_search.query import QueryEngine, count_terms
+from trie_search.tokenizer import ENGLISH_STOPWORDS, Tokenizer
+from trie_search.utils import _seen_already, get_links, get_text
 
 
 EXAMPLE_URL = "https://example.com"
 PARKS_URL = "https://scrapple.fly.dev/parks"
+# the site the fixtures in conftest.py serve
+BASE = "https://example.com"
 
 
 # this fixture resets the internal check on if we've visited
@@ -70,3 +77,93 @@ def test_build_index_parks(fresh_seen):
         PARKS_URL + "/6",
         PARKS_URL + "/8",
     }
+
+
+def test_parse_page_matches_helpers():
+    html = (
+        '<html><body><h1>Chicago Parks</h1> <a href="/parks/1">Jensen</a> '
+        '<a href="https://example.com/x?y=1">elsewhere</a>'
+        ' <p>almond, baseball.</p></body></html>'
+    )
+    words, links = parse_page(html, PARKS_URL)
+    assert words == get_text(html).split()
+    assert links == get_links(html, PARKS_URL)
+    assert parse_page(html, PARKS_URL, want_links=False) == (words, [])
+
+
+@pytest.mark.parametrize("depth", [0, 2, 3])
+def test_streaming_index_matches_batch(serial_fetch, depth):
+    expected = list(WebCrawler(BASE, depth).build_index())
+    crawler = WebCrawler(BASE, depth, stream=True, keep_results=False)
+    trie = crawler.build_index()
+    assert list(trie) == expected
+    assert crawler.results == {}
+    assert crawler.build_index() is trie
+
+
+def test_keep_results_off_needs_stream():
+    with pytest.raises(ValueError):
+        WebCrawler(BASE, 1, keep_results=False)
+    with pytest.raises(ValueError):
+        AsyncWebCrawler(BASE, 1, keep_results=False)
+
+
+def test_streaming_index_async_and_workers(serial_fetch, transport):
+    expected = list(WebCrawler(BASE, 3).build_index())
+    crawler = WebCrawler(BASE, 3, parse_workers=2, stream=True)
+    assert list(crawler.build_index()) == expected
+    assert list(crawler.results) == list(WebCrawler(BASE, 3).crawl())
+    crawler = AsyncWebCrawler(BASE, 3, stream=True, keep_results=False,
+                              transport=transport)
+    assert list(crawler.build_index()) == expected
+
+
+def test_streaming_index_grows_during_crawl(serial_fetch):
+    sizes = []
+
+    class Watched(WebCrawler):
+        def _index_page(self, url, words):
+            super()._index_page(url, words)
+            sizes.append(len(self.index))
+
+    Watched(BASE, 2, stream=True).crawl()
+    assert len(sizes) == 4
+    assert sizes == sorted(sizes) and sizes[0] > 0
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_index_records_term_frequencies(serial_fetch, stream):
+    crawler = WebCrawler(BASE, 3, stream=stream)
+    trie = crawler.build_index()
+    frequencies, lengths = count_terms(DocumentTable(), crawler.results.items())
+    assert crawler.frequencies == frequencies
+    assert crawler.lengths == lengths
+    for word, counts in crawler.frequencies.items():
+        assert len(counts) == len(trie[word])
+    ranked = QueryEngine(trie, crawler.documents, crawler.frequencies, crawler.lengths)
+    expected = QueryEngine.from_results(trie, crawler.documents, crawler.results)
+    assert ranked.search("page") == expected.search("page")
+
+
+def test_index_counts_repeated_words_once(serial_fetch, monkeypatch):
+    pages = {BASE: "<p>Park park PARK, park lake</p>"}
+    monkeypatch.setattr("trie_search.crawler.fetch_html", lambda url: pages[url])
+    crawler = WebCrawler(BASE, 0)
+    trie = crawler.build_index()
+    assert list(trie) == [("lake", {BASE}), ("park", {BASE}), ("park_", {BASE})]
+    assert crawler.frequencies == {"park": array("I", [3]), "park_": array("I", [1]),
+                                   "lake": array("I", [1])}
+    assert crawler.lengths == array("I", [5])
+
+
+def test_tokenizer_applied_to_pages(serial_fetch, transport):
+    tokenizer = Tokenizer(stopwords=ENGLISH_STOPWORDS)
+    expected = WebCrawler(BASE, 3, tokenizer=tokenizer).crawl()
+    assert expected[BASE] == ["one", "two", "away", "index", "page"]
+    crawler = WebCrawler(BASE, 3, parse_workers=2, tokenizer=tokenizer)
+    assert list(crawler.crawl().items()) == list(expected.items())
+    crawler = AsyncWebCrawler(BASE, 3, tokenizer=tokenizer, transport=transport)
+    assert crawler.crawl() == expected
+    # without one, text is still split on whitespace
+    words = "one two away this is the index page".split()
+    assert WebCrawler(BASE, 0).crawl()[BASE] == words
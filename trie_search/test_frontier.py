@@ -0,0 +1,136 @@
+import time
+import pytest
+from trie_search.crawler import WebCrawler
+from trie_search.frontier import BloomFilter, Frontier, canonicalize_url, url_key
+
+
+@pytest.mark.parametrize("url, canonical", [
+    ("https://example.com", "https://example.com"),
+    ("https://example.com/", "https://example.com"),
+    ("HTTPS://Example.COM:443/Parks#top", "https://example.com/Parks"),
+    ("https://example.com/parks/?b=2&a=1&b=1", "https://example.com/parks/?a=1&b=2&b=1"),
+    ("https://example.com:8443/x?q", "https://example.com:8443/x?q"),
+    (" https://example.com/a#", "https://example.com/a"),
+])
+def test_canonicalize_url(url, canonical):
+    assert canonicalize_url(url) == canonical
+
+
+def test_url_key():
+    assert url_key("https://example.com/parks/") == url_key("https://example.com/parks")
+    assert url_key("https://example.com/parks/?page=2") == "https://example.com/parks?page=2"
+
+
+def test_add_dedupes_and_filters():
+    frontier = Frontier(1)
+    assert frontier.add("https://example.com", 0)
+    assert not frontier.add("https://example.com/", 1)
+    assert frontier.add("https://example.com/a#one", 1)
+    assert not frontier.add("https://example.com/a#two", 1)
+    assert not frontier.add("https://example.com/a/", 1)
+    assert not frontier.add("https://example.com/b", 2)
+    assert not frontier.add("https://elsewhere.org", 1)
+    assert len(frontier) == 2
+    assert frontier.pop() == ("https://example.com", 0)
+    assert frontier.pop() == ("https://example.com/a", 1)
+    assert not frontier
+    with pytest.raises(IndexError):
+        frontier.pop()
+
+
+def test_pop_is_breadth_first_across_hosts():
+    frontier = Frontier(3)
+    frontier.add("https://example.com/deep", 2)
+    frontier.add("https://scrapple.fly.dev/parks/1", 1)
+    frontier.add("https://example.com/shallow", 1)
+    frontier.add("https://scrapple.fly.dev/parks", 0)
+    assert [frontier.pop() for _ in range(4)] == [
+        ("https://scrapple.fly.dev/parks", 0),
+        ("https://scrapple.fly.dev/parks/1", 1),
+        ("https://example.com/shallow", 1),
+        ("https://example.com/deep", 2),
+    ]
+
+
+def test_pop_level():
+    frontier = Frontier(3)
+    for url, depth in [("https://example.com/b", 1),
+                       ("https://scrapple.fly.dev/parks", 1),
+                       ("https://example.com/c", 2), ("https://example.com/a", 1)]:
+        frontier.add(url, depth)
+    assert frontier.pop_level() == (1, ["https://example.com/b", "https://scrapple.fly.dev/parks",
+                                        "https://example.com/a"])
+    assert frontier.pop_level() == (2, ["https://example.com/c"])
+    assert len(frontier) == 0
+
+
+def test_rate_limit_prefers_ready_hosts():
+    now = [0.0]
+    slept = []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        now[0] += seconds
+
+    frontier = Frontier(2, delay=1.0, clock=lambda: now[0], sleep=sleep)
+    for url in ["https://example.com/1", "https://example.com/2", "https://scrapple.fly.dev/parks/1"]:
+        frontier.add(url, 1)
+    assert frontier.pop()[0] == "https://example.com/1"
+    # example.com must wait, the other host is ready
+    assert frontier.pop()[0] == "https://scrapple.fly.dev/parks/1"
+    assert slept == []
+    assert frontier.pop()[0] == "https://example.com/2"
+    assert slept == [1.0]
+    # level crawls book slots one delay apart
+    assert frontier.reserve("https://example.com/3") == 1.0
+    assert frontier.reserve("https://example.com/4") == 2.0
+    assert frontier.reserve("https://scrapple.fly.dev/parks/2") == 0.0
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(1000, error_rate=0.01)
+    urls = [f"https://example.com/{i}" for i in range(1000)]
+    for url in urls:
+        bloom.add(url)
+    assert all(url in bloom for url in urls)
+    false_positives = sum(f"https://example.com/other/{i}" in bloom
+                          for i in range(10000))
+    assert false_positives < 300
+    assert 1 not in bloom
+    with pytest.raises(ValueError):
+        BloomFilter(0)
+
+
+SITE = {
+    "https://example.com": '<a href="/a#x">a</a> <a href="/a/">a</a>'
+                           ' <a href="/b?y=2&x=1">b</a>'
+                           ' <a href="https://EXAMPLE.com/b?x=1&y=2#z">b</a>'
+                           ' <a href="/">home</a> <p>home</p>',
+    "https://example.com/a": '<a href="https://example.com/#top">home</a>'
+                             ' <p>page a</p>',
+    "https://example.com/b?x=1&y=2": "<p>page b</p>",
+}
+
+
+@pytest.mark.parametrize("options", [{}, {"parse_workers": 2}, {"bloom_capacity": 100}])
+def test_equivalent_links_fetched_once(monkeypatch, options):
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        return SITE[url]
+
+    monkeypatch.setattr("trie_search.crawler.fetch_html", fetch)
+    results = WebCrawler("https://example.com/", 2, **options).crawl()
+    assert fetched == list(SITE)
+    assert list(results) == list(SITE)
+
+
+def test_crawl_delay(monkeypatch):
+    monkeypatch.setattr("trie_search.crawler.fetch_html", lambda url: SITE[url])
+    crawler = WebCrawler("https://example.com", 1, crawl_delay=0.05)
+    start = time.monotonic()
+    assert len(crawler.crawl()) == 3
+    # three requests to one host, two delays apart
+    assert time.monotonic() - start >= 0.1
+    assert crawler.frontier is not None and not crawler.frontier
@@ -0,0 +1,98 @@
+import os
+import httpx
+from trie_search.async_crawler import AsyncWebCrawler
+from trie_search.crawler import WebCrawler, crawl_site
+from trie_search.http_cache import ResponseCache
+from trie_search.stats import CrawlStats
+
+BASE = "https://example.com"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_put(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    assert cache.get(BASE) is None
+    html = "<p>" + "café park " * 200 + "</p>"
+    cache.put(BASE + "/", html)
+    assert cache.get(BASE + "#top") == html
+    assert (cache.hits, cache.misses) == (1, 1)
+    # stored compressed
+    assert 0 < cache.bytes < len(html) / 10
+    assert ResponseCache(str(tmp_path)).bytes == cache.bytes
+
+
+def test_ttl_and_replay(tmp_path):
+    clock = Clock()
+    cache = ResponseCache(str(tmp_path), ttl=60, clock=clock)
+    cache.put(BASE, "<p>old</p>")
+    clock.now += 30
+    assert cache.get(BASE) == "<p>old</p>"
+    clock.now += 60
+    replay = ResponseCache(str(tmp_path), ttl=60, replay=True, clock=clock)
+    assert replay.get(BASE) == "<p>old</p>"
+    assert cache.get(BASE) is None
+    assert cache.bytes == 0
+    assert ResponseCache(str(tmp_path), ttl=None).get(BASE) is None
+
+
+def test_eviction_removes_oldest(tmp_path):
+    clock = Clock()
+    cache = ResponseCache(str(tmp_path), max_bytes=200, clock=clock)
+    for number in range(10):
+        clock.now += 1
+        cache.put(f"{BASE}/{number}", f"<p>page {number}</p>")
+    assert cache.bytes <= 200
+    assert cache.get(f"{BASE}/9") == "<p>page 9</p>"
+    assert cache.get(f"{BASE}/0") is None
+
+
+def test_damaged_entry_is_a_miss(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put(BASE, "<p>fine</p>")
+    with open(cache._path(BASE), "wb") as file:
+        file.write(b"not gzip")
+    assert cache.get(BASE) is None
+    assert not os.path.exists(cache._path(BASE))
+
+
+def test_crawl_reads_through_and_replays(tmp_path, monkeypatch, site, fake_fetch):
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        return fake_fetch(url)
+
+    monkeypatch.setattr("trie_search.crawler.fetch_html", fetch)
+    expected = crawl_site(BASE, 3, cache=ResponseCache(str(tmp_path)))
+    assert len(fetched) == len(site) + 1  # and one broken link
+
+    def offline(url):
+        raise AssertionError("fetched " + url)
+
+    monkeypatch.setattr("trie_search.crawler.fetch_html", offline)
+    stats = CrawlStats()
+    crawler = WebCrawler(BASE, 3, stats=stats,
+                         cache=ResponseCache(str(tmp_path), replay=True))
+    assert crawler.crawl() == expected
+    assert stats.cache_hits == len(site)
+    assert stats.failures == {"FetchException": 1}
+
+    crawler = AsyncWebCrawler(BASE, 3, cache=ResponseCache(str(tmp_path), replay=True),
+                              transport=httpx.MockTransport(offline))
+    assert crawler.crawl() == expected
+
+
+def test_async_crawl_fills_cache(tmp_path, site, transport):
+    cache = ResponseCache(str(tmp_path))
+    expected = AsyncWebCrawler(BASE, 3, cache=cache, transport=transport).crawl()
+    assert cache.get(BASE + "/four") == site[BASE + "/four"]
+    replay = ResponseCache(str(tmp_path), replay=True)
+    replayed = WebCrawler(BASE, 3, cache=replay).crawl()
+    assert replayed == expected
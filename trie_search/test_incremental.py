@@ -0,0 +1,143 @@
+import httpx
+import pytest
+from trie_search.incremental import CrawlState, IncrementalCrawler
+
+
+BASE = "https://example.com"
+
+
+class Site:
+    """
+    An in-memory site that honours If-None-Match and counts full responses.
+    """
+    def __init__(self, pages):
+        self.pages = dict(pages)
+        self.versions = {url: 1 for url in pages}
+        self.full = []
+        self.not_modified = []
+
+    def edit(self, url, html):
+        self.pages[url] = html
+        self.versions[url] = self.versions.get(url, 0) + 1
+
+    def handler(self, request):
+        url = str(request.url).rstrip("/")
+        if url not in self.pages:
+            return httpx.Response(404)
+        etag = f'"{self.versions[url]}"'
+        if request.headers.get("If-None-Match") == etag:
+            self.not_modified.append(url)
+            return httpx.Response(304)
+        self.full.append(url)
+        return httpx.Response(200, text=self.pages[url], headers={"ETag": etag})
+
+
+@pytest.fixture
+def site():
+    return Site({
+        BASE: '<a href="/one">one</a> <a href="/two">two</a> <p>index park</p>',
+        BASE + "/one": "<p>park pond</p>",
+        BASE + "/two": "<p>park lake</p>",
+    })
+
+
+def crawl(site, state):
+    crawler = IncrementalCrawler(BASE, 1, state,
+                                 transport=httpx.MockTransport(site.handler))
+    return crawler, crawler.update_index()
+
+
+def test_first_run_indexes_everything(site):
+    crawler, trie = crawl(site, CrawlState())
+    assert trie["park"] == {BASE, BASE + "/one", BASE + "/two"}
+    assert len(crawler.changed) == 3
+    assert site.full == [BASE, BASE + "/one", BASE + "/two"]
+
+
+def test_unchanged_run_skips_pages(site):
+    state = CrawlState()
+    first, trie = crawl(site, state)
+    site.full.clear()
+    crawler = IncrementalCrawler(BASE, 1, state, trie, first.documents,
+                                 transport=httpx.MockTransport(site.handler))
+    assert crawler.update_index() is trie
+    assert site.full == []
+    assert site.not_modified == [BASE, BASE + "/one", BASE + "/two"]
+    assert crawler.results == {}
+
+
+def test_changed_page_applies_word_diff(site):
+    state = CrawlState()
+    first, trie = crawl(site, state)
+    site.edit(BASE + "/one", "<p>park meadow</p>")
+    site.full.clear()
+    crawler = IncrementalCrawler(BASE, 1, state, trie, first.documents,
+                                 transport=httpx.MockTransport(site.handler))
+    crawler.update_index()
+    assert site.full == [BASE + "/one"]
+    assert "pond" not in trie
+    assert trie["meadow"] == {BASE + "/one"}
+    assert trie["park"] == {BASE, BASE + "/one", BASE + "/two"}
+    assert state.pages[BASE + "/one"]["words"] == ["meadow", "park"]
+
+
+def test_removed_page_is_dropped(site, tmp_path):
+    state = CrawlState()
+    crawl(site, state)
+    path = tmp_path / "state.json"
+    state.save(path)
+
+    del site.pages[BASE + "/two"]
+    # no trie given: the previous index is rebuilt from the saved state
+    crawler, trie = crawl(site, CrawlState.load(path))
+    assert "lake" not in trie
+    assert trie["park"] == {BASE, BASE + "/one"}
+    assert BASE + "/two" not in crawler.state.pages
+    assert site.full == [BASE, BASE + "/one", BASE + "/two"]
+
+
+def test_same_content_new_etag_is_unchanged(site):
+    state = CrawlState()
+    first, trie = crawl(site, state)
+    site.edit(BASE + "/two", site.pages[BASE + "/two"])
+    crawler = IncrementalCrawler(BASE, 1, state, trie, first.documents,
+                                 transport=httpx.MockTransport(site.handler))
+    crawler.update_index()
+    assert crawler.changed == {}
+    assert state.pages[BASE + "/two"]["etag"] == '"2"'
+
+
+@pytest.mark.parametrize("status", [500, 503, 302])
+def test_error_response_keeps_page(site, status):
+    state = CrawlState()
+    first, trie = crawl(site, state)
+    handler = site.handler
+
+    def failing(request):
+        if str(request.url) == BASE + "/one":
+            return httpx.Response(status, text="<p>service unavailable maintenance</p>")
+        return handler(request)
+
+    crawler = IncrementalCrawler(BASE, 1, state, trie, first.documents,
+                                 transport=httpx.MockTransport(failing))
+    crawler.update_index()
+    assert crawler.changed == {}
+    assert crawler.failed == {BASE + "/one"}
+    assert "maintenance" not in trie
+    assert trie["pond"] == {BASE + "/one"}
+    assert state.pages[BASE + "/one"]["words"] == ["park", "pond"]
+
+
+def test_error_response_for_new_page_is_skipped():
+    site = Site({BASE: '<a href="/down">down</a> <p>index</p>'})
+    handler = site.handler
+
+    def failing(request):
+        if str(request.url) == BASE + "/down":
+            return httpx.Response(503, text="<p>maintenance</p>")
+        return handler(request)
+
+    crawler = IncrementalCrawler(BASE, 1, transport=httpx.MockTransport(failing))
+    trie = crawler.update_index()
+    assert "maintenance" not in trie
+    assert list(crawler.state.pages) == [BASE]
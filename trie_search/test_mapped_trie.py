@@ -0,0 +1,110 @@
+import pytest
+from trie_search.trie import Trie
+from trie_search.compact_trie import CompactTrie
+from trie_search.radix_trie import RadixTrie
+from trie_search.mapped_trie import MappedTrie
+from trie_search.postings import DocumentTable, PostingList, intersect
+
+
+def make_index(trie_class):
+    t = trie_class()
+    t["park"] = {"u1", "u2"}
+    t["parks"] = {"u2"}
+    t["chicago"] = {"u1", "u2", "u3"}
+    t["a_b"] = {"ünïcode/url"}
+    t["empty"] = set()
+    return t
+
+
+@pytest.mark.parametrize("trie_class", [Trie, CompactTrie, RadixTrie])
+def test_save_and_load(tmp_path, trie_class):
+    t = make_index(trie_class)
+    path = tmp_path / "index.trie"
+    t.save(path)
+    with Trie.load(path) as loaded:
+        assert isinstance(loaded, MappedTrie)
+        assert len(loaded) == len(t)
+        assert list(loaded) == list(t)
+        assert loaded["Park"] == {"u1", "u2"}
+        assert loaded["empty"] == set()
+        assert "par" not in loaded
+        assert "zebra" not in loaded
+        assert list(loaded.wildcard_search("par**")) == [("parks", {"u2"})]
+
+
+def test_load_empty(tmp_path):
+    path = tmp_path / "empty.trie"
+    Trie().save(path)
+    with Trie.load(path) as loaded:
+        assert len(loaded) == 0
+        assert list(loaded) == []
+
+
+def test_mapped_is_read_only(tmp_path):
+    path = tmp_path / "index.trie"
+    make_index(Trie).save(path)
+    with Trie.load(path) as loaded:
+        with pytest.raises(TypeError):
+            loaded["park"] = {"u4"}
+        with pytest.raises(TypeError):
+            del loaded["park"]
+
+
+def test_save_rejects_other_values(tmp_path):
+    t = Trie()
+    t["a"] = 1
+    with pytest.raises(TypeError):
+        t.save(tmp_path / "bad.trie")
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "junk"
+    path.write_bytes(b"\0" * 1024)
+    with pytest.raises(ValueError):
+        Trie.load(path)
+
+
+@pytest.mark.parametrize("keep", [0, 10, 100, -1])
+def test_load_rejects_truncated_files(tmp_path, monkeypatch, keep):
+    path = tmp_path / "index.trie"
+    make_index(Trie).save(path)
+    data = path.read_bytes()
+    path.write_bytes(data[:keep] if keep >= 0 else data[:-8])
+    closed = []
+    close = MappedTrie.close
+
+    def tracked_close(self):
+        closed.append(self)
+        close(self)
+
+    monkeypatch.setattr(MappedTrie, "close", tracked_close)
+    with pytest.raises(ValueError):
+        Trie.load(path)
+    assert len(closed) == (keep != 0)
+
+
+def test_save_and_load_posting_lists(tmp_path):
+    documents = DocumentTable()
+    t = Trie()
+    t["park"] = PostingList(documents, ["https://b", "https://a"])
+    t["pond"] = PostingList(documents, ["https://b", "https://c"])
+    path = tmp_path / "index.trie"
+    t.save(path)
+    with Trie.load(path) as loaded:
+        park = loaded["park"]
+        assert isinstance(park, PostingList)
+        assert park == {"https://a", "https://b"}
+        assert "https://c" not in park
+        assert intersect(park, loaded["pond"]) == {"https://b"}
+        assert PostingList(loaded.documents, ["https://c"]) == loaded["pond"] - park
+
+
+def test_mapped_autocomplete(tmp_path):
+    path = tmp_path / "index.trie"
+    make_index(Trie).save(path)
+    with Trie.load(path) as loaded:
+        assert loaded.autocomplete("par") == [("park", {"u1", "u2"}), ("parks", {"u2"})]
+        assert [k for k, _ in loaded.prefix_search("p")] == ["park", "parks"]
+        loaded.precompute_completions()
+        assert loaded.autocomplete("p", 1) == [("park", {"u1", "u2"})]
+        assert loaded.prefix_count("pa") == 2
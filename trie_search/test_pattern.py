@@ -0,0 +1,67 @@
+import pytest
+from trie_search.pattern import GlobPattern, compile_glob
+
+
+@pytest.mark.parametrize("pattern, key, expected", [
+    ("park", "park", True),
+    ("park", "Park", True),
+    ("park", "parks", False),
+    ("p?rk", "perk", True),
+    ("p?rk", "prk", False),
+    ("par*", "par", True),
+    ("par*", "parking", True),
+    ("par*k*", "paperwork", False),
+    ("pa*k*", "paperwork", True),
+    ("*", "", True),
+    ("**a", "a", True),
+    ("[bc]at", "cat", True),
+    ("[bc]at", "rat", False),
+    ("[a-c]at", "bat", True),
+    ("[!a-c]at", "bat", False),
+    ("[!a-c]at", "rat", True),
+    ("a_b", "a.b", True),
+    ("[]]", "_", True),
+])
+def test_match(pattern, key, expected):
+    assert GlobPattern(pattern).match(key) == expected
+
+
+def test_stars_share_states():
+    # a determinized pattern has few states however many '*' it has
+    glob = GlobPattern("*a*a*a*a*a*")
+    assert glob.match("b" * 50 + "a" * 5)
+    assert not glob.match("ab" * 4)
+    assert len(glob.accepting) <= 8
+
+
+def test_unterminated_class():
+    with pytest.raises(ValueError):
+        GlobPattern("[ab")
+
+
+def test_compile_glob_is_cached():
+    assert compile_glob("pa*") is compile_glob("pa*")
+
+
+def test_shared_between_threads():
+    import random
+    import threading
+
+    keys = ["".join(random.Random(seed).choices("abc", k=12)) for seed in range(200)]
+    expected = [GlobPattern("*a?b*c[ab]*").match(key) for key in keys]
+    for _ in range(20):
+        glob = GlobPattern("*a?b*c[ab]*")
+        start = threading.Barrier(4)
+        results = []
+
+        def match():
+            start.wait()
+            results.append([glob.match(key) for key in keys])
+
+        threads = [threading.Thread(target=match) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [expected] * 4
+        assert len(set(glob._numbers.values())) == len(glob.accepting)
@@ -0,0 +1,67 @@
+import pytest
+from trie_search.postings import DocumentTable, PostingList, intersect, union
+
+
+def test_document_table():
+    documents = DocumentTable(["u0", "u1"])
+    assert documents.add("u1") == 1
+    assert documents.add("u2") == 2
+    assert documents[2] == "u2"
+    assert documents.get_id("missing") is None
+    assert len(documents) == 3
+
+
+def test_posting_list_is_a_set_of_urls():
+    documents = DocumentTable()
+    postings = PostingList(documents, ["b", "a", "b"])
+    assert len(postings) == 2
+    assert postings == {"a", "b"}
+    assert {"a", "b"} == postings
+    assert "a" in postings
+    assert "c" not in postings
+    assert 1 not in postings
+    assert list(postings.ids) == [0, 1]
+
+
+def test_posting_list_add_discard_update():
+    documents = DocumentTable(["a", "b", "c", "d"])
+    postings = PostingList(documents, ["c"])
+    postings.add("a")
+    postings.add("a")
+    postings.update(["d", "b", "c"])
+    assert list(postings.ids) == [0, 1, 2, 3]
+    postings.discard("b")
+    postings.discard("missing")
+    assert postings == {"a", "c", "d"}
+    postings.add("e")
+    assert list(postings.ids) == [0, 2, 3, 4]
+    # only newer documents: appended
+    postings.update(["g", "f", "g"])
+    assert list(postings.ids) == [0, 2, 3, 4, 5, 6]
+    postings.update([])
+    postings.update(["a", "b"])
+    assert list(postings.ids) == [0, 1, 2, 3, 4, 5, 6]
+
+
+def test_intersect_and_union():
+    documents = DocumentTable()
+    one = PostingList(documents, ["a", "b", "c", "d"])
+    two = PostingList(documents, ["b", "d", "e"])
+    three = PostingList(documents, ["d", "b"])
+    assert intersect(one, two, three) == {"b", "d"}
+    assert intersect(one, PostingList(documents)) == set()
+    assert union(one, two) == {"a", "b", "c", "d", "e"}
+    assert one & two == {"b", "d"}
+    assert one | three == one
+    assert (one - two) == {"a", "c"}
+    with pytest.raises(ValueError):
+        intersect()
+
+
+def test_posting_list_copy():
+    documents = DocumentTable()
+    postings = PostingList(documents, ["a"])
+    copied = postings.copy()
+    copied.add("b")
+    assert postings == {"a"}
+    assert copied == {"a", "b"}
@@ -0,0 +1,104 @@
+import pytest
+from trie_search.compact_trie import CompactTrie
+from trie_search.postings import DocumentTable, PostingList
+from trie_search.query import Query, QueryEngine, count_terms
+from trie_search.tokenizer import ENGLISH_STOPWORDS, Tokenizer, plural_stem
+from trie_search.trie import Trie
+
+
+RESULTS = {
+    "u0": "the park in chicago has a park and a dog park".split(),
+    "u1": "chicago river walk".split(),
+    "u2": "park garden, dog garden".split(),
+    "u3": "the parking lot near the river".split(),
+}
+
+
+def make_engine(trie_class=Trie, results=RESULTS):
+    documents = DocumentTable(results)
+    trie = trie_class()
+    trie.bulk_update(((word, url) for url, words in results.items() for word in words),
+                     factory=lambda urls: PostingList(documents, urls))
+    return QueryEngine.from_results(trie, documents, results)
+
+
+def test_parse():
+    query = Query.parse("Park chicago OR -dog garden* OR NOT river")
+    assert query.groups == [(["park", "chicago"], []), (["garden*"], ["dog"]),
+                            ([], ["river"])]
+    assert query.terms() == ["park", "chicago", "garden*"]
+    assert Query.parse("  ").groups == []
+
+
+def test_parse_with_tokenizer():
+    tokenizer = Tokenizer(stopwords=ENGLISH_STOPWORDS, stemmer=plural_stem)
+    query = Query.parse("The Parks, new-york -Cafés par*", tokenizer)
+    assert query.groups == [(["park", "new", "york", "par*"], ["cafe"])]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("park", {"u0", "u2"}),
+    ("park chicago", {"u0"}),
+    ("PARK Chicago", {"u0"}),
+    ("park missing", set()),
+    ("park OR river", {"u0", "u1", "u2", "u3"}),
+    ("park -dog", set()),
+    ("chicago NOT dog", {"u1"}),
+    ("-river", {"u0", "u2"}),
+    ("park*", {"u0", "u2", "u3"}),
+    ("park* -park", {"u3"}),
+    ("garden,", {"u2"}),
+    ("", set()),
+])
+def test_match(query, expected):
+    assert make_engine().match(query) == expected
+
+
+def test_match_uses_every_pattern_word():
+    # "park" is the fourth word *ark matches, past max_expansions
+    results = {"u0": ["aark", "bark", "cark"], "u1": ["park"], "u2": ["park", "river"]}
+    engine = make_engine(results=results)
+    engine.max_expansions = 3
+    assert [word for word, _ in engine.trie.glob_search("*ark")][3] == "park"
+    assert engine.match("*ark") == {"u0", "u1", "u2"}
+    assert engine.match("*ark river") == {"u2"}
+    assert engine.match("river -*ark") == set()
+    assert {url for url, _ in engine.search("*ark river")} == {"u2"}
+
+
+def test_search_ranks_by_frequency():
+    engine = make_engine(CompactTrie)
+    results = engine.search("park")
+    assert [url for url, _ in results] == ["u0", "u2"]
+    assert results[0][1] > results[1][1] > 0
+    assert engine.search("park", k=1) == results[:1]
+    ranked = engine.search("park OR river", scoring="tfidf")
+    assert [url for url, _ in ranked][:1] == ["u0"]
+    assert engine.search("missing") == []
+
+
+def test_search_rare_words_score_higher():
+    engine = make_engine()
+    (_, chicago), = engine.search("chicago walk")
+    (_, alone), = engine.search("walk")
+    assert chicago > alone
+
+
+def test_search_without_frequencies():
+    engine = make_engine()
+    plain = QueryEngine(engine.trie, engine.documents)
+    assert {url for url, _ in plain.search("park")} == {"u0", "u2"}
+
+
+def test_search_bad_scoring():
+    with pytest.raises(ValueError):
+        make_engine().search("park", scoring="pagerank")
+
+
+def test_count_terms():
+    documents = DocumentTable(["u1", "u0"])
+    pages = [("u0", ["a", "A", "b"]), ("u1", ["a"])]
+    frequencies, lengths = count_terms(documents, pages)
+    assert list(frequencies["a"]) == [1, 2]
+    assert list(frequencies["b"]) == [1]
+    assert list(lengths) == [1, 3]
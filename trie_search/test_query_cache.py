@@ -0,0 +1,97 @@
+import pytest
+from trie_search.compact_trie import CompactTrie
+from trie_search.query_cache import QueryCache
+from trie_search.radix_trie import RadixTrie
+from trie_search.trie import Trie
+
+
+@pytest.fixture(params=[Trie, CompactTrie, RadixTrie])
+def trie(request):
+    t = request.param()
+    for key in ["cat", "cot", "cut", "dog"]:
+        t[key] = key
+    return t
+
+
+def test_cache_hits_and_misses(trie):
+    cache = trie.enable_query_cache()
+    first = list(trie.wildcard_search("c*t"))
+    assert list(trie.wildcard_search("c*t")) == first
+    assert list(trie.prefix_search("c", limit=2)) == [("cat", "cat"), ("cot", "cot")]
+    assert list(trie.glob_search("*o*")) == [("cot", "cot"), ("dog", "dog")]
+    close = [("cat", "cat", 0), ("cot", "cot", 1), ("cut", "cut", 1)]
+    assert list(trie.fuzzy_search("cat", 1)) == close
+    assert list(trie.fuzzy_search("cat", 1)) == close
+    assert cache.hits == 2
+    assert cache.misses == 4
+    assert cache.stats()["entries"] == 4
+
+
+def test_uncached_search_is_lazy(trie):
+    cache = trie.enable_query_cache()
+    results = trie.wildcard_search("c*t", cached=False)
+    assert next(results) == ("cat", "cat")
+    assert list(trie.prefix_search("c", cached=False)) == list(trie.prefix_search("c"))
+    assert cache.stats()["entries"] == 1
+    assert cache.misses == 1
+
+
+@pytest.mark.parametrize("write", [
+    lambda t: t.__setitem__("cit", "cit"),
+    lambda t: t.__delitem__("cot"),
+    lambda t: t.setdefault("cit", "cit"),
+    lambda t: t.bulk_update([("cit", "cit")]),
+])
+def test_writes_invalidate(trie, write):
+    cache = trie.enable_query_cache()
+    before = list(trie.wildcard_search("c*t"))
+    write(trie)
+    after = list(trie.wildcard_search("c*t"))
+    assert after != before
+    assert after == list(trie.wildcard_search("c*t"))
+    assert cache.invalidations == 1
+    assert cache.hits == 1
+
+
+def test_disable(trie):
+    trie.enable_query_cache()
+    trie.disable_query_cache()
+    trie["cit"] = 1
+    assert [k for k, _ in trie.wildcard_search("c*t")] == ["cat", "cit", "cot", "cut"]
+
+
+def test_lru_eviction():
+    cache = QueryCache(max_entries=2)
+    cache.put("a", 0, [("a", 1)])
+    cache.put("b", 0, [("b", 1)])
+    assert cache.get("a", 0) == [("a", 1)]
+    cache.put("c", 0, [("c", 1)])
+    assert cache.get("b", 0) is None
+    assert cache.get("a", 0) is not None
+    assert cache.evictions == 1
+    assert len(cache) == 2
+
+
+def test_memory_cap():
+    cache = QueryCache(max_entries=100, max_bytes=2000)
+    for i in range(20):
+        cache.put(i, 0, [("word%d" % i, None)] * 5)
+    assert cache.bytes <= 2000
+    assert 0 < len(cache) < 20
+    assert cache.evictions == 20 - len(cache)
+    cache.put("huge", 0, [("x" * 5000, None)])
+    assert cache.get("huge", 0) is None
+
+
+def test_stale_version():
+    cache = QueryCache()
+    cache.put("a", 1, [])
+    assert cache.get("a", 1) == []
+    assert cache.get("a", 2) is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "invalidations": 1,
+                             "hit_rate": 0.5, "entries": 0, "bytes": 0}
+
+
+def test_bad_size():
+    with pytest.raises(ValueError):
+        QueryCache(max_entries=0)
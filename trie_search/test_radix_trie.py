@@ -0,0 +1,51 @@
+import random
+from trie_search.trie import Trie
+from trie_search.radix_trie import RadixTrie
+
+
+def test_radix_splits_and_merges():
+    r = RadixTrie()
+    r["parks"] = 1
+    assert r.node_count() == 2
+    r["park"] = 2
+    r["parade"] = 3
+    # root -> "par" -> {"k" -> "s", "ade"}
+    assert r.node_count() == 5
+    del r["parade"]
+    del r["park"]
+    assert r.node_count() == 2
+    assert list(r) == [("parks", 1)]
+
+
+def test_radix_normalizes_keys():
+    r = RadixTrie()
+    r["Park."] = 1
+    assert r["park_"] == 1
+    assert list(r) == [("park_", 1)]
+
+
+def test_radix_matches_trie():
+    rng = random.Random(1)
+    words = ["".join(rng.choices("abc_", k=rng.randint(0, 6))) for _ in range(400)]
+    t = Trie()
+    r = RadixTrie()
+    for i, word in enumerate(words):
+        t[word] = i
+        r[word] = i
+    for word in words[::2]:
+        if word in t:
+            del t[word]
+            del r[word]
+    assert list(r) == list(t)
+    assert len(r) == len(t)
+    for pattern in ["***", "a*c", "*_*b", "b"]:
+        assert list(r.wildcard_search(pattern)) == list(t.wildcard_search(pattern))
+
+
+def test_radix_generic_traversal():
+    r = RadixTrie()
+    for word in ["cat", "car", "cart", "dog"]:
+        r[word] = word
+    # the character-at-a-time protocol must agree with the label-based walk
+    assert list(Trie._walk(r, r._root(), "")) == list(r)
+    assert list(Trie.wildcard_search(r, "ca*")) == list(r.wildcard_search("ca*"))
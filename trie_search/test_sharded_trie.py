@@ -0,0 +1,131 @@
+import functools
+import pytest
+from trie_search.compact_trie import CompactTrie
+from trie_search.postings import DocumentTable, PostingList
+from trie_search.radix_trie import RadixTrie
+from trie_search.sharded_trie import ShardedTrie
+from trie_search.snapshot_trie import SnapshotTrie
+from trie_search.trie import Trie
+
+WORDS = ["park", "parks", "pa_rk", "a_b", "zebra", "chicago", "cat", "cot", "z", "_x",
+         "", "parking"]
+
+
+@pytest.fixture(params=[
+    dict(),
+    dict(num_shards=4),
+    dict(num_shards=1),
+    dict(num_shards=5, partition="hash"),
+    dict(num_shards=3, partition="hash", trie_class=RadixTrie),
+    dict(num_shards=7, trie_class=CompactTrie),
+])
+def make(request):
+    return functools.partial(ShardedTrie, **request.param)
+
+
+def filled(trie):
+    for i, word in enumerate(WORDS):
+        trie[word] = i
+    return trie
+
+
+def test_matches_trie(make):
+    sharded = filled(make())
+    plain = filled(Trie())
+    assert list(sharded) == list(plain)
+    assert len(sharded) == len(plain)
+    for pattern in ["", "*", "c*t", "p*rk", "_*"]:
+        expected = list(plain.wildcard_search(pattern))
+        assert list(sharded.wildcard_search(pattern)) == expected
+    for pattern in ["*", "par*", "?a*", "[cz]*", "*k*"]:
+        assert list(sharded.glob_search(pattern)) == list(plain.glob_search(pattern))
+        expected = list(plain.glob_search(pattern, limit=2))
+        assert list(sharded.glob_search(pattern, limit=2)) == expected
+    for prefix in ["", "p", "par", "z", "q"]:
+        assert list(sharded.prefix_search(prefix)) == list(plain.prefix_search(prefix))
+        assert sharded.prefix_count(prefix) == plain.prefix_count(prefix)
+    assert list(sharded.fuzzy_search("cut", 1)) == list(plain.fuzzy_search("cut", 1))
+
+
+def test_mapping_operations(make):
+    t = filled(make())
+    assert t["Park"] == 0
+    del t["park"]
+    assert "park" not in t
+    assert t.setdefault("park", 5) == 5
+    assert t.setdefault("park", 6) == 5
+    with pytest.raises(KeyError):
+        t[1] = 2
+    with pytest.raises(KeyError):
+        del t["missing"]
+
+
+def test_bulk_load(make):
+    sharded = make()
+    sharded.bulk_load((word, i) for i, word in enumerate(WORDS))
+    assert list(sharded) == list(filled(Trie()))
+    assert len(sharded) == len(set(WORDS))
+
+
+def test_autocomplete(make):
+    t = make()
+    t["park"] = {1, 2, 3}
+    t["parks"] = {1}
+    t["pan"] = {1, 2}
+    t["zoo"] = {1, 2, 3, 4}
+    assert t.autocomplete("pa", 2) == [("park", {1, 2, 3}), ("pan", {1, 2})]
+    assert [k for k, _ in t.autocomplete("", 2)] == ["zoo", "park"]
+    t.precompute_completions(1)
+    t["pa"] = {1, 2, 3, 4, 5}
+    assert [k for k, _ in t.autocomplete("p", 2)] == ["pa", "park"]
+    assert t.prefix_count("p") == 4
+
+
+def test_save_and_load(make, tmp_path):
+    t = make()
+    t.bulk_update([("park", "u1"), ("zebra", "u2"), ("park", "u2"), ("_x", "u3")])
+    t.save(tmp_path / "index.trie")
+    with Trie.load(tmp_path / "index.trie") as loaded:
+        assert list(loaded) == list(t)
+
+
+def test_first_partition_routes_prefixes():
+    t = filled(ShardedTrie())
+    assert set(t.shard_for("park")) == {("pa_rk", 2), ("park", 0), ("parking", 11),
+                                        ("parks", 1)}
+    assert len(t.shards) == 27
+
+
+@pytest.mark.parametrize("partition", ["first", "hash"])
+def test_parallel_build(partition):
+    documents = DocumentTable(["u1", "u2", "u3"])
+    pairs = [(word, url) for url in ["u1", "u2", "u3"] for word in WORDS[:-1] if word]
+    t = ShardedTrie(num_shards=4, partition=partition, workers=2)
+    t.bulk_update(pairs, factory=lambda urls: PostingList(documents, urls))
+    expected = Trie()
+    expected.bulk_update(pairs)
+    assert list(t) == list(expected)
+    assert all(isinstance(value, PostingList) and value.documents is documents
+               for _, value in t)
+    # shards that already hold keys are updated in place
+    t.bulk_update([("park", "u4"), ("new", "u1")])
+    assert t["park"] == {"u1", "u2", "u3", "u4"}
+
+
+@pytest.mark.parametrize("trie_class", [Trie, CompactTrie, SnapshotTrie])
+def test_parallel_build_deep_keys(trie_class):
+    # the workers send pairs back, not nodes nested once per character
+    t = ShardedTrie(num_shards=4, trie_class=trie_class, workers=2)
+    t.bulk_update([("a" * 5000, "u"), ("zz", "u"), ("zz", "v")])
+    assert all(isinstance(shard, trie_class) for shard in t.shards)
+    assert t["a" * 5000] == {"u"}
+    assert t["zz"] == {"u", "v"}
+
+
+def test_bad_arguments():
+    with pytest.raises(ValueError):
+        ShardedTrie(partition="range")
+    with pytest.raises(ValueError):
+        ShardedTrie(num_shards=28)
+    with pytest.raises(ValueError):
+        ShardedTrie(num_shards=0, partition="hash")
@@ -0,0 +1,179 @@
+import threading
+import pytest
+from trie_search.postings import DocumentTable, PostingList
+from trie_search.snapshot_trie import SnapshotTrie, TrieSnapshot
+
+
+def test_snapshot_does_not_change():
+    t = SnapshotTrie()
+    t["park"] = 1
+    t["parks"] = 2
+    snap = t.snapshot()
+    t["park"] = 10
+    t["pony"] = 3
+    del t["parks"]
+    assert isinstance(snap, TrieSnapshot)
+    assert list(snap) == [("park", 1), ("parks", 2)]
+    assert len(snap) == 2
+    assert list(t) == [("park", 10), ("pony", 3)]
+    assert len(t) == 2
+
+
+def test_snapshot_is_read_only():
+    t = SnapshotTrie()
+    t["a"] = 1
+    snap = t.snapshot()
+    with pytest.raises(TypeError):
+        snap["b"] = 2
+    with pytest.raises(TypeError):
+        del snap["a"]
+    with pytest.raises(TypeError):
+        snap.bulk_update([("b", 1)])
+
+
+def test_bulk_update_copies_values():
+    documents = DocumentTable()
+    t = SnapshotTrie()
+    t.bulk_update([("park", "u1")], factory=lambda urls: PostingList(documents, urls))
+    snap = t.snapshot()
+    t.bulk_update([("park", "u2"), ("pond", "u2")])
+    assert snap["park"] == {"u1"}
+    assert t["park"] == {"u1", "u2"}
+    assert isinstance(t["park"], PostingList)
+    assert len(snap) == 1 and len(t) == 2
+
+
+def test_failed_delete_publishes_nothing():
+    t = SnapshotTrie()
+    t["ab"] = 1
+    state = t._state
+    with pytest.raises(KeyError):
+        del t["a"]
+    with pytest.raises(KeyError):
+        del t["abc"]
+    assert t._state is state
+
+
+def test_writes_share_untouched_nodes():
+    t = SnapshotTrie()
+    t["abc"] = 1
+    t["xyz"] = 2
+    before = t._root()
+    t["abd"] = 3
+    after = t._root()
+    assert after is not before
+    # the branch the write did not touch is shared, the path to the key is copied
+    assert after.children[23] is before.children[23]
+    assert after.children[0] is not before.children[0]
+
+
+def test_readers_see_whole_writes():
+    t = SnapshotTrie()
+    stop = threading.Event()
+    errors = []
+
+    def read():
+        while not stop.is_set():
+            snap = t.snapshot()
+            keys = [key for key, _ in snap]
+            # each write stores a pair of keys, so a reader sees both or neither
+            if len(keys) != len(snap) or len(keys) % 2:
+                errors.append(keys)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    try:
+        for i in range(300):
+            name = chr(97 + i // 26) + chr(97 + i % 26)
+            t.bulk_update([("a" + name, i), ("b" + name, i)])
+    finally:
+        stop.set()
+        for reader in readers:
+            reader.join()
+    assert errors == []
+    assert len(t) == 600
+
+
+def write_during_first_walk(monkeypatch, t, key, value):
+    """
+    Make the next walk of a version of `t` store key = value as soon as it
+    starts, as a writer thread could.
+    """
+    children = TrieSnapshot._children
+
+    def write_then_walk(self, node):
+        monkeypatch.setattr(TrieSnapshot, "_children", children)
+        t[key] = value
+        return children(self, node)
+
+    monkeypatch.setattr(TrieSnapshot, "_children", write_then_walk)
+
+
+def test_query_cache_ignores_results_older_than_a_write(monkeypatch):
+    t = SnapshotTrie()
+    t["cat"] = {1}
+    t.enable_query_cache()
+    write_during_first_walk(monkeypatch, t, "cot", {2})
+    assert list(t.wildcard_search("c*t")) == [("cat", {1})]
+    assert "cot" in t
+    assert list(t.wildcard_search("c*t")) == [("cat", {1}), ("cot", {2})]
+
+
+def test_autocomplete_ignores_entries_older_than_a_write(monkeypatch):
+    t = SnapshotTrie()
+    t["park"] = {1}
+    write_during_first_walk(monkeypatch, t, "parks", {1, 2})
+    assert t.autocomplete("par") == [("park", {1})]
+    assert t.autocomplete("par") == [("parks", {1, 2}), ("park", {1})]
+    assert t.prefix_count("par") == 2
+    del t["parks"]
+    assert t.autocomplete("par") == [("park", {1})]
+    assert t.prefix_count("par") == 1
+
+
+def test_autocomplete_from_many_threads():
+    t = SnapshotTrie()
+    stop = threading.Event()
+    errors = []
+
+    def read():
+        while not stop.is_set():
+            try:
+                for pair in t.autocomplete("a", 3):
+                    assert pair[0].startswith("a")
+                t.prefix_count("ab")
+                list(t.prefix_search("a", limit=5))
+            except Exception as error:
+                errors.append(error)
+
+    t.MAX_CACHED_PREFIXES = 2
+    t.enable_query_cache(max_entries=2)
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    try:
+        for i in range(300):
+            t["a" + chr(97 + i % 26) * (1 + i // 26)] = set(range(i % 7))
+            if i % 3 == 0:
+                del t["a" + chr(97 + i % 26) * (1 + i // 26)]
+    finally:
+        stop.set()
+        for reader in readers:
+            reader.join()
+    assert errors == []
+    expected = sorted(t.prefix_search("a"), key=lambda pair: (-len(pair[1]), pair[0]))
+    assert t.autocomplete("a", 3) == expected[:3]
+
+
+def test_precomputed_completions_until_a_write(monkeypatch):
+    t = SnapshotTrie()
+    for key, size in [("park", 3), ("parks", 1), ("pond", 2), ("cat", 1)]:
+        t[key] = set(range(size))
+    t.precompute_completions(1)
+    with monkeypatch.context() as patch:
+        patch.setattr(TrieSnapshot, "_compute_completions", None)
+        assert [key for key, _ in t.autocomplete("p", 2)] == ["park", "pond"]
+        assert t.prefix_count("") == 4
+    t["pa"] = set(range(5))
+    assert [key for key, _ in t.autocomplete("p", 2)] == ["pa", "park"]
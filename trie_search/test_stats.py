@@ -0,0 +1,98 @@
+import time
+import pytest
+from trie_search.async_crawler import AsyncWebCrawler
+from trie_search.crawler import WebCrawler
+from trie_search.stats import FETCH_BUCKETS, CrawlStats
+from trie_search.utils import FetchException
+
+BASE = "https://example.com"
+
+
+def test_record_and_export():
+    stats = CrawlStats()
+    stats.record_fetch(0.003, 100)
+    stats.record_fetch(0.2, 50)
+    stats.record_fetch(60.0, 10)
+    stats.record_failure(FetchException("x"))
+    stats.record_failure(ValueError("y"))
+    stats.record_failure(FetchException("z"))
+    stats.record_parse(0.5, 2, 30)
+    stats.record_tokenize(0.125)
+    stats.record_index(0.25, 30)
+
+    assert stats.pages_fetched == 3
+    assert stats.bytes_downloaded == 160
+    assert sum(stats.fetch_latency) == 3
+    assert stats.fetch_latency[0] == 1 and stats.fetch_latency[-1] == 1
+    assert stats.as_dict()["failures"] == {"FetchException": 2, "ValueError": 1}
+
+    text = stats.to_prometheus()
+    assert "# TYPE crawler_fetch_duration_seconds histogram" in text
+    assert 'crawler_fetch_duration_seconds_bucket{le="0.005"} 1' in text
+    assert 'crawler_fetch_duration_seconds_bucket{le="0.25"} 2' in text
+    assert 'crawler_fetch_duration_seconds_bucket{le="+Inf"} 3' in text
+    assert "crawler_fetch_duration_seconds_count 3" in text
+    assert 'crawler_fetch_failures_total{exception="FetchException"} 2' in text
+    assert 'crawler_stage_seconds_total{stage="index"} 0.25' in text
+    assert 'crawler_stage_seconds_total{stage="tokenize"} 0.125' in text
+    assert stats.as_dict()["tokenize_seconds"] == 0.125
+    assert text.endswith("\n")
+    assert len(FETCH_BUCKETS) + 1 == len(stats.fetch_latency)
+
+
+def test_write_prometheus(tmp_path):
+    stats = CrawlStats()
+    stats.record_fetch(0.1, 10)
+    path = tmp_path / "crawler.prom"
+    stats.write_prometheus(str(path))
+    assert path.read_text() == stats.to_prometheus()
+
+
+# depth 2 of the conftest site reaches four pages and one broken link
+FETCHED = [BASE, BASE + "/one", BASE + "/two", BASE + "/three"]
+
+
+@pytest.mark.parametrize("parse_workers", [0, 2])
+def test_stage_counts(serial_fetch, site, parse_workers):
+    stats = CrawlStats()
+    crawler = WebCrawler(BASE, 2, parse_workers=parse_workers, stats=stats)
+    crawler.build_index()
+    assert stats.pages_fetched == 4
+    assert stats.bytes_downloaded == sum(len(site[url]) for url in FETCHED)
+    assert stats.failures == {"FetchException": 1}
+    assert stats.pages_parsed == 4
+    words = sum(len(words) for words in crawler.results.values())
+    assert stats.words_parsed == stats.words_indexed == words
+    assert stats.parse_seconds > 0 and stats.index_seconds > 0
+    assert stats.tokenize_seconds > 0
+
+
+@pytest.mark.parametrize("parse_workers", [0, 2])
+def test_stream_indexing_not_counted_as_parsing(serial_fetch, monkeypatch,
+                                                parse_workers):
+    count_words = WebCrawler._count_words
+
+    def slow_count_words(self, *args, **kwargs):
+        time.sleep(0.1)
+        return count_words(self, *args, **kwargs)
+
+    monkeypatch.setattr(WebCrawler, "_count_words", slow_count_words)
+    stats = CrawlStats()
+    crawler = WebCrawler(BASE, 1, parse_workers=parse_workers, stats=stats, stream=True)
+    crawler.build_index()
+    assert stats.index_seconds >= 0.3
+    assert stats.parse_seconds + stats.tokenize_seconds < 0.1
+
+
+def test_async_fetch_counts(transport):
+    stats = CrawlStats()
+    AsyncWebCrawler(BASE, 2, transport=transport, stats=stats).crawl()
+    assert stats.pages_fetched == 4
+    assert stats.failures == {"FetchException": 1}
+    assert stats.pages_parsed == 4
+
+
+def test_no_stats_by_default(serial_fetch):
+    crawler = WebCrawler(BASE, 1)
+    crawler.build_index()
+    assert crawler.stats is None
@@ -0,0 +1,54 @@
+import pickle
+import pytest
+from trie_search.tokenizer import (ENGLISH_STOPWORDS, Tokenizer, plural_stem,
+                                   strip_accents)
+
+
+def test_strip_accents():
+    assert strip_accents("Café Crème brûlée") == "Cafe Creme brulee"
+    assert strip_accents("ﬁsh") == "fish"
+    assert strip_accents("plain") == "plain"
+
+
+@pytest.mark.parametrize("word, stem", [
+    ("parks", "park"), ("cities", "city"), ("boxes", "box"), ("buses", "bus"),
+    ("glass", "glass"), ("bus", "bus"), ("tennis", "tennis"), ("park", "park"),
+    ("is", "is"),
+])
+def test_plural_stem(word, stem):
+    assert plural_stem(word) == stem
+
+
+def test_default_tokenizer():
+    tokenizer = Tokenizer()
+    text = "Park, park. PARK!\n Café  don't foo_bar 2024 Straße"
+    assert tokenizer(text) == ["park", "park", "park", "cafe", "don", "t", "foo", "bar",
+                               "strasse"]
+    assert tokenizer("") == []
+
+
+def test_default_tokens_are_trie_keys():
+    from trie_search.trie import normalize_key
+
+    words = Tokenizer()("1999 2024 Ελλάδα l'été naïve x2y ½")
+    assert words == ["l", "ete", "naive", "x", "y"]
+    # every word is its own trie key: nothing turns into "_"
+    assert [normalize_key(word) for word in words] == words
+
+
+def test_tokenizer_options():
+    tokenizer = Tokenizer(pattern=r"[^\W_]+", casefold=False, strip_accents=False)
+    assert tokenizer("Café Park,") == ["Café", "Park"]
+    assert Tokenizer(casefold=False)("Café Park,") == ["Cafe", "Park"]
+    tokenizer = Tokenizer(stopwords=["The", "À"], stemmer=plural_stem)
+    words = tokenizer("The parks of a city, the cities à Paris")
+    assert words == ["park", "of", "city", "city", "paris"]
+    assert Tokenizer(pattern=r"[a-z]+")("abc-def12") == ["abc", "def"]
+
+
+def test_tokenizer_pickles():
+    tokenizer = Tokenizer(stopwords=ENGLISH_STOPWORDS, stemmer=plural_stem)
+    assert tokenizer("The Parks") == ["park"]
+    copy = pickle.loads(pickle.dumps(tokenizer))
+    assert copy("The Parks and gardens") == ["park", "garden"]
+    assert copy.stopwords == tokenizer.stopwords
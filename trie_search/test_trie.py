@@ -1,29 +1,39 @@
+import itertools
 import pytest
 from trie_search.trie import Trie
+from trie_search.compact_trie import CompactTrie
+from trie_search.radix_trie import RadixTrie
+from trie_search.snapshot_trie import SnapshotTrie
 
 
-def test_trie_set_and_get_simple():
-    t = Trie()
+# every test runs against each storage engine
+@pytest.fixture(params=[Trie, CompactTrie, RadixTrie, SnapshotTrie])
+def trie_class(request):
+    return request.param
+
+
+def test_trie_set_and_get_simple(trie_class):
+    t = trie_class()
     t["a"] = 1
     assert t["a"] == 1
 
 
-def test_trie_set_and_get_longer():
-    t = Trie()
+def test_trie_set_and_get_longer(trie_class):
+    t = trie_class()
     t["abc"] = 1
     assert t["abc"] == 1
 
 
-def test_trie_keyerror_nonstring():
-    t = Trie()
+def test_trie_keyerror_nonstring(trie_class):
+    t = trie_class()
     with pytest.raises(KeyError):
         t[1234] = "abc"
     with pytest.raises(KeyError):
         t[1234]
 
 
-def test_trie_keyerror_subkey():
-    t = Trie()
+def test_trie_keyerror_subkey(trie_class):
+    t = trie_class()
     t["abc"] = 1
     # the substrings are not set
     with pytest.raises(KeyError):
@@ -32,17 +42,17 @@ def test_trie_keyerror_subkey():
         t["ab"]
 
 
-def test_trie_can_set_to_none():
+def test_trie_can_set_to_none(trie_class):
     # this test ensures that you can set a value to None and look it up
     # if this conflicts with how you are storing non-terminal values you'll
     # need to account for that :)
-    t = Trie()
+    t = trie_class()
     t["will_be_none"] = None
     assert t["will_be_none"] is None
 
 
-def test_trie_set_and_get_shared_prefix_first():
-    t = Trie()
+def test_trie_set_and_get_shared_prefix_first(trie_class):
+    t = trie_class()
     # set prefix then a longer string, ensure both are kept
     t["ab"] = 1
     t["abc"] = 2
@@ -50,8 +60,8 @@ def test_trie_set_and_get_shared_prefix_first():
     assert t["abc"] == 2
 
 
-def test_trie_set_and_get_shared_prefix_reverse():
-    t = Trie()
+def test_trie_set_and_get_shared_prefix_reverse(trie_class):
+    t = trie_class()
     # set longer string first, then prefix, both are kept
     t["abc"] = 2
     t["ab"] = 1
@@ -59,75 +69,75 @@ def test_trie_set_and_get_shared_prefix_reverse():
     assert t["abc"] == 2
 
 
-def test_trie_overwrite():
-    t = Trie()
+def test_trie_overwrite(trie_class):
+    t = trie_class()
     t["abc"] = 1
     t["abc"] = 2
     assert t["abc"] == 2
 
 
-def test_trie_get_keyerror():
-    t = Trie()
+def test_trie_get_keyerror(trie_class):
+    t = trie_class()
     with pytest.raises(KeyError):
         t["a"]
 
 
-def test_trie_len_basic():
-    t = Trie()
+def test_trie_len_basic(trie_class):
+    t = trie_class()
     assert len(t) == 0
     t["abc"] = 1
     assert len(t) == 1
 
 
-def test_trie_len_overwrite():
-    t = Trie()
+def test_trie_len_overwrite(trie_class):
+    t = trie_class()
     t["abc"] = 1
     t["abc"] = 2
     assert len(t) == 1
 
 
-def test_trie_len_long():
-    t = Trie()
+def test_trie_len_long(trie_class):
+    t = trie_class()
     for x in "abcdefghijklmnopqrstuvwxyz":
         t[x] = x
     assert len(t) == 26
 
 
-def test_trie_len_case_insensitive():
-    t = Trie()
+def test_trie_len_case_insensitive(trie_class):
+    t = trie_class()
     for x in "abcdeABCDE":
         t[x] = x
     assert len(t) == 5
 
 
-def test_trie_len_special_chars():
-    t = Trie()
+def test_trie_len_special_chars(trie_class):
+    t = trie_class()
     for x in "*%#./?_":
         t[x] = x
     assert len(t) == 1
 
 
-def test_trie_iter_empty():
-    t = Trie()
+def test_trie_iter_empty(trie_class):
+    t = trie_class()
     assert list(iter(t)) == []
 
 
-def test_trie_iter_one():
-    t = Trie()
+def test_trie_iter_one(trie_class):
+    t = trie_class()
     t["abc"] = 1
     assert list(iter(t)) == [("abc", 1)]
 
 
-def test_trie_iter_prefix_chain():
-    t = Trie()
+def test_trie_iter_prefix_chain(trie_class):
+    t = trie_class()
     t["a"] = 1
     t["ab"] = 2
     t["abc"] = 3
     assert list(iter(t)) == [("a", 1), ("ab", 2), ("abc", 3)]
 
 
-def test_trie_iter_assorted():
-    t = Trie()
+def test_trie_iter_assorted(trie_class):
+    t = trie_class()
     t["apple"] = 1
     t["banana"] = 2
     t["quail"] = 3
@@ -142,8 +152,8 @@ def test_trie_iter_assorted():
     ]
 
 
-def test_trie_delete_one():
-    t = Trie()
+def test_trie_delete_one(trie_class):
+    t = trie_class()
     t["a"] = 1
     t["b"] = 1
     del t["b"]
@@ -151,22 +161,22 @@ def test_trie_delete_one():
     assert "b" not in t
 
 
-def test_trie_delete_check_len():
-    t = Trie()
+def test_trie_delete_check_len(trie_class):
+    t = trie_class()
     t["a"] = 1
     t["b"] = 1
     del t["b"]
     assert len(t) == 1
 
 
-def test_trie_delete_nonexistent():
-    t = Trie()
+def test_trie_delete_nonexistent(trie_class):
+    t = trie_class()
     with pytest.raises(KeyError):
         del t["b"]
 
 
-def test_trie_delete_substring():
-    t = Trie()
+def test_trie_delete_substring(trie_class):
+    t = trie_class()
     t["ab"] = 1
     t["abc"] = 1
     del t["ab"]
@@ -174,22 +184,22 @@ def test_trie_delete_substring():
     assert "ab" not in t
 
 
-def test_trie_wildcard_none():
-    t = Trie()
+def test_trie_wildcard_none(trie_class):
+    t = trie_class()
     t["ccc"] = 1
     t["aaa"] = 1
     t["bbb"] = 1
     assert list(iter(t.wildcard_search("z*"))) == []
 
 
-def test_trie_wildcard_one():
-    t = Trie()
+def test_trie_wildcard_one(trie_class):
+    t = trie_class()
     t["a"] = 1
     assert list(iter(t.wildcard_search("*"))) == [("a", 1)]
 
 
-def test_trie_wildcard_multi_one():
-    t = Trie()
+def test_trie_wildcard_multi_one(trie_class):
+    t = trie_class()
     t["a"] = 1
     t["b"] = 1
     t["c"] = 1
@@ -198,8 +208,8 @@ def test_trie_wildcard_multi_one():
     assert list(iter(t.wildcard_search("*"))) == [("a", 1), ("b", 1), ("c", 1)]
 
 
-def test_trie_wildcard_multi():
-    t = Trie()
+def test_trie_wildcard_multi(trie_class):
+    t = trie_class()
     t["cat"] = 1
     t["car"] = 1
     t["cab"] = 1
@@ -209,8 +219,8 @@ def test_trie_wildcard_multi():
     assert list(iter(t.wildcard_search("c*t"))) == [("cat", 1), ("cot", 1)]
 
 
-def test_trie_wildcard_two_wildcards():
-    t = Trie()
+def test_trie_wildcard_two_wildcards(trie_class):
+    t = trie_class()
     t["cat"] = 1
     t["car"] = 1
     t["cab"] = 1
@@ -226,8 +236,8 @@ def test_trie_wildcard_two_wildcards():
     ]
 
 
-def test_trie_wildcard_all_wildcards():
-    t = Trie()
+def test_trie_wildcard_all_wildcards(trie_class):
+    t = trie_class()
     t["aaa"] = 1
     t["bbb"] = 1
     t["zzz"] = 1
@@ -235,3 +245,269 @@ def test_trie_wildcard_all_wildcards():
     t["ww"] = 1
 
     assert list(iter(t.wildcard_search("***"))) == [("aaa", 1), ("bbb", 1), ("zzz", 1)]
+
+
+def test_trie_iter_is_lazy(trie_class):
+    t = trie_class()
+    for x in "abcdefghijklmnopqrstuvwxyz":
+        t[x * 3] = x
+    assert list(itertools.islice(t, 2)) == [("aaa", "a"), ("bbb", "b")]
+
+
+def test_trie_iter_deep_key(trie_class):
+    # deeper than the default recursion limit
+    t = trie_class()
+    t["a" * 5000] = 1
+    t["a" * 5001] = 2
+    assert [value for _, value in t] == [1, 2]
+
+
+def test_trie_wildcard_limit(trie_class):
+    t = trie_class()
+    t["cat"] = 1
+    t["car"] = 1
+    t["cab"] = 1
+    t["cot"] = 1
+
+    assert list(t.wildcard_search("c**", limit=2)) == [("cab", 1), ("car", 1)]
+    assert list(t.wildcard_search("c**", limit=0)) == []
+
+
+def test_trie_wildcard_empty_pattern(trie_class):
+    t = trie_class()
+    t[""] = 1
+    t["a"] = 2
+    assert list(t.wildcard_search("")) == [("", 1)]
+
+
+def test_trie_setdefault(trie_class):
+    t = trie_class()
+    assert t.setdefault("abc", 1) == 1
+    assert t.setdefault("ABC", 2) == 1
+    assert t.setdefault("ab") is None
+    assert len(t) == 2
+    assert list(t) == [("ab", None), ("abc", 1)]
+
+
+def test_trie_bulk_update(trie_class):
+    t = trie_class()
+    t["park"] = {"u0"}
+    t.bulk_update([("park", "u1"), ("Chicago", "u1"), ("park", "u2"), ("parks", "u2"),
+                   ("a_b", "u3")])
+    assert list(t) == [
+        ("a_b", {"u3"}),
+        ("chicago", {"u1"}),
+        ("park", {"u0", "u1", "u2"}),
+        ("parks", {"u2"}),
+    ]
+    assert len(t) == 4
+
+
+def test_trie_from_sorted(trie_class):
+    t = trie_class.from_sorted([("ab", 1), ("ab", 2), ("abc", 1), ("b", 3)])
+    assert isinstance(t, trie_class)
+    assert list(t) == [("ab", {1, 2}), ("abc", {1}), ("b", {3})]
+
+
+def test_trie_from_sorted_out_of_order(trie_class):
+    # wrongly sorted input is slower but still correct
+    t = trie_class.from_sorted([("b", 3), ("ab", 1), ("b", 4)])
+    assert list(t) == [("ab", {1}), ("b", {3, 4})]
+
+
+def test_trie_bulk_load(trie_class):
+    t = trie_class()
+    t["ab"] = "old"
+    t.autocomplete("a")
+    t.bulk_load([("b", [3]), ("ab", [1, 2]), ("Abc", [1]), ("b", [4])])
+    assert list(t) == [("ab", [1, 2]), ("abc", [1]), ("b", [4])]
+    assert len(t) == 3
+    assert t.autocomplete("a", 1) == [("ab", [1, 2])]
+    with pytest.raises(KeyError):
+        t.bulk_load([(1, "x")])
+
+
+def test_trie_prefix_search(trie_class):
+    t = trie_class()
+    for key in ["park", "parks", "Parking", "pa", "pie", "dog"]:
+        t[key] = key
+    assert [k for k, _ in t.prefix_search("par")] == ["park", "parking", "parks"]
+    assert list(t.prefix_search("PARKS")) == [("parks", "parks")]
+    assert [k for k, _ in t.prefix_search("p", limit=2)] == ["pa", "park"]
+    assert len(list(t.prefix_search(""))) == 6
+    assert list(t.prefix_search("cat")) == []
+
+
+def test_trie_autocomplete_ranks_by_size(trie_class):
+    t = trie_class()
+    t["park"] = {"u1", "u2", "u3"}
+    t["parks"] = {"u1"}
+    t["parking"] = {"u1", "u2"}
+    t["pan"] = {"u1", "u2"}
+    t["dog"] = {"u1", "u2", "u3", "u4"}
+    assert t.autocomplete("pa", 3) == [
+        ("park", {"u1", "u2", "u3"}),
+        ("pan", {"u1", "u2"}),
+        ("parking", {"u1", "u2"}),
+    ]
+    assert t.autocomplete("x") == []
+    assert t.prefix_count("par") == 3
+    assert t.prefix_count("") == 5
+
+
+def test_trie_autocomplete_follows_updates(trie_class):
+    t = trie_class()
+    for i, key in enumerate(["aa", "ab", "ac", "ad"]):
+        t[key] = set(range(i))
+    assert [k for k, _ in t.autocomplete("a", 2)] == ["ad", "ac"]
+
+    # every kind of write updates the cached prefixes
+    t["ab"] = set(range(10))
+    t["ae"] = set(range(5))
+    t.setdefault("af", set(range(4)))
+    t.bulk_update([("aa", i) for i in range(7)] + [("ag", 1)])
+    del t["ad"]
+    assert [k for k, _ in t.autocomplete("a", 4)] == ["ab", "aa", "ae", "af"]
+    assert t.prefix_count("a") == 6
+
+    # a weight going down or a key going away among many keys
+    t.TOP_K = 2
+    t._completions.clear()
+    assert [k for k, _ in t.autocomplete("a", 2)] == ["ab", "aa"]
+    t["ab"] = set()
+    del t["aa"]
+    assert [k for k, _ in t.autocomplete("a", 3)] == ["ae", "af", "ac"]
+    assert t.prefix_count("a") == 5
+
+
+def test_trie_autocomplete_matches_uncached(trie_class):
+    import random
+
+    rng = random.Random(3)
+    t = trie_class()
+    keys = ["".join(rng.choice("abc") for _ in range(rng.randint(1, 4)))
+            for _ in range(60)]
+    for key in keys:
+        t.autocomplete(key[:1])
+        t.autocomplete(key[:2])
+        if key in t and rng.random() < 0.3:
+            del t[key]
+        else:
+            t[key] = set(range(rng.randint(0, 5)))
+    for prefix in ["", "a", "ab", "b", "ca", "ccc"]:
+        expected = sorted(t.prefix_search(prefix),
+                          key=lambda pair: (-len(pair[1]), pair[0]))
+        assert t.autocomplete(prefix, 5) == expected[:5]
+        assert t.prefix_count(prefix) == len(expected)
+
+
+def test_trie_precomputed_completions(trie_class):
+    import random
+
+    if trie_class is SnapshotTrie:
+        pytest.skip("SnapshotTrie computes its entries again after a write")
+    rng = random.Random(5)
+    t = trie_class()
+    t["a"] = {1}
+    t.precompute_completions(2)
+    for _ in range(200):
+        key = "".join(rng.choice("abc") for _ in range(rng.randint(1, 4)))
+        if key in t and rng.random() < 0.3:
+            del t[key]
+        else:
+            t[key] = set(range(rng.randint(0, 5)))
+    t.MAX_CACHED_PREFIXES = 1
+    t.autocomplete("abc")
+    t.autocomplete("bca")
+
+    def walk(codes, size):
+        raise AssertionError(f"walked {codes!r}")
+
+    # short prefixes are answered without walking, even after evictions
+    t._compute_completions = walk
+    for prefix in ["", "a", "b", "c", "ab", "ca", "cc", "ac"]:
+        expected = sorted(t.prefix_search(prefix),
+                          key=lambda pair: (-len(pair[1]), pair[0]))
+        assert t.autocomplete(prefix, 5) == expected[:5]
+        assert t.prefix_count(prefix) == len(expected)
+
+
+def test_trie_glob_search(trie_class):
+    t = trie_class()
+    for key in ["park", "parks", "parking", "paperwork", "perk", "pa", "cat", "bat",
+                "a_b"]:
+        t[key] = key
+    assert [k for k, _ in t.glob_search("par*")] == ["park", "parking", "parks"]
+    matches = [k for k, _ in t.glob_search("pa*k*")]
+    assert matches == ["paperwork", "park", "parking", "parks"]
+    assert [k for k, _ in t.glob_search("p?rk")] == ["park", "perk"]
+    assert [k for k, _ in t.glob_search("[bc]at")] == ["bat", "cat"]
+    assert [k for k, _ in t.glob_search("[!c]at")] == ["bat"]
+    assert [k for k, _ in t.glob_search("a?b")] == ["a_b"]
+    assert [k for k, _ in t.glob_search("*", limit=3)] == ["a_b", "bat", "cat"]
+    assert list(t.glob_search("*", limit=0)) == []
+    assert list(t.glob_search("dog*")) == []
+    with pytest.raises(ValueError):
+        list(t.glob_search("[ab"))
+
+
+def test_trie_glob_search_matches_fnmatch(trie_class):
+    import fnmatch
+    import random
+
+    rng = random.Random(5)
+    t = trie_class()
+    keys = {"".join(rng.choice("abc") for _ in range(rng.randint(0, 6)))
+            for _ in range(200)}
+    for key in keys:
+        t[key] = key
+    for pattern in ["*", "a*", "*c", "a*b*c", "?b*", "[ab]*c?", "[!a]*", "*a*a*a*", ""]:
+        expected = sorted(key for key in keys if fnmatch.fnmatchcase(key, pattern))
+        assert [k for k, _ in t.glob_search(pattern)] == expected
+
+
+def test_trie_glob_search_empty_key(trie_class):
+    t = trie_class()
+    t[""] = 1
+    t["a"] = 2
+    assert list(t.glob_search("*")) == [("", 1), ("a", 2)]
+    assert list(t.glob_search("?")) == [("a", 2)]
+
+
+def test_trie_fuzzy_search(trie_class):
+    t = trie_class()
+    for key in ["park", "parks", "bark", "pork", "spark", "chicago", "pa"]:
+        t[key] = key
+    assert list(t.fuzzy_search("park", 0)) == [("park", "park", 0)]
+    assert list(t.fuzzy_search("Prak", 2)) == [("pa", "pa", 2), ("park", "park", 2),
+                                               ("pork", "pork", 2)]
+    matches = [k for k, _, d in t.fuzzy_search("park", 1)]
+    assert matches == ["bark", "park", "parks", "pork", "spark"]
+    assert [k for k, _, _ in t.fuzzy_search("park", 1, limit=2)] == ["bark", "park"]
+    assert list(t.fuzzy_search("chicag", 1)) == [("chicago", "chicago", 1)]
+    assert list(t.fuzzy_search("zzzzzz", 2)) == []
+
+
+def test_trie_fuzzy_search_matches_brute_force(trie_class):
+    import random
+
+    def distance(a, b):
+        row = list(range(len(b) + 1))
+        for i, x in enumerate(a, 1):
+            previous, row = row, [i]
+            for j, y in enumerate(b, 1):
+                row.append(min(row[j - 1] + 1, previous[j] + 1,
+                               previous[j - 1] + (x != y)))
+        return row[-1]
+
+    rng = random.Random(7)
+    t = trie_class()
+    keys = {"".join(rng.choice("abc") for _ in range(rng.randint(0, 7)))
+            for _ in range(300)}
+    for key in keys:
+        t[key] = key
+    for word in ["", "a", "abc", "cabbage", "bbbb"]:
+        for k in range(3):
+            expected = sorted((key, key, distance(key, word)) for key in keys
+                              if distance(key, word) <= k)
+            assert list(t.fuzzy_search(word, k)) == expected
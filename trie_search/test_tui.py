@@ -0,0 +1,161 @@
+import threading
+from itertools import islice
+from rich.console import Console
+from trie_search.query import QueryEngine
+from trie_search.query_cache import cached_query
+from trie_search.snapshot_trie import SnapshotTrie
+from trie_search.trie import Trie
+from trie_search.tui import CrawlerSearchApp
+
+BASE = "https://example.com"
+
+
+def quiet_app(index_path=None):
+    app = CrawlerSearchApp(index_path)
+    app.console = Console(record=True, width=200)
+    return app
+
+
+def test_index_searchable_while_building(monkeypatch, fake_fetch):
+    release = threading.Event()
+
+    def slow_fetch(url):
+        # hold the crawl after the first page until the test has searched
+        if url.rstrip("/") != BASE:
+            release.wait(5)
+        return fake_fetch(url)
+
+    monkeypatch.setattr("trie_search.crawler.fetch_html", slow_fetch)
+    app = quiet_app()
+    builder = app.start_build(BASE, 2)
+    while not len(app.crawler.documents):
+        builder.join(0.01)
+    assert app.building
+    assert app.trie["index"] == {BASE}
+    assert "australia" not in app.trie
+    assert app.progress()["pages"] == 1
+    # "/one" is being fetched, "/two" waits
+    assert app.progress()["queued"] == 1
+    assert [url for url, _ in app.rank("index page")] == [BASE]
+
+    release.set()
+    builder.join(5)
+    assert not app.building
+    assert app.build_error is None
+    assert app.trie["australia"] == {BASE + "/one"}
+    assert app.progress() == {"pages": 4, "queued": 0, "words": len(app.trie)}
+
+
+def test_rank_and_indexing_hold_index_lock(monkeypatch, serial_fetch):
+    app = quiet_app()
+    locked = []
+    bulk_update = SnapshotTrie.bulk_update
+    search = QueryEngine.search
+
+    def checked_update(trie, *args, **kwargs):
+        locked.append(("index", app.crawler.index_lock.locked()))
+        return bulk_update(trie, *args, **kwargs)
+
+    def checked_search(engine, *args, **kwargs):
+        locked.append(("rank", app.crawler.index_lock.locked()))
+        return search(engine, *args, **kwargs)
+
+    monkeypatch.setattr(SnapshotTrie, "bulk_update", checked_update)
+    monkeypatch.setattr(QueryEngine, "search", checked_search)
+    app.start_build(BASE, 0).join(5)
+    assert [url for url, _ in app.rank("index page")] == [BASE]
+    assert locked == [("index", True), ("rank", True)]
+
+
+def test_build_saves_index(serial_fetch, tmp_path):
+    path = str(tmp_path / "index.bin")
+    app = quiet_app(path)
+    app.start_build(BASE, 1).join(5)
+    app.show_progress()
+    assert "Index built successfully" in app.console.export_text()
+    assert set(Trie.load(path)["australia"]) == {BASE + "/one"}
+    assert app.trie._query_cache is not None
+
+
+def test_build_error_reported(serial_fetch, tmp_path):
+    # saving to a directory fails once the crawl is done
+    app = quiet_app(str(tmp_path))
+    app.start_build(BASE, 0).join(5)
+    app.show_progress()
+    assert app.build_error is not None
+    assert "Index build stopped" in app.console.export_text()
+
+
+def test_failed_crawl_reported(serial_fetch, tmp_path):
+    path = str(tmp_path / "index.bin")
+    app = quiet_app(path)
+    app.start_build(BASE + "/missing", 1).join(5)
+    app.show_progress()
+    text = app.console.export_text()
+    assert "Index build found no pages" in text
+    assert "successfully" not in text
+    assert not (tmp_path / "index.bin").exists()
+
+
+class CountingTrie(Trie):
+    def __init__(self):
+        super().__init__()
+        self.searched = []
+
+    @cached_query
+    def wildcard_search(self, key, limit=None):
+        for pair in super().wildcard_search(key, limit, cached=False):
+            self.searched.append(pair[0])
+            yield pair
+
+
+def test_wildcard_rows_cache_first_page():
+    app = quiet_app()
+    app.PAGE_SIZE = 2
+    app.trie = CountingTrie()
+    for word in ["cat", "cot", "cut", "cyt", "dog"]:
+        app.trie[word] = {"https://example.com/" + word}
+    cache = app.trie.enable_query_cache()
+    rows = app.wildcard_rows("c*t")
+    assert [word for word, _ in islice(rows, 3)] == ["cat", "cot", "cut"]
+    assert app.trie.searched == ["cat", "cot", "cut"]
+    # the rest is only searched as it is read
+    assert next(rows)[0] == "cyt"
+    assert cache.stats()["entries"] == 1
+    app.trie.searched.clear()
+    rows = app.wildcard_rows("c*t")
+    assert [word for word, _ in islice(rows, 3)] == ["cat", "cot", "cut"]
+    assert app.trie.searched == []
+    assert cache.hits == 1
+
+
+def test_results_paginated_lazily(monkeypatch):
+    answers = iter(["y", "n"])
+    monkeypatch.setattr("trie_search.tui.Prompt.ask",
+                        lambda *args, **kwargs: next(answers))
+    taken = []
+
+    def results():
+        for number in range(100):
+            taken.append(number)
+            yield f"word{number:03}", [f"https://example.com/{number}"]
+
+    app = quiet_app()
+    app.PAGE_SIZE = 10
+    app.display_results("word*", results())
+    text = app.console.export_text()
+    assert "word000" in text and "word019" in text
+    assert "word020" not in text
+    # two pages shown, plus one row to know a third exists
+    assert len(taken) == 21
+
+
+def test_results_single_page_does_not_ask(monkeypatch):
+    def ask(*args, **kwargs):
+        raise AssertionError("asked for another page")
+
+    monkeypatch.setattr("trie_search.tui.Prompt.ask", ask)
+    app = quiet_app()
+    app.PAGE_SIZE = 2
+    app.display_results("park", iter([("park", ["https://a.org", "https://b.org"])]))
+    assert "https://b.org" in app.console.export_text()
@@ -0,0 +1,128 @@
+import re
+import unicodedata
+from typing import Callable, Dict, Iterable, List, Optional
+
+# runs of the letters a trie key can hold; run after case folding and accent
+# stripping, so "Café" is already "cafe". Anything else (digits, apostrophes,
+# other scripts) would become "_" in the trie, so it ends a word instead:
+# "2024" and "1999" are not both indexed as "____", "don't" is "don" and "t"
+WORD_PATTERN = r"[A-Za-z]+"
+
+# combining diacritical marks left over once NFKD splits "é" into "e" + U+0301
+_MARKS = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff"
+                    "\u20d0-\u20ff\ufe20-\ufe2f]+")
+
+# common English words that say little about a page, and the pieces
+# WORD_PATTERN leaves of contractions ("it's" -> "it", "s")
+ENGLISH_STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been
+before being below between both but by can could did do does doing down during
+each few for from further had has have having he her here hers herself him
+himself his how i if in into is it its itself just me more most my myself no
+nor not now of off on once only or other our ours ourselves out over own same
+she should so some such than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what when
+where which while who whom why will with you your yours yourself yourselves
+s t d ll m re ve
+""".split())
+
+
+def strip_accents(text: str) -> str:
+    """
+    Remove diacritics, e.g. "Café Crème" becomes "Cafe Creme".
+
+    Compatibility characters are decomposed too, so "ﬁ" becomes "fi".
+    """
+    if text.isascii():
+        return text
+    return _MARKS.sub("", unicodedata.normalize("NFKD", text))
+
+
+def plural_stem(word: str) -> str:
+    """
+    A light English stemmer that only removes plural endings: "parks" ->
+    "park", "cities" -> "city".
+    """
+    if len(word) > 4 and word.endswith("ies") and not word.endswith(("eies", "aies")):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("es") and word[-3] in "sxz":
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+class Tokenizer:
+    """
+    Splits a page's text into the words it is indexed under.
+
+    The whole text is case folded and has its accents stripped at once,
+    then split into words by one compiled regular expression, so "Park,",
+    "park." and "PARK" are all the word "park" instead of three keys (two
+    of them ending in the "_" that punctuation becomes in the trie). The
+    default pattern only keeps the letters a trie key can hold, a to z.
+    Stopwords are then dropped and, with a `stemmer`, every remaining word
+    is stemmed; each distinct word is stemmed only once.
+
+    Without a tokenizer the crawler keeps splitting text on whitespace.
+    A Tokenizer can be pickled, so it also works with parse workers, as
+    long as its stemmer is a module-level function.
+    """
+    def __init__(self, pattern: str = WORD_PATTERN, casefold: bool = True,
+                 strip_accents: bool = True, stopwords: Iterable[str] = (),
+                 stemmer: Optional[Callable[[str], str]] = None):
+        """
+        Args:
+            pattern (str): Regular expression matching one word
+            casefold (bool): Case fold the text ("Straße" -> "strasse")
+            strip_accents (bool): Remove diacritics ("café" -> "cafe"); without
+                it the default pattern splits words at accented letters
+            stopwords (Iterable[str]): Words to leave out, e.g. ENGLISH_STOPWORDS
+            stemmer (Optional[Callable[[str], str]]): Reduces a word to its
+                stem, e.g. plural_stem
+        """
+        self.pattern = pattern
+        self.casefold = casefold
+        self.strip_accents = strip_accents
+        self.stemmer = stemmer
+        self._words = re.compile(pattern)
+        # stopwords are compared after folding, so fold them the same way
+        self.stopwords = frozenset(self._fold(word) for word in stopwords)
+        self._stems: Dict[str, str] = {}
+
+    def _fold(self, text: str) -> str:
+        """
+        Apply case folding and accent stripping to `text`, as configured.
+        """
+        if self.casefold:
+            text = text.casefold()
+        if self.strip_accents:
+            text = strip_accents(text)
+        return text
+
+    def __call__(self, text: str) -> List[str]:
+        """
+        Return the words of `text`, in order, repeats included.
+        """
+        words = self._words.findall(self._fold(text))
+        if self.stopwords:
+            stopwords = self.stopwords
+            words = [word for word in words if word not in stopwords]
+        if self.stemmer is not None:
+            stems = self._stems
+            for word in set(words).difference(stems):
+                stems[word] = self.stemmer(word)
+            words = [stems[word] for word in words]
+        return words
+
+    def __getstate__(self) -> dict:
+        # the stem cache only saves work here, do not ship it to workers
+        state = self.__dict__.copy()
+        state["_stems"] = {}
+        return state
+
+    def __repr__(self) -> str:
+        return (f"Tokenizer(pattern={self.pattern!r}, casefold={self.casefold}, "
+                f"strip_accents={self.strip_accents}, "
+                f"stopwords={len(self.stopwords)} words, "
+                f"stemmer={getattr(self.stemmer, '__name__', self.stemmer)})")
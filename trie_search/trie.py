@@ -1,5 +1,10 @@
-from typing import Any, Iterable
+from bisect import insort
+from collections.abc import Sized
+from itertools import repeat
+from typing import Any, Callable, Hashable, Iterable, Iterator, Optional, Union
+from operator import itemgetter
 from collections.abc import MutableMapping
+from .query_cache import QueryCache, cached_query
 
 
 def character_to_key(char: str) -> int:
@@ -13,12 +18,80 @@ def character_to_key(char: str) -> int:
     Any other character should return 26.
     """
     # convert letters to index, letters are case insensitive
-    if char.isalpha() and 'a' <= char.lower() <= 'z':
-        return ord(char.lower()) - ord('a')
+    # (some letters lower-case to two characters, e.g. 'İ', those map to 26)
+    lower = char.lower()
+    if char.isalpha() and len(lower) == 1 and 'a' <= lower <= 'z':
+        return ord(lower) - ord('a')
     else:
         return 26  
 
 
+# the character each character_to_key index stands for
+KEY_CHARS = "abcdefghijklmnopqrstuvwxyz_"
+
+
+class _TranslationTable(dict):
+    '''
+    A `str.translate` table from code points to `convert(character)`.
+
+    ASCII is filled in up front, any other code point is computed by
+    character_to_key the first time it is seen and cached, so repeated
+    Unicode text is translated at C speed as well.
+    '''
+    def __init__(self, convert):
+        super().__init__((point, convert(chr(point))) for point in range(128))
+        self.convert = convert
+
+    def __missing__(self, point: int):
+        result = self[point] = self.convert(chr(point))
+        return result
+
+
+# code point -> chr(character_to_key index), so translating gives one byte per character
+_ENCODE_TABLE = _TranslationTable(lambda char: chr(character_to_key(char)))
+# the same mapping as a bytes.translate table, for the common all-ASCII key
+_ASCII_ENCODE_TABLE = (bytes(character_to_key(chr(point)) for point in range(128))
+                       + bytes(128))
+# code point -> the character of KEY_CHARS it is stored as
+_NORMALIZE_TABLE = _TranslationTable(lambda char: KEY_CHARS[character_to_key(char)])
+
+
+# character_to_key index -> byte of the KEY_CHARS character, to turn
+# encode_key back into text
+_DECODE_TABLE = KEY_CHARS.encode("ascii") + bytes(256 - len(KEY_CHARS))
+
+
+def encode_key(key: str) -> bytes:
+    """
+    Convert a whole key to its character_to_key indexes in one pass.
+
+    encode_key("Ab.") == bytes([0, 1, 26])
+
+    Iterating the result gives ints, so trie operations can walk
+    `for index in encode_key(key)` instead of calling character_to_key
+    per character.
+    """
+    if key.isascii():
+        return key.encode("ascii").translate(_ASCII_ENCODE_TABLE)
+    return key.translate(_ENCODE_TABLE).encode("ascii")
+
+
+def normalize_key(key: str) -> str:
+    """
+    Rewrite a key using only the 27 characters the trie distinguishes.
+
+    For example "Park." becomes "park_".
+    """
+    return key.translate(_NORMALIZE_TABLE)
+
+
+def normalize_keys(keys: Iterable[str]) -> Iterator[str]:
+    """
+    Lazily normalize_key every key, without a Python function call per key.
+    """
+    return map(str.translate, keys, repeat(_NORMALIZE_TABLE))
+
+
 class TrieNode:
     '''
     This class represents the node data structure in the trie.
@@ -39,9 +112,104 @@ class Trie(MutableMapping):
     as well as wildcard_search.
     """
 
+    # autocomplete caches the TOP_K best completions of each prefix it is asked
+    # about, for at most MAX_CACHED_PREFIXES prefixes (besides those kept by
+    # precompute_completions)
+    TOP_K = 16
+    MAX_CACHED_PREFIXES = 4096
+
     def __init__(self):
         self.root = TrieNode()
         self.size = 0
+        self._init_caches()
+
+    def _init_caches(self) -> None:
+        """
+        Set up the per-trie query caches. Every trie's __init__ must call this.
+        """
+        # encoded prefix -> [number of keys under it,
+        #                    sorted (-weight, key) of its best keys]
+        self._completions: dict[bytes, list] = {}
+        # prefixes up to this long always have an entry, see precompute_completions
+        self._completion_depth = -1
+        # bumped by every write, so cached query results know when they are stale
+        self.version = 0
+        self._query_cache: Optional[QueryCache] = None
+
+    def enable_query_cache(self, max_entries: int = 256,
+                           max_bytes: Optional[int] = None) -> QueryCache:
+        """
+        Cache the results of wildcard, glob, prefix and fuzzy searches in a bounded LRU.
+
+        Any write through the trie (setting, deleting, bulk_update, ...)
+        makes earlier results stale; a value changed in place without being
+        stored back is not noticed. Returns the cache, whose counters can be
+        read for monitoring.
+        """
+        self._query_cache = QueryCache(max_entries, max_bytes)
+        return self._query_cache
+
+    def disable_query_cache(self) -> None:
+        """
+        Stop caching search results and drop the ones cached.
+        """
+        self._query_cache = None
+
+    # The methods below describe how to walk the trie one character at a time.
+    # Traversals such as `__iter__` and `wildcard_search` only use these, so a
+    # trie with a different node layout (see compact_trie.py) only needs to
+    # override them along with the MutableMapping methods.
+
+    def _root(self) -> Any:
+        """
+        Return the root node of the trie.
+        """
+        return self.root
+
+    def _child(self, node: Any, index: int) -> Any:
+        """
+        Return the child of `node` at `index` (see character_to_key), or None.
+        """
+        return node.children[index]
+
+    def _children(self, node: Any) -> Iterator[tuple[int, Any]]:
+        """
+        Yield (index, child) pairs for every existing child of `node`, in
+        alphabetical order.
+        """
+        for index, child in enumerate(node.children):
+            if child is not None:
+                yield index, child
+
+    def _has_value(self, node: Any) -> bool:
+        """
+        Return whether a key ends at `node`.
+        """
+        return node.has_value
+
+    def _value(self, node: Any) -> Any:
+        """
+        Return the value stored at `node`.
+        """
+        return node.value
+
+    def _ensure_child(self, node: Any, index: int) -> Any:
+        """
+        Return the child of `node` at `index`, creating it if needed.
+        """
+        child = node.children[index]
+        if child is None:
+            child = node.children[index] = TrieNode()
+        return child
+
+    def _store(self, node: Any, value: Any) -> None:
+        """
+        Store `value` at `node`, counting it if no key ended there before.
+        """
+        if not node.has_value:
+            self.size += 1
+        node.value = value
+        node.has_value = True
 
     def __getitem__(self, key: str) -> Any:
         """
@@ -57,10 +225,10 @@ class Trie(MutableMapping):
         curr = self.root
 
         # iterate the characters in the key to move along the path in the trie
-        for char in key:
-            if curr.children[character_to_key(char)] is None:
+        for index in encode_key(key):
+            curr = curr.children[index]
+            if curr is None:
                 raise KeyError(key)
-            curr = curr.children[character_to_key(char)]
         
         # the key does not have corresponding value
         if not curr.has_value:
@@ -81,20 +249,21 @@ class Trie(MutableMapping):
         
         curr = self.root
         # iterate the characters in the key
-        for char in key:
-            i = character_to_key(char)
+        for i in encode_key(key):
             # create new nodes when does not have the corresponding child node
             if curr.children[i] is None:
                 curr.children[i] = TrieNode()
             curr = curr.children[i]
         
         # change size if created a new key-value pair
-        if not curr.has_value:
+        is_new = not curr.has_value
+        if is_new:
             self.size += 1
         
         # set the value and mark as having a value
         curr.value = value
         curr.has_value = True
+        self._on_set(key, value, is_new)
 
     def __delitem__(self, key: str) -> None:
         """
@@ -111,8 +280,7 @@ class Trie(MutableMapping):
         path = []
 
         # First, traverse to find the node
-        for char in key:
-            index = character_to_key(char)
+        for index in encode_key(key):
             if curr.children[index] is None:
                 raise KeyError(key)
             path.append((curr, index))
@@ -126,6 +294,7 @@ class Trie(MutableMapping):
         curr.has_value = False
         curr.value = object()  # reset to a new sentinel
         self.size -= 1
+        self._on_delete(key)
 
         # Clean up empty nodes from the bottom up
         for node, index in reversed(path):
@@ -140,42 +309,70 @@ class Trie(MutableMapping):
         """
         return self.size
 
-    def __iter__(self) -> Iterable[tuple[str, Any]]:
+    def __iter__(self) -> Iterator[tuple[str, Any]]:
         """
         Return an iterable of (key, value) pairs for every entry in the trie in alphabetical order.
+
+        Entries are produced lazily, so `itertools.islice(trie, n)` only walks
+        as much of the trie as it needs.
         """
-        results = []
-        # use dfs helper function to get all the pairs from top to bottom
-        def dfs(node, key):
-            '''
-            args:
-                node: the current node
-                key: the current key
-            '''
-            # base case: the current key is valid
-            if node.has_value:
-                results.append((key, node.value)) 
-            
-            # iterate through all possible children in alphabetical order
-            for index, child in enumerate(node.children):
-                if child: 
-                    if index < 26:
-                        char = chr(index + ord('a'))
-                    else:
-                        char = '_'
-                    dfs(child, key + char)
-        
-        # start from the root with an empty key
-        dfs(self.root, "")
-        return iter(results) # return an iterable
-    
+        return self._walk(self._root(), "")
+
+    def _walk(self, node: Any, prefix: str,
+              limit: Optional[int] = None) -> Iterator[tuple[str, Any]]:
+        """
+        Lazily yield (key, value) pairs under `node` in alphabetical order.
+
+        Uses an explicit stack of child iterators instead of recursion, so deep
+        keys cannot hit the recursion limit, and keeps the current key in one
+        list of characters instead of building a new string per level.
+
+        args:
+            node: the node to start from
+            prefix: the key leading to `node`
+            limit: stop after this many pairs (None for no limit)
+        """
+        if limit is not None and limit <= 0:
+            return
+        has_value = self._has_value
+        value = self._value
+        children = self._children
+        count = 0
+
+        if has_value(node):
+            yield prefix, value(node)
+            count += 1
+            if count == limit:
+                return
+
+        path = list(prefix)
+        # stack[-1] iterates the children of the node at the end of `path`
+        stack = [children(node)]
+        while stack:
+            for index, child in stack[-1]:
+                path.append(KEY_CHARS[index])
+                if has_value(child):
+                    yield "".join(path), value(child)
+                    count += 1
+                    if count == limit:
+                        return
+                stack.append(children(child))
+                break
+            else:
+                # all children visited, step back up one level
+                stack.pop()
+                if stack:
+                    path.pop()
+
     def __repr__(self):
         """
         Override the repr
         """
         return f"The size of the trie is {self.size}, the entries are {list(self)})"
 
-    def wildcard_search(self, key: str) -> Iterable[tuple[str, Any]]:
+    @cached_query
+    def wildcard_search(self, key: str,
+                        limit: Optional[int] = None) -> Iterator[tuple[str, Any]]:
         """
         Search for keys that match a wildcard pattern where a '*' can represent any single character.
 
@@ -183,41 +380,603 @@ class Trie(MutableMapping):
             - c*t would match 'cat', 'cut', 'cot', etc.
             - ** would match any two-letter string.
 
+        Matches are produced lazily in alphabetical order; pass `limit` to stop
+        after that many.
+
         Returns: Iterable of (key, value) pairs meeting the given condition.
         """
-        results = []
-        def dfs(node, key, i, prefix, res):
+        if limit is not None and limit <= 0:
+            return
+        has_value = self._has_value
+        children = self._children
+        child_at = self._child
+        count = 0
+
+        def step(node, i):
             '''
-            A helper function implements dfs to search for all the keys that match the wildcard pattern.
-            args:
-                node: the current node
-                key: the key to search
-                i: the current index in the key
-                prefix: the prefix of the key
-                res: the result list (key, value) pairs
+            Return an iterator of (char, child) pairs matching key[i] below `node`.
             '''
-            # base case1: invalid path
-            if not node:
-                return
-            # base case2: reached the end of the key
-            if i == len(key):
-                if node.has_value:
-                    res.append((prefix, node.value))
-                return
-            
             char = key[i]
             # if the current character is '*', explore all childs
             if char == '*':
-                for index, child in enumerate(node.children):
-                    if child:
-                        char = chr(index + ord('a')) if index < 26 else '_'
-                        dfs(child, key, i + 1, prefix + char, res)
+                return ((KEY_CHARS[index], child) for index, child in children(node))
+            child = child_at(node, character_to_key(char))
+            return iter(((char, child),) if child is not None else ())
+
+        root = self._root()
+        if not key:
+            if has_value(root):
+                yield "", self._value(root)
+            return
+
+        path = []
+        stack = [step(root, 0)]
+        while stack:
+            for char, child in stack[-1]:
+                path.append(char)
+                if len(path) == len(key):
+                    # reached the end of the key, siblings may still match
+                    if has_value(child):
+                        yield "".join(path), self._value(child)
+                        count += 1
+                        if count == limit:
+                            return
+                    path.pop()
+                    continue
+                stack.append(step(child, len(path)))
+                break
             else:
-                # continue the traversal
-                index = character_to_key(char)
-                dfs(node.children[index], key, i + 1, prefix + char, res)
-        
+                stack.pop()
+                if stack:
+                    path.pop()
+
+    @cached_query
+    def glob_search(self, pattern: str,
+                    limit: Optional[int] = None) -> Iterator[tuple[str, Any]]:
+        """
+        Search for keys matching a glob pattern.
+
+        '?' matches any one character, '*' any run of characters (including
+        none), '[abc]' / '[a-c]' one of the listed characters and '[!abc]' any
+        other one. For example:
+            - pa*k* matches 'park', 'parking' and 'paperwork', par*k* only the first two
+            - c?t matches 'cat', 'cut', 'cot', etc., like wildcard_search("c*t")
+
+        The pattern is compiled once (see pattern.GlobPattern) and walked down
+        the trie as a deterministic automaton, so each node is visited at most
+        once with a single state, and subtrees the pattern can no longer match
+        are skipped. Where only a few characters can come next, just those
+        children are looked up.
+
+        Matches are produced lazily in alphabetical order, keys spelled as in
+        __iter__; pass `limit` to stop after that many.
 
-        dfs(self.root, key, 0, "", results)
-        # return iterable of results
-        return iter(results)
\ No newline at end of file
+        Raises:
+            ValueError: if the pattern has an unterminated character class
+
+        Returns: Iterable of (key, value) pairs meeting the given condition.
+        """
+        from .pattern import compile_glob
+
+        glob = compile_glob(pattern)
+        if limit is not None and limit <= 0:
+            return
+        step = glob.step
+        accepting = glob.accepting
+        moves = glob.moves
+        dead = glob.DEAD
+        has_value = self._has_value
+        children = self._children
+        child_at = self._child
+        count = 0
+
+        def matching(node, state):
+            '''
+            Return an iterator of (index, child, state) for the children of
+            `node` the pattern can go on to.
+            '''
+            allowed = moves[state]
+            if allowed is None:
+                pairs = children(node)
+            else:
+                pairs = ((index, child_at(node, index)) for index in allowed)
+            for index, child in pairs:
+                if child is not None:
+                    target = step(state, index)
+                    if target != dead:
+                        yield index, child, target
+
+        root = self._root()
+        if accepting[glob.start] and has_value(root):
+            yield "", self._value(root)
+            count += 1
+            if count == limit:
+                return
+
+        path = []
+        stack = [matching(root, glob.start)]
+        while stack:
+            for index, child, state in stack[-1]:
+                path.append(KEY_CHARS[index])
+                if accepting[state] and has_value(child):
+                    yield "".join(path), self._value(child)
+                    count += 1
+                    if count == limit:
+                        return
+                stack.append(matching(child, state))
+                break
+            else:
+                stack.pop()
+                if stack:
+                    path.pop()
+
+    @cached_query
+    def fuzzy_search(self, word: str, max_distance: int = 1,
+                     limit: Optional[int] = None) -> Iterator[tuple[str, Any, int]]:
+        """
+        Search for keys within `max_distance` edits (insertions, deletions,
+        substitutions) of `word`.
+
+        The walk keeps one row of the Levenshtein table per depth: the row of
+        a child is computed from its parent's in O(len(word)), and a subtree
+        is skipped as soon as every entry of its row exceeds `max_distance`,
+        since adding characters can only make the distance grow. Only the
+        nodes near `word` are ever visited, not the whole vocabulary.
+
+        Matches are produced lazily in alphabetical order, keys spelled as in
+        __iter__; pass `limit` to stop after that many.
+
+        Returns: Iterable of (key, value, distance) triples.
+        """
+        if limit is not None and limit <= 0:
+            return
+        target = encode_key(word)
+        has_value = self._has_value
+        children = self._children
+        count = 0
+
+        # distance from the empty key to each prefix of word
+        first_row = list(range(len(target) + 1))
+        root = self._root()
+        if first_row[-1] <= max_distance and has_value(root):
+            yield "", self._value(root), first_row[-1]
+            count += 1
+            if count == limit:
+                return
+        if max_distance < 0:
+            return
+
+        path = []
+        rows = [first_row]
+        stack = [children(root)]
+        while stack:
+            for index, child in stack[-1]:
+                previous = rows[-1]
+                row = [previous[0] + 1]
+                for column, code in enumerate(target, 1):
+                    row.append(min(
+                        row[column - 1] + 1,
+                        previous[column] + 1,
+                        previous[column - 1] + (code != index),
+                    ))
+                if min(row) > max_distance:
+                    # no key below this child can come back within range
+                    continue
+                path.append(KEY_CHARS[index])
+                if row[-1] <= max_distance and has_value(child):
+                    yield "".join(path), self._value(child), row[-1]
+                    count += 1
+                    if count == limit:
+                        return
+                rows.append(row)
+                stack.append(children(child))
+                break
+            else:
+                stack.pop()
+                rows.pop()
+                if stack:
+                    path.pop()
+
+    def save(self, path: str) -> None:
+        """
+        Write the trie to `path` in a compact binary format that Trie.load
+        can memory map.
+
+        Values must be collections of strings, like the sets of URLs built by
+        build_index. See mapped_trie.py for the layout.
+        """
+        # imported here because mapped_trie builds on this module
+        from .mapped_trie import write_trie
+        with open(path, "wb") as file:
+            write_trie(self, file)
+
+    @staticmethod
+    def load(path: str) -> "Trie":
+        """
+        Open a trie written by save, returning a read-only MappedTrie.
+
+        Nothing is deserialized up front; lookups read the file through mmap.
+        """
+        from .mapped_trie import MappedTrie
+        return MappedTrie(path)
+
+    def _on_set(self, key: Union[str, bytes], value: Any, is_new: bool) -> None:
+        """
+        Called by every write after `value` is stored under `key` (a key or
+        its encode_key).
+
+        Bumps `version` and keeps the cached autocomplete statistics of every
+        prefix of the key up to date.
+        """
+        self.version += 1
+        if not self._completions:
+            return
+        codes = key if isinstance(key, bytes) else encode_key(key)
+        name = codes.translate(_DECODE_TABLE).decode("ascii")
+        weight = self.weight(value)
+        completions = self._completions
+        for depth in range(len(codes) + 1):
+            prefix = codes[:depth]
+            entry = completions.get(prefix)
+            if entry is None:
+                if depth > self._completion_depth:
+                    continue
+                # a kept prefix without an entry has no keys yet
+                entry = completions[prefix] = [0, []]
+            if not self._update_completions(entry, name, weight, is_new):
+                self._drop_completions(prefix)
+
+    def _on_delete(self, key: Union[str, bytes]) -> None:
+        """
+        Called by every delete after `key` (a key or its encode_key) is removed.
+        """
+        self.version += 1
+        if not self._completions:
+            return
+        codes = key if isinstance(key, bytes) else encode_key(key)
+        name = codes.translate(_DECODE_TABLE).decode("ascii")
+        for depth in range(len(codes) + 1):
+            prefix = codes[:depth]
+            entry = self._completions.get(prefix)
+            if entry is None:
+                continue
+            count, top = entry
+            entry[0] = count - 1
+            for position, (_, other) in enumerate(top):
+                if other == name:
+                    if count > len(top):
+                        # the key that should take its place is unknown
+                        self._drop_completions(prefix)
+                    else:
+                        del top[position]
+                    break
+
+    def _update_completions(self, entry: list, key: str, weight: int,
+                            is_new: bool) -> bool:
+        """
+        Update one prefix's cached [count, top] for `key` now having `weight`.
+
+        Returns False when the entry can no longer be kept exact.
+        """
+        count, top = entry
+        if is_new:
+            entry[0] = count + 1
+        else:
+            for position, (old, other) in enumerate(top):
+                if other == key:
+                    if weight < -old and count > len(top):
+                        # it may drop below keys that are not cached
+                        return False
+                    del top[position]
+                    break
+        item = (-weight, key)
+        if len(top) < self.TOP_K or item < top[-1]:
+            insort(top, item)
+            if len(top) > self.TOP_K:
+                top.pop()
+        return True
+
+    def _drop_completions(self, codes: bytes) -> None:
+        """
+        Forget the entry of a prefix that can no longer be kept exact.
+
+        An entry precompute_completions keeps is computed again instead.
+        """
+        if len(codes) <= self._completion_depth:
+            self._completions[codes] = self._compute_completions(codes, self.TOP_K)
+        else:
+            del self._completions[codes]
+
+    def precompute_completions(self, depth: int = 2) -> None:
+        """
+        Compute the autocomplete statistics of every prefix up to `depth`
+        letters long, and keep them.
+
+        Short prefixes have the largest subtrees, so they are the slowest for
+        autocomplete and prefix_count to walk the first time they are asked
+        about. One walk of the trie computes all of them here; from then on
+        every write updates them, they are never evicted, and those queries
+        never walk the trie. Costs up to `depth` + 1 more entry updates per
+        write; depth 2 keeps at most 1 + 27 + 729 entries.
+        """
+        size = self.TOP_K
+        weight = self.weight
+        entries: dict[bytes, list] = {b"": [0, []]}
+        for key, value in self:
+            codes = encode_key(key)
+            item = (-weight(value), key)
+            for length in range(min(depth, len(codes)) + 1):
+                prefix = codes[:length]
+                entry = entries.get(prefix)
+                if entry is None:
+                    entry = entries[prefix] = [0, []]
+                entry[0] += 1
+                top = entry[1]
+                if len(top) < size:
+                    insort(top, item)
+                elif item < top[-1]:
+                    insort(top, item)
+                    top.pop()
+        self._completion_depth = depth
+        self._completions.update(entries)
+
+    @staticmethod
+    def weight(value: Any) -> int:
+        """
+        Rank of a value for autocomplete: its size (e.g. the number of URLs a
+        word is on).
+        """
+        return len(value) if isinstance(value, Sized) else 0
+
+    def _find_node(self, prefix: str) -> Any:
+        """
+        Return the node `prefix` leads to, or None.
+        """
+        node = self._root()
+        for index in encode_key(prefix):
+            node = self._child(node, index)
+            if node is None:
+                return None
+        return node
+
+    @cached_query
+    def prefix_search(self, prefix: str,
+                      limit: Optional[int] = None) -> Iterator[tuple[str, Any]]:
+        """
+        Return an iterable of (key, value) pairs for every key starting with `prefix`.
+
+        Pairs come lazily in alphabetical order, keys spelled as in __iter__;
+        pass `limit` to stop after that many.
+        """
+        node = self._find_node(prefix)
+        if node is None:
+            return iter(())
+        return self._walk(node, normalize_key(prefix), limit)
+
+    def _compute_completions(self, codes: bytes, size: int) -> list:
+        """
+        Return [number of keys, best `size` (-weight, key) pairs] under the
+        encoded prefix `codes`, walking its subtree.
+        """
+        count = 0
+        top: list = []
+        node = self._root()
+        for index in codes:
+            node = self._child(node, index)
+            if node is None:
+                return [count, top]
+        weight = self.weight
+        prefix = codes.translate(_DECODE_TABLE).decode("ascii")
+        for key, value in self._walk(node, prefix):
+            count += 1
+            item = (-weight(value), key)
+            if len(top) < size:
+                insort(top, item)
+            elif item < top[-1]:
+                insort(top, item)
+                top.pop()
+        return [count, top]
+
+    def _completion_entry(self, prefix: str, k: int) -> list:
+        """
+        Return [number of keys, best (-weight, key) pairs] for `prefix`,
+        holding at least k pairs if there are.
+
+        Served from the cache when it has enough, otherwise computed by
+        walking the prefix's subtree and cached.
+        """
+        codes = encode_key(prefix)
+        entry = self._completions.get(codes)
+        if entry is not None and (len(entry[1]) >= k or entry[0] == len(entry[1])):
+            return entry
+
+        size = max(k, self.TOP_K)
+        entry = self._compute_completions(codes, size)
+        if size == self.TOP_K:
+            completions = self._completions
+            if len(completions) >= self.MAX_CACHED_PREFIXES:
+                # drop the oldest cached prefix that precompute_completions
+                # does not keep
+                for oldest in completions:
+                    if len(oldest) > self._completion_depth:
+                        del completions[oldest]
+                        break
+            completions[codes] = entry
+        return entry
+
+    def autocomplete(self, prefix: str, k: int = 10) -> list[tuple[str, Any]]:
+        """
+        Return the k (key, value) pairs starting with `prefix` that have the
+        highest weight.
+
+        Ties are broken alphabetically. The best TOP_K completions of each
+        prefix asked about are cached and kept up to date as keys are set and
+        deleted, so repeated and as-you-type queries do not walk the trie.
+        The first query for a prefix walks its subtree, which is slow for
+        one or two letters on a large trie; see precompute_completions.
+        """
+        if k <= 0:
+            return []
+        _, top = self._completion_entry(prefix, k)
+        return [(key, self[key]) for _, key in top[:k]]
+
+    def prefix_count(self, prefix: str) -> int:
+        """
+        Return how many keys start with `prefix` (cached like autocomplete).
+        """
+        return self._completion_entry(prefix, 0)[0]
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        """
+        Return the value for `key`, first storing `default` if the key is not set.
+
+        Unlike the MutableMapping version (a lookup followed by an insert) this
+        walks the trie once.
+
+        If the key is not a string, raise `KeyError(key)`
+        """
+        if not isinstance(key, str):
+            raise KeyError(key)
+
+        node = self._root()
+        for index in encode_key(key):
+            node = self._ensure_child(node, index)
+        if self._has_value(node):
+            return self._value(node)
+        self._store(node, default)
+        self._on_set(key, default, True)
+        return default
+
+    def bulk_update(self, pairs: Iterable[tuple[str, Hashable]],
+                    presorted: bool = False,
+                    factory: Optional[Callable[[set], Any]] = None) -> None:
+        """
+        Add every (key, item) pair to the set of items stored under key.
+
+        This is how an index of word -> set of URLs is built: new keys get a
+        set of their items. Items are first grouped per key in a dict, then
+        each distinct key is inserted once, in trie order, so consecutive keys
+        share the walk down their common prefix. Pass `presorted=True` when
+        the pairs are already ordered by `encode_key(key)` to skip the sort.
+        Any order gives the same result, sorting only saves work.
+
+        `factory`, if given, turns the set of items of a new key into the
+        value to store (e.g. a PostingList); existing values get `.update(items)`.
+
+        If a key is not a string, raise `KeyError(key)`
+        """
+        encoded = self._group_pairs(pairs, encode_key, presorted)
+        for codes, items, node in self._ordered_nodes(encoded):
+            if self._has_value(node):
+                value = self._value(node)
+                value.update(items)
+                self._on_set(codes, value, False)
+            else:
+                value = items if factory is None else factory(items)
+                self._store(node, value)
+                self._on_set(codes, value, True)
+
+    def bulk_load(self, items: Iterable[tuple[str, Any]],
+                  presorted: bool = False) -> None:
+        """
+        Store every (key, value) pair, replacing the value of a key already set.
+
+        The bulk version of `trie[key] = value`, for values built elsewhere
+        such as PostingLists: like bulk_update, the keys are inserted in trie
+        order, sharing the walk down their common prefixes, but each value is
+        stored as given. Pass `presorted=True` when the pairs are already
+        ordered by `encode_key(key)` to skip the sort. A repeated key keeps
+        its last value.
+
+        If a key is not a string, raise `KeyError(key)`
+        """
+        encoded = self._encode_items(items, encode_key, presorted)
+        for codes, value, node in self._ordered_nodes(encoded):
+            is_new = not self._has_value(node)
+            self._store(node, value)
+            self._on_set(codes, value, is_new)
+
+    def _ordered_nodes(
+        self, encoded: Iterable[tuple[bytes, Any]]
+    ) -> Iterator[tuple[bytes, Any, Any]]:
+        """
+        Yield (codes, payload, node) for each (encoded key, payload) in trie
+        order, creating the key's nodes.
+
+        Consecutive keys share the walk down their common prefix.
+        """
+        # nodes[d] is the node d characters down the previous key
+        nodes = [self._root()]
+        previous = b""
+        for codes, payload in encoded:
+            common = 0
+            limit = min(len(codes), len(previous))
+            while common < limit and codes[common] == previous[common]:
+                common += 1
+            del nodes[common + 1:]
+            for index in codes[common:]:
+                nodes.append(self._ensure_child(nodes[-1], index))
+            previous = codes
+            yield codes, payload, nodes[-1]
+
+    @staticmethod
+    def _encode_items(items: Iterable[tuple[str, Any]], encode,
+                      presorted: bool) -> list[tuple[Any, Any]]:
+        """
+        Turn (key, value) pairs into (encode(key), value), in trie order
+        unless `presorted`.
+
+        The sort is stable, so a repeated key's values stay in the order given.
+        """
+        encoded = []
+        for key, value in items:
+            if not isinstance(key, str):
+                raise KeyError(key)
+            encoded.append((encode(key), value))
+        if not presorted:
+            encoded.sort(key=itemgetter(0))
+        return encoded
+
+    @staticmethod
+    def _group_pairs(pairs: Iterable[tuple[str, Hashable]], encode,
+                     presorted: bool) -> list[tuple[Any, set]]:
+        """
+        Group (key, item) pairs into (encode(key), set of items), in trie
+        order unless `presorted`.
+        """
+        groups: dict[str, set] = {}
+        for key, item in pairs:
+            items = groups.get(key)
+            if items is None:
+                if not isinstance(key, str):
+                    raise KeyError(key)
+                items = groups[key] = set()
+            items.add(item)
+        encoded = [(encode(key), items) for key, items in groups.items()]
+        if not presorted:
+            encoded.sort(key=itemgetter(0))
+        return encoded
+
+    def _map_values(self, convert: Callable[[Any], Any]) -> None:
+        """
+        Replace every value by `convert(value)` in place, visiting each node
+        once instead of looking every key up.
+        """
+        stack = [self._root()]
+        while stack:
+            node = stack.pop()
+            if self._has_value(node):
+                self._store(node, convert(self._value(node)))
+            stack.extend(child for _, child in self._children(node))
+        self.version += 1
+
+    @classmethod
+    def from_sorted(cls, pairs: Iterable[tuple[str, Hashable]]) -> "Trie":
+        """
+        Build a new trie of key -> set of items from (key, item) pairs in trie order.
+
+        See bulk_update.
+        """
+        trie = cls()
+        trie.bulk_update(pairs, presorted=True)
+        return trie
@@ -1,14 +1,42 @@
-from typing import Optional
+import os
+import sys
+import threading
+import time
+from itertools import chain, islice
+from typing import Dict, Iterable, Iterator, Optional
 from rich.console import Console
 from rich.prompt import Prompt
 from rich.table import Table
 from rich.panel import Panel
-from .crawler import build_index
+from .crawler import WebCrawler
+from .query import QueryEngine
+from .snapshot_trie import SnapshotTrie
+from .trie import Trie
 
 class CrawlerSearchApp:
-    def __init__(self):
+    # how many close words to suggest when a query has no results
+    MAX_SUGGESTIONS = 10
+    # how many pages a multi-word query shows
+    MAX_RANKED = 20
+    # how many (word, URL) rows a wildcard search shows at a time
+    PAGE_SIZE = 20
+
+    def __init__(self, index_path: Optional[str] = None):
+        """
+        Args:
+            index_path (Optional[str]): Saved index to search instead of crawling.
+                If the file does not exist yet, the crawled index is saved there.
+        """
         self.console = Console()
         self.trie = None
+        self.engine = None
+        self.index_path = index_path
+        # the crawl building the index in the background, if any
+        self.crawler: Optional[WebCrawler] = None
+        self.builder: Optional[threading.Thread] = None
+        # what stopped the background build, shown at the next prompt
+        self.build_error: Optional[BaseException] = None
+        self._announced = False
 
     def _get_user_input(self, prompt: str, input_type: type = str, default: Optional[str] = None) -> any:
         """
@@ -30,23 +58,219 @@ class CrawlerSearchApp:
                 self.console.print(f"[red]Invalid input. Please enter a valid {input_type.__name__}.[/red]")
 
     def build_index(self) -> None:
-        """Build the index from user-specified URL and depth."""
+        """
+        Start building the index from user-specified URL and depth, or load a
+        saved one.
+        """
+        if self.index_path and os.path.exists(self.index_path):
+            self.trie = Trie.load(self.index_path)
+            # a saved index keeps no term frequencies, pages rank by word rarity
+            self.engine = QueryEngine(self.trie, self.trie.documents)
+            self.console.print(
+                f"[green]Loaded {len(self.trie)} words from {self.index_path}[/green]")
+            return
+
         start_url = self._get_user_input("Enter the starting URL")
         max_depth = self._get_user_input("Enter the maximum depth", input_type=int, default="1")
+        self.start_build(start_url, max_depth)
 
-        self.console.print("[yellow]Crawling the site and building the index...[/yellow]")
-        self.trie = build_index(start_url, max_depth)
-        self.console.print("[green]Index built successfully![/green]")
+        # show the crawl starting until there is something to search
+        with self.console.status("") as status:
+            while self.building and not len(self.crawler.documents):
+                status.update(
+                    f"[yellow]Crawling the site... {self._progress_text()}[/yellow]")
+                time.sleep(0.1)
 
-    def display_results(self, query: str, results: list) -> None:
+    def start_build(self, start_url: str, max_depth: int) -> threading.Thread:
         """
-        Display search results in a formatted table.
-        
+        Crawl the site and build its index in a background thread.
+
+        Each page is added to the index as soon as it is parsed. The index is
+        a SnapshotTrie, so it can be searched while the crawl writes to it and
+        a search sees the pages indexed when it started.
+
+        Args:
+            start_url (str): The initial URL to start crawling from
+            max_depth (int): Maximum depth to crawl into the website
+
+        Returns:
+            threading.Thread: The thread building the index
+        """
+        crawler = WebCrawler(start_url, max_depth, trie_class=SnapshotTrie,
+                             stream=True, keep_results=False)
+        # made up front, so searches before the first page find an empty index
+        crawler.index = SnapshotTrie()
+        self.crawler = crawler
+        self.trie = crawler.index
+        self.engine = None
+        self.build_error = None
+        self._announced = False
+        # a daemon, so quitting does not wait for the crawl to finish
+        self.builder = threading.Thread(target=self._build, name="index-builder",
+                                        daemon=True)
+        self.builder.start()
+        return self.builder
+
+    def _build(self) -> None:
+        """
+        Run the crawl started by start_build, saving the index once it is complete.
+        """
+        try:
+            self.crawler.crawl()
+            # an empty index would be loaded instead of crawling on the next run
+            if self.index_path and len(self.crawler.documents):
+                self.trie.save(self.index_path)
+        except Exception as error:
+            self.build_error = error
+
+    @property
+    def building(self) -> bool:
+        """Whether the background crawl is still adding pages to the index."""
+        return self.builder is not None and self.builder.is_alive()
+
+    def progress(self) -> Dict[str, int]:
+        """
+        Return how far the background crawl has got.
+
+        Returns:
+            Dict[str, int]: Pages crawled, URLs queued and distinct words indexed
+        """
+        crawler = self.crawler
+        if crawler is None:
+            words = len(self.trie) if self.trie is not None else 0
+            return {"pages": 0, "queued": 0, "words": words}
+        frontier = crawler.frontier
+        return {
+            "pages": len(crawler.visited),
+            "queued": len(frontier) if frontier is not None else 0,
+            "words": len(crawler.index),
+        }
+
+    def _progress_text(self) -> str:
+        progress = self.progress()
+        return (f"{progress['pages']} pages crawled, {progress['queued']} queued, "
+                f"{progress['words']} words indexed")
+
+    def show_progress(self) -> None:
+        """
+        Print how far the index build has got, or that it ended, the first time it has.
+        """
+        if self.crawler is None or self._announced:
+            return
+        if self.building:
+            self.console.print(
+                f"[dim]Indexing in the background: {self._progress_text()}[/dim]")
+            return
+        self._announced = True
+        if self.build_error is not None:
+            self.console.print(f"[red]Index build stopped: {self.build_error!r}[/red]")
+            return
+        if not len(self.crawler.visited) or not len(self.crawler.documents):
+            # the start URL could not be fetched, or had nothing to index
+            self.console.print(
+                f"[red]Index build found no pages: {self._progress_text()}[/red]")
+            return
+        self.console.print(
+            f"[green]Index built successfully! {self._progress_text()}[/green]")
+        if self.index_path:
+            self.console.print(f"[green]Index saved to {self.index_path}[/green]")
+        # users repeat queries, serve those from memory now the index no longer changes
+        self.trie.enable_query_cache()
+
+    def ranking_engine(self) -> QueryEngine:
+        """
+        Return the QueryEngine ranking multi-word queries.
+
+        While the index is being built a new engine is made for every
+        query, so the average page length includes the latest pages; search
+        it through rank(), which keeps the crawl from changing its data.
+        """
+        if self.engine is None or self.building:
+            crawler = self.crawler
+            # the crawler counted each page's words while indexing
+            engine = QueryEngine(self.trie, crawler.documents, crawler.frequencies,
+                                 crawler.lengths)
+            if self.building:
+                return engine
+            self.engine = engine
+        return self.engine
+
+    def rank(self, query: str) -> list:
+        """
+        Return the best pages for a multi-word query, see QueryEngine.search.
+
+        While the index is being built the background crawl keeps adding to
+        the index, page table and ranking data, so the search holds the
+        crawler's index_lock, seeing them all as they were between two pages.
+
         Args:
             query (str): Search query
-            results (list): List of search results
+
+        Returns:
+            list: (url, score) pairs, best first
         """
-        if results:
+        if self.crawler is None:
+            return self.ranking_engine().search(query, k=self.MAX_RANKED)
+        with self.crawler.index_lock:
+            return self.ranking_engine().search(query, k=self.MAX_RANKED)
+
+    def suggest(self, query: str) -> list:
+        """
+        Find the indexed words closest to a query that had no results.
+
+        Allows one typo in short words and two in longer ones.
+
+        Args:
+            query (str): Search query without wildcards
+
+        Returns:
+            list: (word, urls) pairs, closest first
+        """
+        max_distance = 1 if len(query) <= 4 else 2
+        matches = sorted(self.trie.fuzzy_search(query, max_distance),
+                         key=lambda match: match[2])
+        return [(word, urls) for word, urls, _ in matches[:self.MAX_SUGGESTIONS]]
+
+    def wildcard_rows(self, query: str) -> Iterator[tuple]:
+        """
+        Search the index for a wildcard query, for display_results.
+
+        The words of the first page (and one more, telling whether there is a
+        next page) come from the query cache, so a repeated query is answered
+        from memory. Later words are searched lazily past the cache, only
+        once the user asks for them.
+
+        Args:
+            query (str): Search query, '*' matching any single character
+
+        Returns:
+            Iterator[tuple]: (word, urls) pairs
+        """
+        first = list(self.trie.wildcard_search(query, limit=self.PAGE_SIZE + 1))
+        if len(first) <= self.PAGE_SIZE:
+            return iter(first)
+        rest = self.trie.wildcard_search(query, cached=False)
+        return chain(first, islice(rest, len(first), None))
+
+    def display_results(self, query: str, results: Iterable) -> None:
+        """
+        Display search results in formatted tables of PAGE_SIZE rows.
+
+        Rows are only taken from `results` as pages are shown, and the user
+        is asked before each further page.
+
+        Args:
+            query (str): Search query
+            results (Iterable): (word, urls) pairs
+        """
+        rows = ((word, url) for word, urls in results for url in urls)
+        # one row more than a page tells whether there is a next page
+        page = list(islice(rows, self.PAGE_SIZE + 1))
+        if not page:
+            self.console.print(f"[red]No results found for '{query}'.[/red]")
+            return
+        shown = 0
+        while True:
             table = Table(
                 title=Panel.fit(f"Wildcard Search Results for '{query}'", 
                                 border_style="bold cyan"),
@@ -56,34 +280,90 @@ class CrawlerSearchApp:
             table.add_column("Word", style="cyan", justify="left")
             table.add_column("URL", style="green", justify="left")
 
-            for word, urls in results:
-                for url in urls:
-                    table.add_row(word, url)
+            for word, url in page[:self.PAGE_SIZE]:
+                table.add_row(word, url)
 
             self.console.print(table)
-        else:
-            self.console.print(f"[red]No results found for '{query}'.[/red]")
+            shown += min(len(page), self.PAGE_SIZE)
+            if len(page) <= self.PAGE_SIZE or not self._next_page(shown):
+                break
+            page = page[self.PAGE_SIZE:] + list(islice(rows, self.PAGE_SIZE))
+
+    def _next_page(self, shown: int) -> bool:
+        """
+        Ask whether to show the next page of results, after `shown` rows.
+        """
+        answer = Prompt.ask(f"Showed {shown} results, show more? [y/n]", default="y")
+        return answer.strip().lower() in ("y", "yes")
+
+    def display_ranked(self, query: str, results: list) -> None:
+        """
+        Display the pages matching a multi-word query, best first.
+
+        Args:
+            query (str): Search query
+            results (list): List of (url, score) pairs
+        """
+        if not results:
+            self.console.print(f"[red]No pages match '{query}'.[/red]")
+            return
+        table = Table(
+            title=Panel.fit(f"Pages matching '{query}'", border_style="bold cyan"),
+            show_header=True,
+            header_style="bold magenta"
+        )
+        table.add_column("Rank", style="cyan", justify="right")
+        table.add_column("URL", style="green", justify="left")
+        table.add_column("Score", style="yellow", justify="right")
+        for rank, (url, score) in enumerate(results, 1):
+            table.add_row(str(rank), url, f"{score:.2f}")
+        self.console.print(table)
 
     def run(self) -> None:
         """Main application run method."""
-        # Build initial index
+        # Build initial index, or start building it in the background
         self.build_index()
+        if self.crawler is None:
+            # users repeat queries, serve those from memory until the index changes
+            self.trie.enable_query_cache()
 
-        # Search loop
+        # Search loop, open while the index is still being built
         while True:
-            query = Prompt.ask("Enter a search query (or type 'exit' to quit)").strip().lower()
+            self.show_progress()
+            query = Prompt.ask("Enter a search query (or type 'exit' to quit)").strip()
             
-            if query == "exit":
+            if query.lower() == "exit":
                 self.console.print("[blue]Goodbye![/blue]")
                 break
+            if not query:
+                # an empty query only refreshes the progress
+                continue
+
+            # several words (with OR / NOT / -word) are a ranked page search
+            if len(query.split()) > 1 or query.startswith("-"):
+                self.display_ranked(query, self.rank(query))
+                continue
+            query = query.lower()
 
             # Perform search and display results
-            results = list(self.trie.wildcard_search(query))
+            results = self.wildcard_rows(query)
+            first = next(results, None)
+            if first is not None:
+                results = chain((first,), results)
+            elif "*" not in query:
+                results = self.suggest(query)
+                if results:
+                    self.console.print(f"[yellow]No exact match for '{query}', "
+                                       "showing close words.[/yellow]")
             self.display_results(query, results)
 
 def main():
-    """Entry point for the crawler search application."""
-    app = CrawlerSearchApp()
+    """
+    Entry point for the crawler search application.
+
+    Usage: python -m trie_search.tui [INDEX_FILE]
+    """
+    app = CrawlerSearchApp(sys.argv[1] if len(sys.argv) > 1 else None)
     app.run()
 
 if __name__ == "__main__":